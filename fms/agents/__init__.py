@@ -4,29 +4,46 @@
 Agents module.
 """
 
+import copy
+import types
+import random
+
 from fms.utils.exceptions import MissingParameter, NotAnInteger
+from fms.utils.randombuffer import RandomBuffer
 
 class Agent:
     """
     Abstract agent class.
     
-    Any agent class inherits from agents.Agent, and should provide
+    Any agent class inherits from agents.Agent (or agents.SlottedAgent,
+    see below), and should provide
     - a money attribute (float)
     - a stocks attribute (int)
     These attributes are passed in the parameters dict on instance 
     creation.
 
+    Agents draw their random numbers with their rng attribute,
+    which provides the random(), randint() and choice() functions of
+    the random module : it is the random module itself, or, if the
+    agents block has a randombuffer parameter, a RandomBuffer of that
+    size, own to the agent (see random_generator()).
+
+    Agents are identified in orders logs by their ident attribute, a
+    small integer, stable from one run to the next : fms.core sets it
+    to the agent index in the agents list. Agents created otherwise
+    get their id(), clones that of their prototype.
+
     Agent (sub)classes should provide an act() method,
-    returning a tuple consisting of either :
-    - (direction) : int, 0 buy, 1 sell
-    - (direction, price) : price is a .2 float
-    - (direction, price, quantity) : quantity is an int
+    returning an order, see act().
 
     Agent class provides a record(direction,price,quantity) 
     method, returning nothing, and updating money and stocks
     of agent given the operation to record.
     """
 
+    cloneable = False
+    tupleorders = False
+
     def __init__(self, params, offset=0):
         params = params['agents'][offset]
         for key in ('money', 'stocks'):
@@ -38,19 +55,81 @@ class Agent:
         if '.' in str(self.stocks):
             raise NotAnInteger, self.stocks
         self.stocks = int(self.stocks)
+        self.rng = random_generator(params.get('randombuffer'))
+        self.ident = id(self)
 
     def __str__(self):
         return "<Agent %s>" % id(self)
 
+    def init_state(self):
+        """
+        Initialize agent own state, i.e. anything which is not parsed
+        from parameters : initial values drawn at random, and mutable
+        containers (lists, dicts...) updated as the agent trades.
+        Subclasses with such a state should create it here, and call
+        init_state() at the end of __init__. Nothing to do for the base
+        class.
+        """
+        pass
+
+    def clone(self):
+        """
+        Return a new agent of the same class, which shares the
+        parameters self parsed, but has its own state (see
+        init_state), without going through __init__ again.
+
+        Used to create large populations from a prototype agent,
+        for classes whose cloneable attribute is True, i.e. classes
+        for which __init__ does nothing but parsing parameters and
+        calling init_state().
+        >>> from fms.agents.zerointelligencetrader import ZeroIntelligenceTrader
+        >>> params = {'agents': [{'money':10000, 'stocks':200, 'args':[999, 100]}]}
+        >>> agent = ZeroIntelligenceTrader(params)
+        >>> clone = agent.clone()
+        >>> clone is agent, clone.maxprice, clone.money
+        (False, 999, 10000.0)
+
+        """
+        if type(self) is types.InstanceType:
+            # classic class instance, cheaper than copy.copy
+            agent = types.InstanceType(self.__class__, self.__dict__.copy())
+        else:
+            agent = copy.copy(self)
+        if self.rng is not random:
+            agent.rng = random_generator(self.rng.size)
+        agent.init_state()
+        return agent
+
+    def attach_history(self, history):
+        """
+        Called once agents are created, if the experiment has a true
+        history parameter, with the MarketHistory the market keeps.
+        Agents relying on past transactions may query it instead of
+        keeping their own records, see MarketHistory.follow().
+        Nothing to do for the base class.
+        """
+        pass
+
     def state(self):
         return "Agent %s - owns $%8.2f and %6i securities" % (id(self), 
                 self.money, self.stocks)
 
     def speak(self):
         """
-        Return order emitted by agent
+        Return order emitted by agent, as a dict (see act()).
+        Tuple orders are turned into dicts.
+        >>> from fms.agents.zerointelligencetrader import ZeroIntelligenceTrader
+        >>> params = {'agents': [{'money':10000, 'stocks':200, 'args':[999, 100]}]}
+        >>> agent = ZeroIntelligenceTrader(params)
+        >>> order = agent.speak()
+        >>> sorted(order.keys()), order['agent'] is agent
+        (['agent', 'direction', 'price', 'quantity'], True)
+
         """
         order = self.act()
+        if self.tupleorders:
+            return {'direction':order[0], 'price':order[1],
+                    'quantity':order[2], 'agent':self}
         order['agent'] = order.get('agent', self)
         return order
 
@@ -64,10 +143,30 @@ class Agent:
         The only compulsory key is direction, others might
         be missing as markets are responsible to sanitize orders
         by calling Market.sanitize_order(order).
+
+        Agent classes whose tupleorders attribute is True return
+        instead a (direction, price, quantity) tuple, all three
+        being compulsory. Engines record such orders without
+        building any dict, see Engine.submit().
         Should be implemented in subclass.
         """
         raise NotImplementedError
 
+    def revalidate(self, order):
+        """
+        Check an order drawn in advance (see block_act) against
+        current agent state, when it is submitted. Return order,
+        possibly modified, or None if the agent should not speak.
+
+        Agent classes may provide a block_act(agents, rng, world,
+        market) class method, returning the orders of a sequence of
+        agents at once, drawn as NumPy vectors with the numpy.random
+        RandomState rng. Such orders may be used long after being
+        drawn : if agent state changed since, revalidate should
+        correct them. The base class returns the order unchanged.
+        """
+        return order
+
     def record(self, direction, price, quantity):
         """
         Record transaction
@@ -79,3 +178,169 @@ class Agent:
             self.stocks += quantity
             self.money -= quantity*price
 
+    def attributes(self):
+        """
+        Return dict of agent attributes, names to values.
+        """
+        return self.__dict__.copy()
+
+class SlottedAgent(object):
+    """
+    Agent base class, storing agent attributes in slots.
+
+    SlottedAgent behaves as Agent, but is a new-style class with
+    __slots__ : agents have no instance dict, which saves most of the
+    memory an agent takes in large populations. Base class slots are
+    money, stocks, rng, args, maxprice, maxbuy and ident, subclasses
+    should declare their own attributes in their __slots__ attribute
+    (an empty tuple if they have none). Parameters keys which are not slots, other than
+    money and stocks, are ignored.
+    >>> from fms.agents import SlottedAgent
+    >>> agent = SlottedAgent({'agents': [{'money':10000, 'stocks':200,
+    ...     'args':[999, 100], 'number':10}]})
+    >>> print agent.state()
+    Agent ... - owns $10000.00 and    200 securities
+    >>> agent.args, hasattr(agent, 'number'), hasattr(agent, '__dict__')
+    ([999, 100], False, False)
+    >>> agent.record(0, 10., 5)
+    >>> agent.money, agent.stocks
+    (9950.0, 205)
+
+    Class attributes (as cloneable or tupleorders) are shared by all
+    agents, as for Agent subclasses. Agent classes written against the
+    dict based Agent class do not need to be changed.
+    """
+
+    __slots__ = ('money', 'stocks', 'rng', 'args', 'maxprice', 'maxbuy',
+            'ident')
+
+    cloneable = False
+    tupleorders = False
+
+    def __init__(self, params, offset=0):
+        params = params['agents'][offset]
+        for key in ('money', 'stocks'):
+            if not key in params:
+                raise MissingParameter, key
+        slots = slotnames(self.__class__)
+        for key in params:
+            if key in slots:
+                setattr(self, key, params[key])
+        self.money = float(self.money)
+        if '.' in str(self.stocks):
+            raise NotAnInteger, self.stocks
+        self.stocks = int(self.stocks)
+        self.rng = random_generator(params.get('randombuffer'))
+        self.ident = id(self)
+
+    __str__ = Agent.__str__.im_func
+    init_state = Agent.init_state.im_func
+    attach_history = Agent.attach_history.im_func
+    state = Agent.state.im_func
+    speak = Agent.speak.im_func
+    act = Agent.act.im_func
+    revalidate = Agent.revalidate.im_func
+    record = Agent.record.im_func
+
+    def clone(self):
+        """
+        Return a new agent of the same class, which shares the
+        parameters self parsed, but has its own state, as Agent.clone
+        does.
+        >>> from fms.agents.zerointelligencetrader import ZeroIntelligenceTrader
+        >>> params = {'agents': [{'money':10000, 'stocks':200, 'args':[999, 100]}]}
+        >>> agent = ZeroIntelligenceTrader(params)
+        >>> clone = agent.clone()
+        >>> clone is agent, clone.maxprice, clone.money
+        (False, 999, 10000.0)
+
+        """
+        cls = self.__class__
+        agent = cls.__new__(cls)
+        for name in slotnames(cls):
+            if hasattr(self, name):
+                setattr(agent, name, getattr(self, name))
+        if hasattr(self, '__dict__'):
+            agent.__dict__.update(self.__dict__)
+        if self.rng is not random:
+            agent.rng = random_generator(self.rng.size)
+        agent.init_state()
+        return agent
+
+    def attributes(self):
+        """
+        Return dict of agent attributes, names to values, from its
+        slots and instance dict if any.
+        """
+        attributes = {}
+        for name in slotnames(self.__class__):
+            if hasattr(self, name):
+                attributes[name] = getattr(self, name)
+        if hasattr(self, '__dict__'):
+            attributes.update(self.__dict__)
+        return attributes
+
+def random_generator(size=None):
+    """
+    Return random numbers generator for a new agent : the random
+    module, or if size is set, a RandomBuffer drawing size uniforms at
+    a time. Its seed is drawn with the random module, thus seeded by
+    the experiment randomseed, so that runs are reproducible.
+    >>> import random
+    >>> from fms.agents import random_generator
+    >>> random_generator() is random
+    True
+    >>> random.seed(1)
+    >>> first = [random_generator(64).random() for i in range(3)]
+    >>> random.seed(1)
+    >>> first == [random_generator(64).random() for i in range(3)]
+    True
+
+    """
+    if size:
+        return RandomBuffer(random.getrandbits(32), int(size))
+    return random
+
+_slotnames = {}
+
+def slotnames(cls):
+    """
+    Return tuple of the names of the slots of new-style class cls and
+    of its base classes.
+    >>> from fms.agents import SlottedAgent, slotnames
+    >>> class Trader(SlottedAgent):
+    ...     __slots__ = ('prevprice',)
+    >>> slotnames(Trader)
+    ('money', 'stocks', 'rng', 'args', 'maxprice', 'maxbuy', 'ident', 'prevprice')
+
+    """
+    try:
+        return _slotnames[cls]
+    except KeyError:
+        pass
+    names = []
+    for klass in reversed(cls.__mro__):
+        slots = klass.__dict__.get('__slots__', ())
+        if isinstance(slots, basestring):
+            slots = (slots,)
+        for name in slots:
+            if name not in ('__dict__', '__weakref__') and name not in names:
+                names.append(name)
+    _slotnames[cls] = tuple(names)
+    return _slotnames[cls]
+
+def block_randint(rng, low, high):
+    """
+    Return array of random integers N such that low <= N <= high,
+    low and high being arrays of the same length, as random.randint does
+    for scalars. rng is a numpy.random.RandomState. Helper for
+    block_act class methods.
+    >>> import numpy
+    >>> from fms.agents import block_randint
+    >>> draws = block_randint(numpy.random.RandomState(1),
+    ...     numpy.array([1, 5, 10]*100), numpy.array([1, 6, 20]*100))
+    >>> sorted(set(draws[::3])), sorted(set(draws[1::3])), draws[2::3].min() >= 10
+    ([1], [5, 6], True)
+
+    """
+    return low + (rng.random_sample(len(low)) * (high-low+1)).astype(int)
@@ -0,0 +1,211 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+"""
+Module defining AgentPool class, a population of agents of the same
+class, sharing their parameters.
+"""
+
+import sys
+import types
+import random
+import logging
+
+from fms.agents import Agent, slotnames
+
+logger = logging.getLogger('fms.agents.agentpool')
+
+# types of the attributes handles may share with the prototype agent
+SHAREABLE = (int, long, float, str, unicode, bool, tuple, type(None),
+        types.ModuleType)
+
+class AgentPool:
+    """
+    Population of agents of the same class, stored as arrays.
+
+    The money and stocks of all the agents of an agents block
+    (see the 'pool' agents parameter) are stored in two NumPy arrays,
+    and the other attributes, parsed once from the block parameters
+    by a prototype agent, are shared by all agents. The pool is a
+    sequence of lightweight agent handles, instances of a slotted
+    subclass of the agent class, without instance dict, which only
+    hold their index in the pool and their ident. Their money and
+    stocks attributes are properties reading and writing the pool
+    arrays, so that agent classes need not be changed.
+    >>> from fms.agents.agentpool import AgentPool
+    >>> from fms.agents.zerointelligencetrader import ZeroIntelligenceTrader
+    >>> params = {'agents': [{'money':10000, 'stocks':200, 'args':[999, 100],
+    ...     'number': 3}]}
+    >>> pool = AgentPool(ZeroIntelligenceTrader, params)
+    >>> len(pool)
+    3
+    >>> agent = pool[1]
+    >>> isinstance(agent, ZeroIntelligenceTrader)
+    True
+    >>> agent.maxprice, agent.maxbuy
+    (999, 100)
+    >>> agent.record(1, 10.0, 20)
+    >>> print agent.state()
+    Agent ... - owns $10200.00 and    180 securities
+    >>> pool.stocks.tolist()
+    [200, 180, 200]
+    >>> hasattr(agent, '__dict__')
+    False
+
+    Wealth of the whole population is a single array operation.
+    >>> pool.wealth(10.0).tolist()
+    [12000.0, 12000.0, 12000.0]
+
+    Initial values drawn at random by init_state() are not shared,
+    but kept in slots of the handles : the first handle takes over
+    the ones of the prototype, and the others call init_state()
+    again, keeping their own draws, as clones of the prototype would
+    (see Agent.clone()).
+    >>> from fms.contrib.coleman.agents.randomfixedtrader import RandomFixedTrader
+    >>> params['agents'][0]['number'] = 20
+    >>> pool = AgentPool(RandomFixedTrader, params)
+    >>> len(set([agent.buyprice for agent in pool])) > 1
+    True
+    >>> [agent.buyprice == agent.sellprice for agent in pool] == [True]*20
+    True
+    >>> hasattr(pool[1], '__dict__')
+    False
+
+    Apart from such drawn values, only agent classes whose per-agent
+    state is made of money and stocks may be pooled : a prototype
+    attribute which is not a number, a string or a tuple raises a
+    TypeError, as well as agent classes which are not slotted (see
+    SlottedAgent).
+    >>> from fms.contrib.coleman.agents.mem5trader import Mem5Trader
+    >>> pool = AgentPool(Mem5Trader, params)
+    Traceback (most recent call last):
+        ...
+    TypeError: Mem5Trader agents can not be pooled (bids attribute)
+
+    """
+
+    def __init__(self, agentclass, params, offset=0):
+        try:
+            import numpy
+        except ImportError:
+            logger.critical(
+                    "Please install the numpy module to use agents pools.")
+            logger.critical("See http://numpy.scipy.org/ for installation.")
+            sys.exit(2)
+        if not isinstance(agentclass, type):
+            # classic class instances always have a dict
+            raise TypeError, "%s agents can not be pooled (not slotted, " \
+                    "see SlottedAgent)" % agentclass.__name__
+        prototype = agentclass(params, offset)
+        number = params['agents'][offset]['number']
+        self.money = numpy.empty(number, dtype=float)
+        self.money.fill(prototype.money)
+        self.stocks = numpy.empty(number, dtype=numpy.int64)
+        self.stocks.fill(prototype.stocks)
+        attributes = prototype.attributes()
+        for key in ('money', 'stocks', 'ident'):
+            attributes.pop(key, None)
+        for key, value in sorted(attributes.iteritems()):
+            if not isinstance(value, SHAREABLE):
+                raise TypeError, "%s agents can not be pooled (%s attribute)" \
+                        % (agentclass.__name__, key)
+        # values drawn by init_state() are kept by each handle in
+        # slots, others are shared by the handle class
+        if agentclass.init_state.im_func is Agent.init_state.im_func:
+            ownstate = ()
+        else:
+            ownstate = _state_names(prototype)
+        shared = dict([(key, value) for (key, value)
+            in attributes.iteritems() if not key in ownstate])
+        inherited = slotnames(agentclass)
+        shared.update({
+            '__slots__': tuple([name for name in ('index', 'ident') + ownstate
+                if not name in inherited]),
+            '__module__': agentclass.__module__,
+            'pool': self,
+            'money': property(_get_money, _set_money),
+            'stocks': property(_get_stocks, _set_stocks),
+            })
+        self.handleclass = type(agentclass.__name__, (agentclass, object),
+                shared)
+        # the first handle takes over the drawn state of the prototype,
+        # other handles draw their own
+        self.handles = []
+        for index in xrange(number):
+            handle = self.handleclass.__new__(self.handleclass)
+            handle.index = index
+            handle.ident = index
+            if not index:
+                for name in ownstate:
+                    setattr(handle, name, getattr(prototype, name))
+            elif ownstate:
+                handle.init_state()
+            self.handles.append(handle)
+
+    def __len__(self):
+        return len(self.handles)
+
+    def __getitem__(self, index):
+        return self.handles[index]
+
+    def __iter__(self):
+        return iter(self.handles)
+
+    def wealth(self, price):
+        """
+        Return array of agents wealth, stocks being valued at price
+        """
+        return self.money + self.stocks*price
+
+class _StateProbe(object):
+    """
+    Stand-in agent recording the names of the attributes set on it,
+    other attributes being read from the agent it stands for
+    """
+
+    def __init__(self, agent):
+        object.__setattr__(self, 'agent', agent)
+        object.__setattr__(self, 'names', [])
+
+    def __getattr__(self, name):
+        return getattr(self.agent, name)
+
+    def __setattr__(self, name, value):
+        if not name in self.names:
+            self.names.append(name)
+
+def _state_names(agent):
+    """
+    Return tuple of the names of the attributes the init_state()
+    method of agent sets, run on a _StateProbe. Pooled agents draw
+    from the random module (see fms.utils.parsers), whose state is
+    restored afterwards.
+    """
+    probe = _StateProbe(agent)
+    state = random.getstate()
+    try:
+        agent.__class__.init_state.im_func(probe)
+    finally:
+        random.setstate(state)
+    return tuple(probe.names)
+
+def _get_money(handle):
+    return float(handle.pool.money[handle.index])
+
+def _set_money(handle, value):
+    handle.pool.money[handle.index] = value
+
+def _get_stocks(handle):
+    return int(handle.pool.stocks[handle.index])
+
+def _set_stocks(handle, value):
+    handle.pool.stocks[handle.index] = value
+
+def _test():
+    """
+    Run tests in docstrings
+    """
+    import doctest
+    doctest.testmod(optionflags=+doctest.ELLIPSIS)
+
+if __name__ == '__main__':
+    _test()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+"""
+Module defining LazyAgentList class, a list of agents created on
+first use.
+"""
+
+import random
+from bisect import bisect_right
+
+from fms.agents.agentpool import AgentPool
+
+class LazyAgentList:
+    """
+    List of the agents of an experiment, created when first used.
+
+    With the 'lazyagents' experiment parameter, agents are not created
+    by set_classes() but the first time the engine picks them (or
+    anything else reads them from the list), so that agents which
+    never speak cost nothing. Agents are created with the random
+    module seeded from the list seed (the experiment randomseed, if
+    any) and their index, its state being restored afterwards : an
+    agent is the same whenever it is created, and creating it does not
+    change the random draws of the engine. Agents idents are their
+    index in the list.
+    Cloneable agents are cloned from a prototype of their block (see
+    Agent.clone()), pooled agents (see AgentPool) are created at once.
+    >>> from fms.agents.lazyagentlist import LazyAgentList
+    >>> from fms.agents.zerointelligencetrader import ZeroIntelligenceTrader
+    >>> from fms.contrib.coleman.agents import randomfixedtraderhalves
+    >>> Halves = randomfixedtraderhalves.RandomFixedTraderHalves
+    >>> params = {'agents': [
+    ...     {'money':10000, 'stocks':200, 'args':[999, 100], 'number':2},
+    ...     {'money':10000, 'stocks':200, 'args':[10, 100], 'number':3}]}
+    >>> agents = LazyAgentList(params,
+    ...     [ZeroIntelligenceTrader, Halves], seed=42)
+    >>> len(agents), agents.created()
+    (5, 0)
+    >>> agent = agents[3]
+    >>> agent.__class__.__name__, agents.created()
+    ('RandomFixedTraderHalves', 1)
+    >>> agent is agents[3]
+    True
+    >>> agent.ident
+    3
+
+    Agents do not depend on the order they are created in.
+    >>> other = LazyAgentList(params,
+    ...     [ZeroIntelligenceTrader, Halves], seed=42)
+    >>> last = other[4]
+    >>> [(a.buyprice, a.sellprice) == (b.buyprice, b.sellprice)
+    ...     for (a, b) in zip(agents, other)[2:]]
+    [True, True, True]
+
+    Seeds given as strings, as they come from the command line, are
+    the integers they stand for.
+    >>> other = LazyAgentList(params,
+    ...     [ZeroIntelligenceTrader, Halves], seed='42')
+    >>> other.seed, other[3].buyprice == agents[3].buyprice
+    (42, True)
+
+    """
+
+    def __init__(self, params, agentsclasses, seed=None):
+        self.params = params
+        if seed is None:
+            seed = params.get('randomseed')
+        if seed is None:
+            seed = random.getrandbits(32)
+        if not isinstance(seed, (int, long)):
+            # command line and XML seeds are strings
+            try:
+                seed = int(seed)
+            except ValueError:
+                seed = hash(seed)
+        self.seed = seed
+        self.classes = agentsclasses
+        # index of the first agent of each block
+        self.starts = []
+        self.agents = []
+        self.prototypes = {}
+        self.history = None
+        for (offset, agentclass) in enumerate(agentsclasses):
+            self.starts.append(len(self.agents))
+            if params['agents'][offset].get('pool'):
+                start = len(self.agents)
+                self.agents.extend(AgentPool(agentclass, params, offset))
+                for index in xrange(start, len(self.agents)):
+                    self.agents[index].ident = index
+            else:
+                self.agents.extend([None]*params['agents'][offset]['number'])
+
+    def __len__(self):
+        return len(self.agents)
+
+    def __getitem__(self, index):
+        agent = self.agents[index]
+        if agent is None:
+            if index < 0:
+                index += len(self.agents)
+            agent = self.agents[index] = self.create(index)
+        return agent
+
+    def __iter__(self):
+        for index in xrange(len(self.agents)):
+            yield self[index]
+
+    def created(self):
+        """
+        Number of agents created so far
+        """
+        return len(self.agents) - self.agents.count(None)
+
+    def attach_history(self, history):
+        """
+        Attach market history to agents created so far, and to the
+        next ones as they are created
+        """
+        self.history = history
+        for agent in self.agents:
+            if agent is not None:
+                agent.attach_history(history)
+
+    def create(self, index):
+        """
+        Create agent index, with the random module seeded from index
+        """
+        offset = bisect_right(self.starts, index) - 1
+        agentclass = self.classes[offset]
+        state = random.getstate()
+        try:
+            if agentclass.cloneable:
+                prototype = self.prototypes.get(offset)
+                if prototype is None:
+                    random.seed(self.seed - offset - 1)
+                    prototype = agentclass(self.params, offset)
+                    self.prototypes[offset] = prototype
+                random.seed(self.seed + index)
+                agent = prototype.clone()
+            else:
+                random.seed(self.seed + index)
+                agent = agentclass(self.params, offset)
+        finally:
+            random.setstate(state)
+        agent.ident = index
+        if self.history is not None:
+            agent.attach_history(self.history)
+        return agent
+
+def _test():
+    """
+    Run tests in docstrings
+    """
+    import doctest
+    doctest.testmod(optionflags=+doctest.ELLIPSIS)
+
+if __name__ == '__main__':
+    _test()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+"""
+Module defining MultiAssetZeroIntelligenceTrader agent class.
+"""
+
+from fms import agents
+from fms.utils import BUY, SELL
+from fms.utils.exceptions import MissingParameter
+
+class MultiAssetZeroIntelligenceTrader(agents.SlottedAgent):
+    """
+    Simulate an agent taking random decisions on many assets
+
+    The list of assets is read from the experiment 'assets' parameter.
+    The agent starts with the same number of stocks of each asset, and
+    self.portfolio holds the stocks it owns by asset, while self.stocks
+    is the total number of stocks it owns.
+
+    This agent subclass should have two keys in the
+    args dict :
+    - maxprice : maximum order price (float)
+    - maxbuy : maximum quantity to buy (int)
+    If any of those parameters is missing, a MissingParameter
+    exception is raised.
+    >>> from fms.agents import multiassetzerointelligencetrader
+    >>> params = {'agents': [{'money':10000, 'stocks':200, 'args':[999, 100]}]}
+    >>> agent = multiassetzerointelligencetrader.MultiAssetZeroIntelligenceTrader(params)
+    Traceback (most recent call last):
+        ...
+    MissingParameter: assets
+    >>> params = {'assets': ['ACME', 'INITECH'],
+    ...     'agents': [{'money':10000, 'stocks':200, 'args':[999]}]}
+    >>> agent = multiassetzerointelligencetrader.MultiAssetZeroIntelligenceTrader(params)
+    Traceback (most recent call last):
+        ...
+    MissingParameter: maxbuy
+    >>> params = {'assets': ['ACME', 'INITECH'],
+    ...     'agents': [{'money':10000, 'stocks':200, 'args':[999, 100]}]}
+    >>> agent = multiassetzerointelligencetrader.MultiAssetZeroIntelligenceTrader(params)
+    >>> print agent.state()
+    Agent ... - owns $10000.00 and    400 securities
+    >>> sorted(agent.portfolio.items())
+    [('ACME', 200), ('INITECH', 200)]
+
+    The MultiAssetZeroIntelligenceTrader acts as the
+    ZeroIntelligenceTrader, on an asset uniformly chosen
+    among the assets, by returning a dict with
+    (direction, price, quantity, asset) keys.
+    >>> order = agent.act()
+    >>> len(order)
+    4
+    >>> order['asset'] in ('ACME', 'INITECH')
+    True
+
+    Shortselling is not allowed, asset by asset.
+    """
+
+    __slots__ = ('assets', 'portfolio')
+    cloneable = True
+
+    def __init__(self, params, offset=0):
+        agents.SlottedAgent.__init__(self, params, offset)
+        try:
+            self.assets = list(params['assets'])
+        except (KeyError, TypeError):
+            raise MissingParameter, 'assets'
+        try:
+            self.maxprice = self.args[0]
+        except (AttributeError, IndexError):
+            raise MissingParameter, 'maxprice'
+        try:
+            self.maxbuy = self.args[1]
+        except IndexError:
+            raise MissingParameter, 'maxbuy'
+        del self.args
+        self.stocks = self.stocks*len(self.assets)
+        self.init_state()
+
+    def init_state(self):
+        """
+        Share stocks equally among assets
+        """
+        self.portfolio = dict.fromkeys(self.assets,
+                self.stocks/len(self.assets))
+
+    def act(self, world=None, market=None):
+        """
+        Return random order as a dict with keys in
+        (direction, price, quantity, asset).
+
+        To avoid short selling as far as possible, if # of stocks
+        of the chosen asset is zero or negative, force BUY direction.
+        """
+        asset = self.rng.choice(self.assets)
+        stocks = self.portfolio[asset]
+        if stocks > 0:
+            direction = self.rng.choice((BUY, SELL))
+        else:
+            # stocks<=0, short selling is forbidden
+            direction = BUY
+        price = self.rng.randint(1, self.maxprice*100)/100.
+        if direction:
+            quantity = self.rng.randint(1, stocks)
+        else:
+            quantity = self.rng.randint(1, self.maxbuy)
+        return {'direction':direction, 'price':price, 'quantity':quantity,
+                'asset':asset}
+
+    def record(self, direction, price, quantity, asset=None):
+        """
+        Record transaction on asset
+        """
+        agents.SlottedAgent.record(self, direction, price, quantity)
+        if direction:
+            self.portfolio[asset] -= quantity
+        else:
+            self.portfolio[asset] += quantity
+
+def _test():
+    """
+    Run tests in docstrings
+    """
+    import doctest
+    doctest.testmod(optionflags=+doctest.ELLIPSIS)
+
+if __name__ == '__main__':
+    _test()
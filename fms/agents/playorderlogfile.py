@@ -7,7 +7,11 @@ Module defining PlayOrderLogFile agent class.
 import os.path
 
 from fms import agents
+from fms.utils import ORDEROPTIONS
 from fms.utils.exceptions import MissingParameter
+from fms.utils.binary import is_binary_orderslog, OrdersLogReader
+from fms.utils.logindex import index_filename, read_index
+from fms.utils.files import open_file
 
 class PlayOrderLogFile(agents.Agent):
     """
@@ -18,6 +22,10 @@ class PlayOrderLogFile(agents.Agent):
     - filename : the order logfile name (str)
     If this parameter is missing, a MissingParameter
     exception is raised.
+    Compressed logs (see fms.utils.files) are read as streams.
+    Binary orders logs (see fms.utils.binary) are mapped in memory
+    rather than parsed. With those, an optional second item, the
+    starting tick (int), skips all orders placed before it.
     >>> from fms.agents import playorderlogfile
     >>> params = {'agents': [{'money':10000, 'stocks':200}]}
     >>> agent = playorderlogfile.PlayOrderLogFile(params)
@@ -28,8 +36,13 @@ class PlayOrderLogFile(agents.Agent):
     Note that this agent is a Borg : all instances share the
     same state, such as to read one line of the order logfile
     at a time, whichever instance of the agent acts.
+
+    The ReplayOrdersLog engine does not let the agent act : it pulls
+    orders with next_order(), read from the log by chunks.
     """
     __shared_state = {}
+    # CSV logs bytes read at once by read_orders()
+    chunkbytes = 65536
 
     def __init__(self, params, offset=0):
         self.__dict__ = self.__shared_state
@@ -39,8 +52,17 @@ class PlayOrderLogFile(agents.Agent):
                 filename = os.path.join(params.exp_path, self.args[0])
             except (AttributeError, IndexError):
                 raise MissingParameter, 'filename'
+            self.filename = filename
+            self.binary = is_binary_orderslog(filename)
+            if self.binary:
+                self.logfile = OrdersLogReader(filename)
+                if len(self.args) > 1:
+                    self.logfile.seek(int(self.args[1]))
+            else:
+                self.logfile = open_file(filename, 'r')
             del self.args
-            self.logfile = open(filename, 'r')
+            # next orders, reversed, see next_order()
+            self.pending = []
 
     def reset(self):
         del self.__dict__['logfile']
@@ -50,16 +72,111 @@ class PlayOrderLogFile(agents.Agent):
         Return order as a dict with keys in (direction, price, quantity).
 
         Order is read from self.filename, one order (line) at a time.
+        Multi-asset orders logs have an extra asset column, and orders
+        options (see parse_order()) are kept.
+        Binary logs orders come as dicts already.
         """
+        if self.binary:
+            return self.logfile.read()
         line = '#'
         while line.startswith('#'):
             line = self.logfile.readline()
-        direction, price, quantity, agent = line.strip().split(';')
-        direction = int(direction)
-        price = float(price)
-        quantity = int(quantity)
-        return {'direction':direction, 'price':price,
-                'quantity':quantity, 'agent':agent}
+        fields = parse_order(line)
+        order = {'direction':fields[1], 'price':fields[2],
+                'quantity':fields[3], 'agent':fields[4]}
+        if fields[5] is not None:
+            order['asset'] = fields[5]
+        for ((key, keytype), value) in zip(ORDEROPTIONS, fields[6:]):
+            if value is not None:
+                order[key] = value
+        return order
+
+    def read_orders(self):
+        """
+        Return list of the next orders of the log, as (tick, direction,
+        price, quantity, agent, asset, ttl, stop, visible) tuples (see
+        parse_order()).
+        CSV logs orders have no tick : it is None.
+        Orders are read by chunks, an empty list meaning end of log.
+        """
+        if self.binary:
+            return self.logfile.read_chunk()
+        orders = []
+        for line in self.logfile.readlines(self.chunkbytes):
+            if line.startswith('#'):
+                continue
+            orders.append(parse_order(line))
+        return orders
+
+    def seek_day(self, day, tick):
+        """
+        Go to the first order of day, starting at tick, and return its
+        (tick, offset, record, transaction) index entry, None if the
+        log has no index (see fms.utils.logindex). Binary logs are
+        sought by the index record count, or by tick if there is none,
+        CSV ones need an index.
+        """
+        self.pending = []
+        try:
+            entry = read_index(index_filename(self.filename))[day]
+        except (IOError, KeyError):
+            entry = None
+        if self.binary:
+            self.logfile.seek(tick, entry and entry[2])
+        elif entry is None:
+            raise ValueError, "no index of day %d for %s" % (day,
+                    self.filename)
+        else:
+            self.logfile.seek(entry[1])
+        return entry
+
+    def next_order(self, tick):
+        """
+        Return next order of the log (see read_orders()), if it was
+        placed at or before tick, None otherwise or at end of log.
+        CSV logs orders, which have no tick, are always returned.
+        """
+        if not self.pending:
+            self.pending = self.read_orders()
+            if not self.pending:
+                return None
+            self.pending.reverse()
+        # None (CSV logs tick) is lower than any tick
+        if self.pending[-1][0] > tick:
+            return None
+        return self.pending.pop()
+
+def parse_order(line, delimiter=';'):
+    """
+    Return order of CSV orders log line as a (tick, direction, price,
+    quantity, agent, asset, ttl, stop, visible) tuple, tick being None.
+    Fields after the agent are the asset, if any, and name=value order
+    options (see fms.utils.ORDEROPTIONS). Missing asset and options are
+    None.
+    >>> from fms.agents.playorderlogfile import parse_order
+    >>> parse_order('1;10.50;25;3')
+    (None, 1, 10.5, 25, '3', None, None, None, None)
+    >>> parse_order('0;9.00;5;12;ACME;ttl=20;stop=8.5')
+    (None, 0, 9.0, 5, '12', 'ACME', 20, 8.5, None)
+
+    """
+    fields = line.strip().split(delimiter)
+    asset = None
+    options = {}
+    for field in fields[4:]:
+        if '=' in field:
+            (key, value) = field.split('=', 1)
+            options[key] = value
+        else:
+            asset = field
+    order = [None, int(fields[0]), float(fields[1]), int(fields[2]),
+            fields[3], asset]
+    for (key, keytype) in ORDEROPTIONS:
+        if key in options:
+            order.append(keytype(options[key]))
+        else:
+            order.append(None)
+    return tuple(order)
 
 def _test():
     """
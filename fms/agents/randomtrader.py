@@ -4,7 +4,6 @@
 Module defining RandomTrader agent class.
 """
 
-import random
 import logging
 
 from fms import agents
@@ -13,7 +12,7 @@ from fms.utils.exceptions import MissingParameter
 
 logger = logging.getLogger('fms.agents.randomtrader')
 
-class RandomTrader(agents.Agent):
+class RandomTrader(agents.SlottedAgent):
     """
     Simulate an agent taking random but not stupid decisions
 
@@ -52,7 +51,7 @@ class RandomTrader(agents.Agent):
     200
 
     The RandomTrader acts by returning a
-    dict with (direction, price, quantity) keys.
+    (direction, price, quantity) tuple order (see Agent.act()).
     >>> len(agent.act())
     3
     
@@ -66,16 +65,20 @@ class RandomTrader(agents.Agent):
     But quantity is strictly controlled :
     neither shortselling nor buy position without required cash
     are allowed.
-    >>> order = agent.act()
-    >>> order['price'] >= 80
+    >>> direction, price, quantity = agent.act()
+    >>> price >= 80
     True
-    >>> order['price'] <= 120
+    >>> price <= 120
     True
 
     """
-    
+
+    __slots__ = ('avgprice', 'maxfluct')
+    cloneable = True
+    tupleorders = True
+
     def __init__(self, params, offset=0):
-        agents.Agent.__init__(self, params, offset)
+        agents.SlottedAgent.__init__(self, params, offset)
         try:
             self.avgprice = self.args[0]
         except (AttributeError, IndexError):
@@ -90,31 +93,106 @@ class RandomTrader(agents.Agent):
             raise MissingParameter, 'maxbuy'
         del self.args
 
+    def set_avgprice(self, market):
+        """
+        Set avgprice to the last transaction price of market, or to
+        100 if there is no market or no transaction yet.
+        >>> from fms.agents.randomtrader import RandomTrader
+        >>> params = {'agents': [{'money':10000, 'stocks':200, 'args':[0, 20, 200]}]}
+        >>> agent = RandomTrader(params)
+        >>> class Market:
+        ...     lastprice = None
+        >>> agent.set_avgprice(Market())
+        >>> agent.avgprice
+        100
+
+        """
+        lastprice = getattr(market, 'lastprice', None)
+        if lastprice is None:
+            self.avgprice = 100
+            logger.warning("No last price, no avgprice, avgprice set to 100")
+        else:
+            self.avgprice = lastprice
+
     def act(self, world=None, market=None):
         """
-        Return random order as a dict with keys in (direction, price, quantity).
+        Return random order as a (direction, price, quantity) tuple.
         """
         if self.stocks > 0:
-            direction = random.choice((BUY, SELL))
+            direction = self.rng.choice((BUY, SELL))
         else:
             direction = BUY
         if self.avgprice == 0:
-            try:
-                self.avgprice = market.lastprice
-            except AttributeError:
-                self.avgprice = 100
-                logger.warning("No market, no avgprice, avgprice set to 100")
-        price = random.randint(self.avgprice*(100-self.maxfluct), 
+            self.set_avgprice(market)
+        price = self.rng.randint(self.avgprice*(100-self.maxfluct), 
                 self.avgprice*(100+self.maxfluct))/100.
         if direction:
             maxq = self.stocks
         else:
             maxq = min(self.maxbuy, int(self.money/price))
         try:
-            quantity = random.randint(1, maxq)
+            quantity = self.rng.randint(1, maxq)
         except ValueError:
             quantity = 1
-        return {'direction':direction, 'price':price, 'quantity':quantity}
+        return (direction, price, quantity)
+
+    def block_act(cls, agentslist, rng, world=None, market=None):
+        """
+        Return orders of all agents in agentslist, one each, drawn at
+        once in NumPy vectors with rng, a numpy.random.RandomState,
+        with the same distributions as act(). Quantities are bounded
+        by masks : agents without stocks buy, and buy orders are
+        bounded by cash.
+        >>> import numpy
+        >>> from fms.agents.randomtrader import RandomTrader
+        >>> params = {'agents': [{'money':10000, 'stocks':200, 'args':[100, 20, 200]}]}
+        >>> agentslist = [RandomTrader(params) for i in range(50)]
+        >>> rng = numpy.random.RandomState(1)
+        >>> orders = RandomTrader.block_act(agentslist, rng)
+        >>> min(o['price'] for o in orders) >= 80, max(o['price'] for o in orders) <= 120
+        (True, True)
+        >>> max(o['quantity']*o['price'] for o in orders if not o['direction']) <= 10000
+        True
+
+        """
+        import numpy
+        number = len(agentslist)
+        for agent in agentslist:
+            if agent.avgprice == 0:
+                agent.set_avgprice(market)
+        stocks = numpy.array([a.stocks for a in agentslist])
+        money = numpy.array([a.money for a in agentslist])
+        avgprice = numpy.array([a.avgprice for a in agentslist])
+        maxfluct = numpy.array([a.maxfluct for a in agentslist])
+        maxbuy = numpy.array([a.maxbuy for a in agentslist])
+        direction = rng.randint(0, 2, number)
+        direction[stocks <= 0] = BUY
+        price = agents.block_randint(rng, avgprice*(100-maxfluct),
+                avgprice*(100+maxfluct))/100.
+        maxquantity = numpy.where(direction == SELL, stocks,
+                numpy.minimum(maxbuy, (money/price).astype(int)))
+        maxquantity[maxquantity < 1] = 1
+        quantity = agents.block_randint(rng, numpy.ones(number, dtype=int),
+                maxquantity)
+        return [{'direction':int(direction[i]), 'price':float(price[i]),
+            'quantity':int(quantity[i]), 'agent':agentslist[i]}
+            for i in xrange(number)]
+    block_act = classmethod(block_act)
+
+    def revalidate(self, order):
+        """
+        Check an order drawn by block_act against current agent
+        state : an agent may not sell more stocks than it owns, nor
+        buy more than it can pay for (but one stock).
+        """
+        if order['direction'] == SELL:
+            if self.stocks <= 0:
+                return None
+            order['quantity'] = min(order['quantity'], self.stocks)
+        else:
+            order['quantity'] = max(1, min(order['quantity'],
+                int(self.money/order['price'])))
+        return order
 
 def _test():
     """
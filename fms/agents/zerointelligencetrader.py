@@ -4,13 +4,11 @@
 Module defining ZeroIntelligenceTrader agent class.
 """
 
-import random
-
 from fms import agents
 from fms.utils import BUY, SELL
 from fms.utils.exceptions import MissingParameter
 
-class ZeroIntelligenceTrader(agents.Agent):
+class ZeroIntelligenceTrader(agents.SlottedAgent):
     """
     Simulate an agent taking random decisions
 
@@ -41,8 +39,8 @@ class ZeroIntelligenceTrader(agents.Agent):
     100
 
     The ZeroIntelligenceTrader acts by returning a
-    dict with (direction, price, quantity) keys.
-    The 3 elements of the dict are randomly chosen,
+    (direction, price, quantity) tuple order (see Agent.act()).
+    The 3 elements of the tuple are randomly chosen,
     in uniform distributions.
     >>> len(agent.act())
     3
@@ -54,9 +52,13 @@ class ZeroIntelligenceTrader(agents.Agent):
       - if direction==SELL, [1,self.stocks]
     Thus, shortselling is not allowed.
     """
-    
+
+    __slots__ = ()
+    cloneable = True
+    tupleorders = True
+
     def __init__(self, params, offset=0):
-        agents.Agent.__init__(self, params, offset)
+        agents.SlottedAgent.__init__(self, params, offset)
         try:
             self.maxprice = self.args[0]
         except (AttributeError, IndexError):
@@ -69,22 +71,73 @@ class ZeroIntelligenceTrader(agents.Agent):
 
     def act(self, world=None, market=None):
         """
-        Return random order as a dict with keys in (direction, price, quantity).
+        Return random order as a (direction, price, quantity) tuple.
 
         To avoid short selling as far as possible, if # of stocks
         is zero or negative, force BUY direction.
         """
         if self.stocks > 0:
-            direction = random.choice((BUY, SELL))
+            direction = self.rng.choice((BUY, SELL))
         else:
             # stocks<=0, short selling is forbidden
             direction = BUY
-        price = random.randint(1, self.maxprice*100)/100.
+        price = self.rng.randint(1, self.maxprice*100)/100.
         if direction:
-            quantity = random.randint(1, self.stocks)
+            quantity = self.rng.randint(1, self.stocks)
         else:
-            quantity = random.randint(1, self.maxbuy)
-        return {'direction':direction, 'price':price, 'quantity':quantity}
+            quantity = self.rng.randint(1, self.maxbuy)
+        return (direction, price, quantity)
+
+    def block_act(cls, agentslist, rng, world=None, market=None):
+        """
+        Return orders of all agents in agentslist, one each, drawn at
+        once in NumPy vectors with rng, a numpy.random.RandomState,
+        with the same distributions as act().
+        Short selling is avoided by masking : agents without stocks
+        buy.
+        >>> import numpy
+        >>> from fms.agents.zerointelligencetrader import ZeroIntelligenceTrader
+        >>> params = {'agents': [{'money':10000, 'stocks':200, 'args':[10, 100]}]}
+        >>> agentslist = [ZeroIntelligenceTrader(params) for i in range(50)]
+        >>> agentslist[0].stocks = 0
+        >>> rng = numpy.random.RandomState(1)
+        >>> orders = ZeroIntelligenceTrader.block_act(agentslist, rng)
+        >>> len(orders), orders[0]['direction'], orders[0]['agent'] is agentslist[0]
+        (50, 0, True)
+        >>> min(o['price'] for o in orders) >= 0.01, max(o['price'] for o in orders) <= 10
+        (True, True)
+        >>> max(o['quantity'] for o in orders if o['direction']) <= 200
+        True
+
+        """
+        import numpy
+        number = len(agentslist)
+        stocks = numpy.array([a.stocks for a in agentslist])
+        maxprice = numpy.array([a.maxprice for a in agentslist])
+        maxbuy = numpy.array([a.maxbuy for a in agentslist])
+        direction = rng.randint(0, 2, number)
+        direction[stocks <= 0] = BUY
+        price = agents.block_randint(rng, numpy.ones(number, dtype=int),
+                maxprice*100)/100.
+        maxquantity = numpy.where(direction == SELL, stocks, maxbuy)
+        quantity = agents.block_randint(rng, numpy.ones(number, dtype=int),
+                maxquantity)
+        return [{'direction':int(direction[i]), 'price':float(price[i]),
+            'quantity':int(quantity[i]), 'agent':agentslist[i]}
+            for i in xrange(number)]
+    block_act = classmethod(block_act)
+
+    def revalidate(self, order):
+        """
+        Check an order drawn by block_act against current stocks :
+        an agent may not sell more than it owns, nor sell anything
+        if it owns no stock any more.
+        """
+        if order['direction'] == SELL:
+            if self.stocks <= 0:
+                return None
+            order['quantity'] = min(order['quantity'], self.stocks)
+        return order
 
 def _test():
     """
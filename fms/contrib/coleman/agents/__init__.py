@@ -38,6 +38,7 @@ class Agent:
         if '.' in str(self.stocks):
             raise NotAnInteger, self.stocks
         self.stocks = int(self.stocks)
+        self.ident = id(self)
 
     def __str__(self):
         return "<Agent %s>" % id(self)
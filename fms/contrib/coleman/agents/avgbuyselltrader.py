@@ -4,13 +4,12 @@
 Module defining AvgBuySellTrader agent class.
 """
 
-import random
-
 from fms import agents
 from fms.utils import BUY, SELL
 from fms.utils.exceptions import MissingParameter
+from fms.utils.stats import RunningStats
 
-class AvgBuySellTrader(agents.Agent):
+class AvgBuySellTrader(agents.SlottedAgent):
     """
     Simulate an agent taking random decisions
 
@@ -20,6 +19,9 @@ class AvgBuySellTrader(agents.Agent):
     - maxbuy : maximum quantity to buy (int)
     If any of those parameters is missing, a MissingParameter
     exception is raised.
+    An optional third item, window (int), bounds the number of
+    bids and successes the agent remembers, on each side. If
+    missing, the agent remembers them all.
     >>> from fms.agents import zerointelligencetrader
     >>> params = {'agents': [{'money':10000, 'stocks':200}]}
     >>> agent = zerointelligencetrader.ZeroIntelligenceTrader(params)
@@ -57,9 +59,13 @@ class AvgBuySellTrader(agents.Agent):
       - if direction==SELL, [1,self.stocks]
     Thus, shortselling is not allowed.
     """
-    
+
+    __slots__ = ('window', 'sellhist', 'buyhist', 'sellbids', 'buybids',
+            'successes', 'bids', 'history')
+    cloneable = True
+
     def __init__(self, params, offset=0):
-        agents.Agent.__init__(self, params, offset)
+        agents.SlottedAgent.__init__(self, params, offset)
         try:
             self.maxprice = self.args[0]
         except (AttributeError, IndexError):
@@ -68,13 +74,49 @@ class AvgBuySellTrader(agents.Agent):
             self.maxbuy = self.args[1]
         except IndexError:
             raise MissingParameter, 'maxbuy'
+        try:
+            self.window = self.args[2]
+        except IndexError:
+            self.window = None
         del self.args
+        self.history = None
+        self.init_state()
+
+    def init_state(self):
+        """
+        Create empty bids and successes histories
+        """
         # Successes
-        self.sellhist = list()
-        self.buyhist = list()
+        if self.history is None:
+            self.sellhist = RunningStats(self.window)
+            self.buyhist = RunningStats(self.window)
+        else:
+            self.attach_history(self.history)
         # Bids
-        self.buybids = list()
-        self.sellbids = list()
+        self.buybids = RunningStats(self.window)
+        self.sellbids = RunningStats(self.window)
+        # Without window, both sides are also summed together in
+        # append order, so that combined averages are exactly those
+        # of sum()/len() on all bids or successes
+        if self.window is None:
+            self.bids = RunningStats()
+            if self.history is None:
+                self.successes = RunningStats()
+        else:
+            self.bids = None
+            self.successes = None
+
+    def attach_history(self, history):
+        """
+        Let the market history keep successes
+        """
+        self.history = history
+        self.sellhist = history.follow(self, self.window, SELL)
+        self.buyhist = history.follow(self, self.window, BUY)
+        if self.window is None:
+            self.successes = history.follow(self)
+        else:
+            self.successes = None
 
     def act(self, world=None, market=None):
         """
@@ -88,26 +130,34 @@ class AvgBuySellTrader(agents.Agent):
 
         Avoid short selling and levering up (borrowing).
         """
-        successes = self.sellhist + self.buyhist
-        bids = self.sellbids + self.buybids
+        successes = len(self.sellhist) + len(self.buyhist)
+        bids = len(self.sellbids) + len(self.buybids)
         sellprice = 0
         buyprice = 0
-        if successes:
+        if self.successes:
             # Average price of successful bids
-            stockprice = float(sum(successes))/len(successes)
+            stockprice = self.successes.mean()
+        elif successes:
+            # windows are per side : add their sums
+            stockprice = float(self.sellhist.total +
+                    self.buyhist.total)/successes
         else:
-            stockprice = random.randint(1, self.maxprice*100)/100.
+            stockprice = self.rng.randint(1, self.maxprice*100)/100.
         if self.sellhist:
             # Average price of successful sells
-            sellprice = float(sum(self.sellhist))/len(self.sellhist)
+            sellprice = self.sellhist.mean()
         if self.buyhist:
             # Average price of successful buys
-            buyprice = float(sum(self.buyhist))/len(self.buyhist)
-        if bids:
+            buyprice = self.buyhist.mean()
+        if self.bids:
             # Average price of bids
-            bidprice = float(sum(bids))/len(bids)
+            bidprice = self.bids.mean()
+        elif bids:
+            # windows are per side : add their sums
+            bidprice = float(self.sellbids.total +
+                    self.buybids.total)/bids
         else:
-            bidprice = random.randint(1, self.maxprice*100)/100.
+            bidprice = self.rng.randint(1, self.maxprice*100)/100.
 
         # Set the buy or sell price as a weighted average of 
         # successful bid %  * avg successful price and
@@ -119,14 +169,14 @@ class AvgBuySellTrader(agents.Agent):
             sellprice = int(sellprice / len(self.sellbids) * 100)/100.
         except ZeroDivisionError:
             # No sell bids
-            sellprice = random.randint(1, self.maxprice*100)/100.
+            sellprice = self.rng.randint(1, self.maxprice*100)/100.
         buyprice = buyprice * len(self.buyhist) + \
                    bidprice * (len(self.buybids)-len(self.buyhist))
         try:
             buyprice = int(buyprice / len(self.buybids) * 100)/100.
         except ZeroDivisionError:
             # No buy bids
-            buyprice = random.randint(1, self.maxprice*100)/100.
+            buyprice = self.rng.randint(1, self.maxprice*100)/100.
         sellquant = self.stocks
 	if buyprice == 0:
 	    buyprice = 0.01
@@ -143,11 +193,15 @@ class AvgBuySellTrader(agents.Agent):
             price = sellprice
             quantity = sellquant
             self.sellbids.append(price)
+            if self.bids is not None:
+                self.bids.append(price)
         else:
             direction = BUY
             price = buyprice
             quantity = buyquant
             self.buybids.append(price)
+            if self.bids is not None:
+                self.bids.append(price)
         return {'direction':direction, 'price':price, 'quantity':quantity}
         
     def record(self, direction, price, quantity):
@@ -157,11 +211,17 @@ class AvgBuySellTrader(agents.Agent):
         if direction:
             self.stocks -= quantity
             self.money += quantity*price
-            self.sellhist.append(price)
+            if self.history is None:
+                self.sellhist.append(price)
+                if self.successes is not None:
+                    self.successes.append(price)
         else:
             self.stocks += quantity
             self.money -= quantity*price
-            self.buyhist.append(price)
+            if self.history is None:
+                self.buyhist.append(price)
+                if self.successes is not None:
+                    self.successes.append(price)
 
 def _test():
     """
@@ -4,13 +4,10 @@
 Module defining DefectorTrader agent class.
 """
 
-import random
-
-from fms import agents
 from fms.utils import BUY, SELL
-from fms.utils.exceptions import MissingParameter
+from fms.contrib.coleman.agents.memorytrader import MemoryTrader
 
-class DefectorTrader(agents.Agent):
+class DefectorTrader(MemoryTrader):
     """
     Simulate an agent taking defecting from average decision
 
@@ -20,19 +17,19 @@ class DefectorTrader(agents.Agent):
     - maxbuy : maximum quantity to buy (int)
     If any of those parameters is missing, a MissingParameter
     exception is raised.
-    >>> from fms.agents import zerointelligencetrader
+    >>> from fms.contrib.coleman.agents.defectortrader import DefectorTrader
     >>> params = {'agents': [{'money':10000, 'stocks':200}]}
-    >>> agent = zerointelligencetrader.ZeroIntelligenceTrader(params)
+    >>> agent = DefectorTrader(params)
     Traceback (most recent call last):
         ...
     MissingParameter: maxprice
     >>> params = {'agents': [{'money':10000, 'stocks':200, 'args':[999]}]}
-    >>> agent = zerointelligencetrader.ZeroIntelligenceTrader(params)
+    >>> agent = DefectorTrader(params)
     Traceback (most recent call last):
         ...
     MissingParameter: maxbuy
     >>> params = {'agents': [{'money':10000, 'stocks':200, 'args':[999, 100]}]}
-    >>> agent = zerointelligencetrader.ZeroIntelligenceTrader(params)
+    >>> agent = DefectorTrader(params)
     >>> print agent.state()
     Agent ... - owns $10000.00 and    200 securities
     >>> print agent.maxprice
@@ -43,7 +40,8 @@ class DefectorTrader(agents.Agent):
     The DefectorTrader acts by returning a
     dict with (direction, price, quantity) keys.
     Avg price is shifted up slightly for selling and down for buying. 
-    Leverage discouraged.
+    The average is taken over all the agent successes, see
+    MemoryTrader. Bids are not remembered. Leverage discouraged.
     >>> len(agent.act())
     3
 
@@ -55,18 +53,10 @@ class DefectorTrader(agents.Agent):
     Thus, shortselling is not allowed.
     """
     
-    def __init__(self, params, offset=0):
-        agents.Agent.__init__(self, params, offset)
-        try:
-            self.maxprice = self.args[0]
-        except (AttributeError, IndexError):
-            raise MissingParameter, 'maxprice'
-        try:
-            self.maxbuy = self.args[1]
-        except IndexError:
-            raise MissingParameter, 'maxbuy'
-        del self.args
-        self.orders = list()
+    __slots__ = ()
+    mem = None
+    defect = True
+    keepbids = False
 
     def act(self, world=None, market=None):
         """
@@ -79,39 +69,27 @@ class DefectorTrader(agents.Agent):
         is zero or negative, force SELL.
         """
         if self.stocks > 0 and self.money > 0:
-            direction = random.choice((BUY, SELL))
+            direction = self.rng.choice((BUY, SELL))
         elif self.stocks <= 0:
             # Short selling is forbidden
             direction = BUY
         else:
             # money<=0, levering is discouraged
             direction = SELL
-        shift = int(random.random() * self.maxprice * 10)/100.
-        if len(self.orders) < 5:
+        shift = self.draw_shift()
+        if len(self.successes) < 5:
             # Try some random bids before defecting
-            price = random.randint(1, self.maxprice*100)/100.
+            price = self.rng.randint(1, self.maxprice*100)/100.
         else:
-            price = int(float(sum(self.orders))/len(self.orders)*100)/100.
+            price = int(self.successes.mean()*100)/100.
         if direction:
             price += shift
-            quantity = random.randint(1, self.stocks)
+            quantity = self.rng.randint(1, self.stocks)
         else:
             price -= shift
-            quantity = random.randint(1, self.maxbuy)
+            quantity = self.rng.randint(1, self.maxbuy)
         return {'direction':direction, 'price':price, 'quantity':quantity}
 
-    def record(self, direction, price, quantity):
-        """
-        Record transaction
-        """
-        if direction:
-            self.stocks -= quantity
-            self.money += quantity*price
-        else:
-            self.stocks += quantity
-            self.money -= quantity*price
-        self.orders.append(price)
-
 def _test():
     """
     Run tests in docstrings
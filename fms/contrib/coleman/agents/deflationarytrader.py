@@ -4,13 +4,11 @@
 Module defining DeflationaryTrader agent class.
 """
 
-import random
-
 from fms import agents
 from fms.utils import BUY, SELL
 from fms.utils.exceptions import MissingParameter
 
-class DeflationaryTrader(agents.Agent):
+class DeflationaryTrader(agents.SlottedAgent):
     """
     Simulate an agent taking random decisions
 
@@ -55,9 +53,12 @@ class DeflationaryTrader(agents.Agent):
       - if direction==SELL, [1,self.stocks]
     Thus, shortselling is not allowed.
     """
-    
+
+    __slots__ = ()
+    cloneable = True
+
     def __init__(self, params, offset=0):
-        agents.Agent.__init__(self, params, offset)
+        agents.SlottedAgent.__init__(self, params, offset)
         try:
             self.maxprice = self.args[0]
         except (AttributeError, IndexError):
@@ -79,7 +80,7 @@ class DeflationaryTrader(agents.Agent):
         is zero or negative, force SELL.
         """
         if self.stocks > 0 and self.money > 0:
-            direction = random.choice((BUY, SELL))
+            direction = self.rng.choice((BUY, SELL))
         elif self.stocks <= 0:
             # Short selling is forbidden
             direction = BUY
@@ -88,9 +89,9 @@ class DeflationaryTrader(agents.Agent):
             direction = SELL
         price = 0.01
         if direction:
-            quantity = random.randint(1, self.stocks)
+            quantity = self.rng.randint(1, self.stocks)
         else:
-            quantity = random.randint(1, self.maxbuy)
+            quantity = self.rng.randint(1, self.maxbuy)
         return {'direction':direction, 'price':price, 'quantity':quantity}
 
 def _test():
@@ -0,0 +1,216 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+"""
+Module defining MemoryTrader agent class.
+"""
+
+from fms import agents
+from fms.utils import BUY, SELL
+from fms.utils.exceptions import MissingParameter
+from fms.utils.stats import RunningStats, SortedHistory
+
+class MemoryTrader(agents.SlottedAgent):
+    """
+    Simulate an agent taking random decisions, bounded by the
+    prices of its last successes and its bids.
+
+    This is the base class of the coleman memory traders family.
+    Subclasses are configurations of it, through class attributes :
+    - mem : number of successes remembered (None: all of them)
+    - defect : if True, shift prices by a random amount, up when
+      selling, down when buying
+    - keepbids : if False, bids are not remembered, for subclasses
+      whose act() does not bound prices by them
+
+    This agent subclass should have two keys in the
+    args dict :
+    - maxprice : maximum order price (float)
+    - maxbuy : maximum quantity to buy (int)
+    If any of those parameters is missing, a MissingParameter
+    exception is raised.
+    An optional third item, maxbids (int), caps the number of
+    bids the agent remembers. If missing, all bids are remembered.
+    >>> from fms.contrib.coleman.agents.memorytrader import MemoryTrader
+    >>> params = {'agents': [{'money':10000, 'stocks':200}]}
+    >>> agent = MemoryTrader(params)
+    Traceback (most recent call last):
+        ...
+    MissingParameter: maxprice
+    >>> params = {'agents': [{'money':10000, 'stocks':200, 'args':[999]}]}
+    >>> agent = MemoryTrader(params)
+    Traceback (most recent call last):
+        ...
+    MissingParameter: maxbuy
+    >>> params = {'agents': [{'money':10000, 'stocks':200, 'args':[999, 100]}]}
+    >>> agent = MemoryTrader(params)
+    >>> print agent.state()
+    Agent ... - owns $10000.00 and    200 securities
+    >>> print agent.maxprice
+    999
+    >>> print agent.maxbuy
+    100
+
+    Successes are kept in a fixed size ring buffer, with a running
+    sum and their lowest and highest prices, so that recording a
+    transaction and bounding a price are O(1), and bids in a sorted
+    history (see fms.utils.stats). If the experiment keeps a market
+    history, successes are kept there instead.
+    >>> from fms.utils import BUY
+    >>> for price in (1.0, 2.0, 3.0, 4.0, 5.0, 6.0):
+    ...     agent.record(BUY, price, 1)
+    >>> list(agent.successes.values), agent.successes.mean()
+    ([2.0, 3.0, 4.0, 5.0, 6.0], 4.0)
+    >>> agent.successes.min(), agent.successes.max()
+    (2.0, 6.0)
+
+    The ring buffer is a deque rather than a NumPy array : windows
+    hold a handful of prices, updated one transaction at a time, and
+    NumPy operations on such small arrays cost several times more
+    than the deque ones. Nor are orders drawn for a whole population
+    at once (see ZeroIntelligenceTrader.block_act()) : each price is
+    bounded by a search in the agent own sorted bids, which differ in
+    length from one agent to the other, and a successful order
+    changes the bounds of the next one.
+
+    The MemoryTrader acts by returning a
+    dict with (direction, price, quantity) keys.
+    The 3 elements of the dict are randomly chosen,
+    in uniform distributions bounded by the previous
+    mem successes and all bids.
+    >>> len(agent.act())
+    3
+
+    - direction is buy or sell
+    - price is a %.2f float in [0.01,maxprice]
+    - quantity is an int in :
+      - if direction==BUY, [1,self.maxbuy]
+      - if direction==SELL, [1,self.stocks]
+    Thus, shortselling is not allowed.
+    """
+
+    __slots__ = ('maxbids', 'successes', 'bids', 'history')
+    mem = 5
+    defect = False
+    keepbids = True
+    cloneable = True
+
+    def __init__(self, params, offset=0):
+        agents.SlottedAgent.__init__(self, params, offset)
+        try:
+            self.maxprice = self.args[0]
+        except (AttributeError, IndexError):
+            raise MissingParameter, 'maxprice'
+        try:
+            self.maxbuy = self.args[1]
+        except IndexError:
+            raise MissingParameter, 'maxbuy'
+        if self.keepbids:
+            try:
+                self.maxbids = self.args[2]
+            except IndexError:
+                self.maxbids = None
+        del self.args
+        self.history = None
+        self.init_state()
+
+    def init_state(self):
+        """
+        Create empty successes and bids histories
+        """
+        # Prices of previous self.mem successfull bids
+        if self.history is None:
+            self.successes = RunningStats(self.mem, True)
+        else:
+            self.successes = self.history.follow(self, self.mem)
+        # All bids, sorted
+        if self.keepbids:
+            self.bids = SortedHistory(self.maxbids)
+
+    def attach_history(self, history):
+        """
+        Let the market history keep successes
+        """
+        self.history = history
+        self.successes = history.follow(self, self.mem)
+
+    def draw_shift(self):
+        """
+        Return random price shift of a defecting agent, 0 otherwise.
+        """
+        if self.defect:
+            return int(self.rng.random() * self.maxprice * 10)/100.
+        return 0.
+
+    def act(self, world=None, market=None):
+        """
+        Return order as a dict with keys in (direction, price, quantity).
+        If SELL, pick price between highest success, next highest bid.
+        If BUY, pick price between lowest success, next lowest bid.
+
+        To avoid short selling as far as possible, if # of stocks
+        is zero or negative, force BUY direction.
+
+        To avoid levering up as far as possible, if money
+        is zero or negative, force SELL.
+        """
+        if self.stocks > 0 and self.money > 0:
+            direction = self.rng.choice((BUY, SELL))
+        elif self.stocks <= 0:
+            # Short selling is forbidden
+            direction = BUY
+        else:
+            # money<=0, levering is discouraged
+            direction = SELL
+        shift = self.draw_shift()
+        if direction:
+            # SELL
+            try:
+                minp = self.successes.max()
+            except ValueError:
+                # No successes
+                minp = 0.01
+            try:
+                maxp = self.bids.successor(minp)
+            except ValueError:
+                # No higher bids
+                maxp = self.maxprice
+            quantity = self.rng.randint(1, self.stocks)
+        else:
+            # BUY
+            try:
+                maxp = self.successes.min()
+            except ValueError:
+                # No successes
+                maxp = self.maxprice
+            try:
+                minp = self.bids.predecessor(maxp)
+            except ValueError:
+                # No lower bids
+                minp = 0.01
+            quantity = self.rng.randint(1, self.maxbuy)
+        price = self.rng.randint(int(minp*100), int(maxp*100))/100.
+        if direction:
+            price += shift
+        else:
+            price -= shift
+        self.bids.append(price)
+        return {'direction':direction, 'price':price, 'quantity':quantity}
+
+    def record(self, direction, price, quantity):
+        """
+        Record transaction
+        """
+        agents.SlottedAgent.record(self, direction, price, quantity)
+        if self.history is None:
+            self.successes.append(price)
+
+
+def _test():
+    """
+    Run tests in docstrings
+    """
+    import doctest
+    doctest.testmod(optionflags=+doctest.ELLIPSIS)
+
+if __name__ == '__main__':
+    _test()
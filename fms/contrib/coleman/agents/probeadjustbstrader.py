@@ -5,13 +5,11 @@ Module defining ProbeAdjustBSTrader agent class.
 """
 # Author: Patrick Coleman (Wharton Undergraduate 2012)
 
-import random
-
 from fms import agents
 from fms.utils import BUY, SELL
 from fms.utils.exceptions import MissingParameter
 
-class ProbeAdjustBSTrader(agents.Agent):
+class ProbeAdjustBSTrader(agents.SlottedAgent):
     """
     Simulate an agent probing and adjusting
     with shared data for BUY, SELL orders
@@ -57,9 +55,12 @@ class ProbeAdjustBSTrader(agents.Agent):
       - if direction==SELL, [1,self.stocks]
     Thus, shortselling is not allowed.
     """
-    
+
+    __slots__ = ('prevorder',)
+    cloneable = True
+
     def __init__(self, params, offset=0):
-        agents.Agent.__init__(self, params, offset)
+        agents.SlottedAgent.__init__(self, params, offset)
         try:
             self.maxprice = self.args[0]
         except (AttributeError, IndexError):
@@ -86,7 +87,7 @@ class ProbeAdjustBSTrader(agents.Agent):
         is zero or negative, force SELL.
         """
         if self.stocks > 0 and self.money > 0:
-            direction = random.choice((BUY, SELL))
+            direction = self.rng.choice((BUY, SELL))
         elif self.stocks <= 0:
             # Short selling is forbidden
             direction = BUY
@@ -95,20 +96,20 @@ class ProbeAdjustBSTrader(agents.Agent):
             direction = SELL
         if direction:
             if self.prevorder[1]:
-                price = random.randint(int(self.prevorder[0]*100), \
+                price = self.rng.randint(int(self.prevorder[0]*100), \
                         self.maxprice*100)/100.
             else:
-                price = random.randint(1, \
+                price = self.rng.randint(1, \
                         int(self.prevorder[0]*100))/100.
-            quantity = random.randint(1, self.stocks)
+            quantity = self.rng.randint(1, self.stocks)
         else:
             if self.prevorder[1]:
-                price = random.randint(1, \
+                price = self.rng.randint(1, \
                         int(self.prevorder[0]*100))/100.
             else:
-                price = random.randint(int(self.prevorder[0]*100), \
+                price = self.rng.randint(int(self.prevorder[0]*100), \
                         self.maxprice*100)/100.
-            quantity = random.randint(1, self.maxbuy)
+            quantity = self.rng.randint(1, self.maxbuy)
         self.prevorder = [price, False]
         return {'direction':direction, 'price':price, 'quantity':quantity}
 
@@ -5,13 +5,11 @@ Module defining ProbeAdjustTrader agent class.
 """
 # Author: Patrick Coleman (Wharton Undergraduate 2012)
 
-import random
-
 from fms import agents
 from fms.utils import BUY, SELL
 from fms.utils.exceptions import MissingParameter
 
-class ProbeAdjustTrader(agents.Agent):
+class ProbeAdjustTrader(agents.SlottedAgent):
     """
     Simulate an agent probing and adjusting
 
@@ -56,9 +54,12 @@ class ProbeAdjustTrader(agents.Agent):
       - if direction==SELL, [1,self.stocks]
     Thus, shortselling is not allowed.
     """
-    
+
+    __slots__ = ('prevorder',)
+    cloneable = True
+
     def __init__(self, params, offset=0):
-        agents.Agent.__init__(self, params, offset)
+        agents.SlottedAgent.__init__(self, params, offset)
         try:
             self.maxprice = self.args[0]
         except (AttributeError, IndexError):
@@ -68,6 +69,12 @@ class ProbeAdjustTrader(agents.Agent):
         except IndexError:
             raise MissingParameter, 'maxbuy'
         del self.args
+        self.init_state()
+
+    def init_state(self):
+        """
+        Set previous orders to price bounds
+        """
         # {BUY: [prevprice, success], SELL: [prevprice, sucess]}
         self.prevorder = {BUY: [0.01, False], SELL: [self.maxprice, False]}
 
@@ -85,7 +92,7 @@ class ProbeAdjustTrader(agents.Agent):
         is zero or negative, force SELL.
         """
         if self.stocks > 0 and self.money > 0:
-            direction = random.choice((BUY, SELL))
+            direction = self.rng.choice((BUY, SELL))
         elif self.stocks <= 0:
             # Short selling is forbidden
             direction = BUY
@@ -94,20 +101,20 @@ class ProbeAdjustTrader(agents.Agent):
             direction = SELL
         if direction:
             if self.prevorder[SELL][1]:
-                price = random.randint(int(self.prevorder[SELL][0]*100), \
+                price = self.rng.randint(int(self.prevorder[SELL][0]*100), \
                         self.maxprice*100)/100.
             else:
-                price = random.randint(1, \
+                price = self.rng.randint(1, \
                         int(self.prevorder[SELL][0]*100))/100.
-            quantity = random.randint(1, self.stocks)
+            quantity = self.rng.randint(1, self.stocks)
         else:
             if self.prevorder[BUY][1]:
-                price = random.randint(1, \
+                price = self.rng.randint(1, \
                         int(self.prevorder[BUY][0]*100))/100.
             else:
-                price = random.randint(int(self.prevorder[BUY][0]*100), \
+                price = self.rng.randint(int(self.prevorder[BUY][0]*100), \
                         self.maxprice*100)/100.
-            quantity = random.randint(1, self.maxbuy)
+            quantity = self.rng.randint(1, self.maxbuy)
         self.prevorder[direction] = [price, False]
         return {'direction':direction, 'price':price, 'quantity':quantity}
 
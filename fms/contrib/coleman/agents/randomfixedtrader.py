@@ -4,13 +4,11 @@
 Module defining RandomFixedTrader agent class.
 """
 
-import random
-
 from fms import agents
 from fms.utils import BUY, SELL
 from fms.utils.exceptions import MissingParameter
 
-class RandomFixedTrader(agents.Agent):
+class RandomFixedTrader(agents.SlottedAgent):
     """
     Simulate an agent taking random decisions
 
@@ -54,9 +52,12 @@ class RandomFixedTrader(agents.Agent):
       - if direction==SELL, [1,self.stocks]
     Thus, shortselling is not allowed.
     """
-    
+
+    __slots__ = ('buyprice', 'sellprice')
+    cloneable = True
+
     def __init__(self, params, offset=0):
-        agents.Agent.__init__(self, params, offset)
+        agents.SlottedAgent.__init__(self, params, offset)
         try:
             self.maxprice = self.args[0]
         except (AttributeError, IndexError):
@@ -66,7 +67,13 @@ class RandomFixedTrader(agents.Agent):
         except IndexError:
             raise MissingParameter, 'maxbuy'
         del self.args
-        self.buyprice = random.randint(1, self.maxprice*100)/100.
+        self.init_state()
+
+    def init_state(self):
+        """
+        Draw the fixed price
+        """
+        self.buyprice = self.rng.randint(1, self.maxprice*100)/100.
         self.sellprice = self.buyprice
 
     def act(self, world=None, market=None):
@@ -81,7 +88,7 @@ class RandomFixedTrader(agents.Agent):
         is zero or negative, force SELL.
         """
         if self.stocks > 0 and self.money > 0:
-            direction = random.choice((BUY, SELL))
+            direction = self.rng.choice((BUY, SELL))
         elif self.stocks <= 0:
             # Short selling is forbidden
             direction = BUY
@@ -90,10 +97,10 @@ class RandomFixedTrader(agents.Agent):
             direction = SELL
         if direction:
             price = self.sellprice
-            quantity = random.randint(1, self.stocks)
+            quantity = self.rng.randint(1, self.stocks)
         else:
             price = self.buyprice
-            quantity = random.randint(1, self.maxbuy)
+            quantity = self.rng.randint(1, self.maxbuy)
         return {'direction':direction, 'price':price, 'quantity':quantity}
 
 def _test():
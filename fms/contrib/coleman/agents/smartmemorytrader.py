@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+"""
+Module defining SmartMemoryTrader agent class.
+"""
+
+from fms.utils import BUY, SELL
+from fms.contrib.coleman.agents.memorytrader import MemoryTrader
+
+class SmartMemoryTrader(MemoryTrader):
+    """
+    Simulate an agent taking decisions
+    bounded by previous success.
+
+    This is the base class of the coleman smart memory traders, and is
+    configured as MemoryTrader, through the mem and defect class
+    attributes. It takes the same args, and keeps the same state (see
+    MemoryTrader for why it is not made of NumPy arrays).
+    >>> from fms.contrib.coleman.agents.smartmemorytrader import SmartMemoryTrader
+    >>> params = {'agents': [{'money':10000, 'stocks':200, 'args':[999, 100]}]}
+    >>> agent = SmartMemoryTrader(params)
+    >>> print agent.state()
+    Agent ... - owns $10000.00 and    200 securities
+
+    The SmartMemoryTrader acts by returning a
+    dict with (direction, price, quantity) keys.
+    Price is randomly chosen,
+    in uniform distribution bounded by the previous
+    mem successes and all bids.
+    It tries to maximize buy and sell quantities and
+    chooses buy or sell based on projected wealth.
+    >>> len(agent.act())
+    3
+
+    - direction is buy or sell
+    - price is a %.2f float in [0.01,maxprice]
+    - quantity is an int in :
+      - if direction==BUY, [1,self.maxbuy]
+      - if direction==SELL, [1,self.stocks]
+    Thus, shortselling is not allowed.
+    """
+
+    __slots__ = ()
+
+    def nosuccess_bounds(self):
+        """
+        Return (lowest sell price, highest buy price) used while
+        no success is remembered.
+        """
+        return 0.01, self.maxprice
+
+    def act(self, world=None, market=None):
+        """
+        Return order as a dict with keys in (direction, price, quantity).
+        If SELL, pick price between highest success, next highest bid.
+        If BUY, pick price between lowest success, next lowest bid.
+
+        Avoid short selling and levering up (borrowing).
+        """
+        shift = self.draw_shift()
+        if self.successes:
+            # Average price of successful bids. The window is short :
+            # summing it again in chronological order keeps the very
+            # same averages, running sum may differ by rounding errors
+            stockprice = float(sum(self.successes.get_values())) / \
+                    len(self.successes)
+        else:
+            stockprice = self.rng.randint(1, self.maxprice*100)/100.
+        lowsell, highbuy = self.nosuccess_bounds()
+
+        try:
+            minp = self.successes.max()
+        except ValueError:
+            # No successes
+            minp = lowsell
+        try:
+            maxp = self.bids.successor(minp)
+        except ValueError:
+            # No higher bids
+            maxp = self.maxprice
+        sellprice = self.rng.randint(int(minp*100), int(maxp*100))/100.
+        sellquant = self.stocks
+        try:
+            maxp = self.successes.min()
+        except ValueError:
+            # No successes
+            maxp = highbuy
+        try:
+            minp = self.bids.predecessor(maxp)
+        except ValueError:
+            # No lower bids
+            minp = 0.01
+        buyprice = self.rng.randint(int(minp*100), int(maxp*100))/100.
+        if buyprice <= 0:
+            buyprice = 0.01
+        buyquant = int(self.money/buyprice)
+
+        # Choose buy or sell, place order
+        # Wealth if trader sells all his stock
+        sellwealth = self.money + sellquant*sellprice
+        # Wealth if trader uses as much money as possible to buy
+        buywealth = self.money - buyquant*buyprice + \
+                    (self.stocks + buyquant)*stockprice
+        if sellwealth > buywealth:
+            direction = SELL
+            price = sellprice + shift
+            quantity = sellquant
+        else:
+            direction = BUY
+            price = buyprice - shift
+            quantity = buyquant
+        self.bids.append(price)
+        return {'direction':direction, 'price':price, 'quantity':quantity}
+
+
+def _test():
+    """
+    Run tests in docstrings
+    """
+    import doctest
+    doctest.testmod(optionflags=+doctest.ELLIPSIS)
+
+if __name__ == '__main__':
+    _test()
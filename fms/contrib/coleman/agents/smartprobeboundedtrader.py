@@ -5,13 +5,12 @@ Module defining SmartProbeBoundedTrader agent class.
 """
 # Author: Patrick Coleman (Wharton Undergraduate 2012)
 
-import random
-
 from fms import agents
 from fms.utils import BUY, SELL
 from fms.utils.exceptions import MissingParameter
+from fms.utils.stats import RunningStats
 
-class SmartProbeBoundedTrader(agents.Agent):
+class SmartProbeBoundedTrader(agents.SlottedAgent):
     """
     Simulate an agent probing and adjusting while
     not moving beyond reservation prices.
@@ -57,9 +56,12 @@ class SmartProbeBoundedTrader(agents.Agent):
       - if direction==SELL, [1,self.stocks]
     Thus, shortselling is not allowed.
     """
-    
+
+    __slots__ = ('prevorder', 'resbuy', 'ressell', 'successes', 'history')
+    cloneable = True
+
     def __init__(self, params, offset=0):
-        agents.Agent.__init__(self, params, offset)
+        agents.SlottedAgent.__init__(self, params, offset)
         try:
             self.maxprice = self.args[0]
         except (AttributeError, IndexError):
@@ -69,14 +71,31 @@ class SmartProbeBoundedTrader(agents.Agent):
         except IndexError:
             raise MissingParameter, 'maxbuy'
         del self.args
+        self.history = None
+        self.init_state()
+
+    def init_state(self):
+        """
+        Set previous orders to price bounds, draw reservation prices
+        """
         # {BUY: [prevprice, success], SELL: [prevprice, sucess]}
         self.prevorder = {BUY: [0.01, False], SELL: [self.maxprice, False]}
         # Reservation prices
-        self.resbuy = random.randint(1, int(self.maxprice*50))/100.
-        self.ressell = random.randint(int(self.maxprice*50), \
+        self.resbuy = self.rng.randint(1, int(self.maxprice*50))/100.
+        self.ressell = self.rng.randint(int(self.maxprice*50), \
                                           self.maxprice*100)/100.
         # Successful bids
-        self.successes = list()
+        if self.history is None:
+            self.successes = RunningStats()
+        else:
+            self.successes = self.history.follow(self)
+
+    def attach_history(self, history):
+        """
+        Let the market history keep successes
+        """
+        self.history = history
+        self.successes = history.follow(self)
 
     def act(self, world=None, market=None):
         """
@@ -92,23 +111,23 @@ class SmartProbeBoundedTrader(agents.Agent):
         is zero or negative, force SELL.
         """
         if self.successes:
-            # Average price of successful bids
-            stockprice = float(sum(self.successes))/len(self.successes)
+            # Average price of successful bids, summed as they came
+            stockprice = self.successes.mean()
         else:
-            stockprice = random.randint(1, self.maxprice*100)/100.
+            stockprice = self.rng.randint(1, self.maxprice*100)/100.
 
         if self.prevorder[SELL][1]:
-            sellprice = random.randint(int(self.prevorder[SELL][0]*100), \
+            sellprice = self.rng.randint(int(self.prevorder[SELL][0]*100), \
                         self.maxprice*100)/100.
         else:
-            sellprice = random.randint(int(self.ressell*100-1), \
+            sellprice = self.rng.randint(int(self.ressell*100-1), \
                         int(self.prevorder[SELL][0]*100+1))/100.
         sellquant = self.stocks
         if self.prevorder[BUY][1]:
-            buyprice = random.randint(1, \
+            buyprice = self.rng.randint(1, \
                        int(self.prevorder[BUY][0]*100))/100.
         else:
-            buyprice = random.randint(int(self.prevorder[BUY][0]*100-1), \
+            buyprice = self.rng.randint(int(self.prevorder[BUY][0]*100-1), \
                        int(self.resbuy*100+1))/100.
         if buyprice <= 0:
             buyprice = 0.01
@@ -143,7 +162,8 @@ class SmartProbeBoundedTrader(agents.Agent):
             self.stocks += quantity
             self.money -= quantity*price
             self.prevorder[BUY] = [price, True]
-        self.successes.append(price)
+        if self.history is None:
+            self.successes.append(price)
 
 
 def _test():
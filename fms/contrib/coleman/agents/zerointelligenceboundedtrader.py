@@ -4,13 +4,11 @@
 Module defining ZeroIntelligenceBoundedTrader agent class.
 """
 
-import random
-
 from fms import agents
 from fms.utils import BUY, SELL
 from fms.utils.exceptions import MissingParameter
 
-class ZeroIntelligenceBoundedTrader(agents.Agent):
+class ZeroIntelligenceBoundedTrader(agents.SlottedAgent):
     """
     Simulate an agent taking random decisions
 
@@ -56,9 +54,12 @@ class ZeroIntelligenceBoundedTrader(agents.Agent):
       - if direction==SELL, [1,self.stocks]
     Thus, shortselling is not allowed.
     """
-    
+
+    __slots__ = ()
+    cloneable = True
+
     def __init__(self, params, offset=0):
-        agents.Agent.__init__(self, params, offset)
+        agents.SlottedAgent.__init__(self, params, offset)
         try:
             self.maxprice = self.args[0]
         except (AttributeError, IndexError):
@@ -80,7 +81,7 @@ class ZeroIntelligenceBoundedTrader(agents.Agent):
         is zero or negative, force SELL.
         """
         if self.stocks > 0 and self.money > 0:
-            direction = random.choice((BUY, SELL))
+            direction = self.rng.choice((BUY, SELL))
         elif self.stocks <= 0:
             # Short selling is forbidden
             direction = BUY
@@ -88,12 +89,12 @@ class ZeroIntelligenceBoundedTrader(agents.Agent):
             # money<=0, levering is discouraged
             direction = SELL
         if direction:
-            price = random.randint(int(self.maxprice*100/3.), \
+            price = self.rng.randint(int(self.maxprice*100/3.), \
                                    self.maxprice*100)/100.
-            quantity = random.randint(1, self.stocks)
+            quantity = self.rng.randint(1, self.stocks)
         else:
-            price = random.randint(1, int(self.maxprice*200/3.))/100.
-            quantity = random.randint(1, self.maxbuy)
+            price = self.rng.randint(1, int(self.maxprice*200/3.))/100.
+            quantity = self.rng.randint(1, self.maxbuy)
         return {'direction':direction, 'price':price, 'quantity':quantity}
 
 def _test():
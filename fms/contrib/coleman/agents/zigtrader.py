@@ -4,13 +4,11 @@
 Module defining ZigTrader agent class.
 """
 
-import random
-
 from fms import agents
 from fms.utils import BUY, SELL
 from fms.utils.exceptions import MissingParameter
 
-class ZigTrader(agents.Agent):
+class ZigTrader(agents.SlottedAgent):
     """
     Simulate an agent taking random decisions
 
@@ -55,9 +53,12 @@ class ZigTrader(agents.Agent):
       - if direction==SELL, [1,self.stocks]
     Thus, shortselling is not allowed.
     """
-    
+
+    __slots__ = ('prevprice', 'updown')
+    cloneable = True
+
     def __init__(self, params, offset=0):
-        agents.Agent.__init__(self, params, offset)
+        agents.SlottedAgent.__init__(self, params, offset)
         try:
             self.maxprice = self.args[0]
         except (AttributeError, IndexError):
@@ -82,7 +83,7 @@ class ZigTrader(agents.Agent):
         is zero or negative, force SELL.
         """
         if self.stocks > 0 and self.money > 0:
-            direction = random.choice((BUY, SELL))
+            direction = self.rng.choice((BUY, SELL))
         elif self.stocks <= 0:
             # Short selling is forbidden
             direction = BUY
@@ -94,15 +95,15 @@ class ZigTrader(agents.Agent):
         if self.prevprice == self.maxprice:
             self.updown = 0
         if self.updown:
-            price = min(self.prevprice + random.randint(1, \
+            price = min(self.prevprice + self.rng.randint(1, \
                         self.maxprice*10)/100., self.maxprice)
         else:
-            price = max(self.prevprice - random.randint(1, \
+            price = max(self.prevprice - self.rng.randint(1, \
                         self.maxprice*10)/100., 0.01)
         if direction:
-            quantity = random.randint(1, self.stocks)
+            quantity = self.rng.randint(1, self.stocks)
         else:
-            quantity = random.randint(1, self.maxbuy)
+            quantity = self.rng.randint(1, self.maxbuy)
         self.prevprice = price
         return {'direction':direction, 'price':price, 'quantity':quantity}
 
@@ -9,6 +9,11 @@ __license__ = "BSD"
 
 import sys
 import dumbstartfms
+from fms.utils.files import open_file
+
+# output files extension, may end with a compression one (see
+# fms.utils.files)
+OUTPUTEXTENSION = '.csv'
 
 def main():
     """
@@ -77,7 +82,7 @@ def main():
             yamltowrite = open(expname + '.yml', 'w')
             linestowrite = []
             linestowrite.append('--- # Experiment ' + str(expnum))     
-            linestowrite.append('outputfilename: ' + expname + '.csv')
+            linestowrite.append('outputfilename: ' + expname + OUTPUTEXTENSION)
             linestowrite.append('orderslogfilename: ' + expname + '.log')
             yamltoread = open('template.yml', 'r')
             for line in yamltoread:
@@ -126,7 +131,7 @@ def wealth_tester(expname):
         print "Check the wealth file."
    
     try:
-       transactionfile = open(expname + '.csv')    
+       transactionfile = open_file(expname + OUTPUTEXTENSION, 'r')
     except IOError:
         print "Error in passing the csv file"
     
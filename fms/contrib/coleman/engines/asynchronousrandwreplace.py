@@ -33,9 +33,8 @@ class AsynchronousRandWReplace(Engine):
         As market is asynchronous, as soon as an agent speaks, do_clearing
         is called to execute any possible transaction immediately.
         """
-        market.sellbook = world.state()['sellbook']
+        market.set_state(world.state())
         logger.debug("Starting with sellbook %s" % market.sellbook)
-        market.buybook = world.state()['buybook']
         logger.debug("Starting with buybook %s" % market.buybook)
         for day in range(self.days):
             for time in range(self.daylength):
@@ -68,6 +67,7 @@ class AsynchronousRandWReplace(Engine):
                     world.show_time(day, time, self.days*self.daylength)
             if self.clearbooksateod:
                 market.clear_books()
+            market.flush_transactions()
 	wealthname = market.outputfile.name.split('.')[0] + 'wealth.csv'
 	fwealth = file(wealthname, 'w')
         mask = ';'.join(('%d','%d','%s','%d','%d'))
@@ -79,6 +79,7 @@ class AsynchronousRandWReplace(Engine):
                                    agent.stocks)
 	fwealth.close()
 
+        world.lastmarketinfo.update(market.get_state())
         logger.debug("Ending with sellbook %s" % market.sellbook)
         logger.debug("Ending with buybook %s" % market.buybook)
 
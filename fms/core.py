@@ -9,8 +9,15 @@ import os
 import optparse
 import logging
 
-from fms.utils import COMMANDS, OPTS_VAL, OPTS_BOOL
+from fms.utils import COMMANDS, ORDERSLOGFORMATS, OUTPUTFORMATS
+from fms.utils import OPTS_VAL, OPTS_BOOL
 from fms.utils.parsers import XmlParamsParser, YamlParamsParser
+from fms.agents.agentpool import AgentPool
+from fms.agents.lazyagentlist import LazyAgentList
+from fms.engines.replayorderslog import ReplayOrdersLog
+from fms.utils.history import MarketHistory
+from fms.utils.binary import convert
+from fms.utils.files import open_file, splitext
 
 from fms.version import VERSION
 
@@ -48,9 +55,9 @@ def _apply_opts(params, opts):
     if opts.repeat:
         for key in ('outputfilename', 'orderslogfilename'):
             if key in params:
-                if params[key] not in ('None', 'sys.stdout'):
-                    parts = params[key].rsplit('.',1)
-                    params[key] = '.'.join((parts[0]+'-%03d', parts[1]))
+                if params[key] not in (None, 'None', 'sys.stdout'):
+                    (root, extension) = splitext(params[key])
+                    params[key] = root + '-%03d' + extension
 
     if opts.replay:
         del params['agents'][1:]
@@ -128,17 +135,33 @@ def set_parser():
     optp.add_option('--no_unique_by_agent', action='store_false',
         dest='unique_by_agent',
         help="More than one order by agent allowed in books.")
+    optp.add_option('--asyncoutput', action='store_true',
+        help="Write output files from a writer thread.")
+    optp.add_option('--orderslogindex', action='store_true',
+        help="Index orders log days.")
     # value options overriding config parameters
     optp.add_option('--orderslogfilename', dest='orderslogfilename',
             help='orders log filename')
+    optp.add_option('--orderslogformat', dest='orderslogformat',
+            type='choice', choices=ORDERSLOGFORMATS,
+            help='orders log format: csv, binary or both')
     optp.add_option('--outputfilename', '-o', dest='outputfilename',
             help='output filename')
+    optp.add_option('--outputformat', dest='outputformat',
+            type='choice', choices=OUTPUTFORMATS,
+            help='output file format: csv or binary')
     optp.add_option('--randomseed',
             help='random seed')
     optp.add_option('--csvdelimiter',
             help='csv delimiter')
     optp.add_option('--repeat',
             help='repeat experiment N times')
+    optp.add_option('--firstday', type='int',
+            help='first day to replay')
+    optp.add_option('--lastday', type='int',
+            help='last day to replay')
+    optp.add_option('--transactionbuffer', type='int',
+            help='number of transactions written at once')
 
     return optp
 
@@ -197,10 +220,13 @@ def _set_world(params):
 
 def _set_agents(params):
     """
-    Import agents class and instanciate agents
+    Import agents class and instanciate agents, or return a
+    LazyAgentList creating them on first use if params lazyagents
+    is true
     """
     logger = logging.getLogger('fms')
     agentslist = []
+    agentsclasses = []
     for (offset, a) in enumerate(params['agents']):
         if a['modulename']:
             agentmodule = _import_class(
@@ -209,10 +235,29 @@ def _set_agents(params):
         else:
             agentmodule = _import_class('fms.agents', a['classname'])
             agentclassname = '.'.join(('fms.agents', a['classname']))
-        for i in range(a['number']):
-            agentslist.append(getattr(agentmodule, a['classname'])(params, offset))
+        agentclass = getattr(agentmodule, a['classname'])
+        agentsclasses.append(agentclass)
+        if params.get('lazyagents'):
+            logger.info("Registered %d instances of agent %s" %
+                (a['number'], agentclassname))
+            continue
+        if a.get('pool'):
+            agentslist.extend(AgentPool(agentclass, params, offset))
+        elif agentclass.cloneable and a['number'] > 0:
+            # parse parameters once, clone the prototype
+            prototype = agentclass(params, offset)
+            agentslist.append(prototype)
+            for i in xrange(a['number']-1):
+                agentslist.append(prototype.clone())
+        else:
+            for i in range(a['number']):
+                agentslist.append(agentclass(params, offset))
         logger.info("Created  %d instances of agent %s" % 
             (a['number'], agentclassname))
+    if params.get('lazyagents'):
+        return LazyAgentList(params, agentsclasses)
+    for (ident, agent) in enumerate(agentslist):
+        agent.ident = ident
     return agentslist
 
 def _set_engines(params):
@@ -236,11 +281,43 @@ def _set_engines(params):
         else:
             enginemodule = _import_class('fms.engines', e['classname'])
         e['instance'] = getattr(enginemodule, e['classname'])(params, offset)
+        if params['agents'][0]['classname'] == 'PlayOrderLogFile':
+            # replay orders log with the engine schedule
+            replayengine = ReplayOrdersLog(params, offset)
+            replayengine.interval = e['instance'].clearing_interval()
+            e['instance'] = replayengine
         engineslist.append(e)
         logger.info("Created engine %s" % e['instance'])
         logger.info("Created market %s" % e['market']['instance'])
     return engineslist
 
+def _set_weights(params, engineslist):
+    """
+    Give engines the agents speaking weights, one per agent, if agents
+    blocks have different weight parameters
+    """
+    weights = []
+    for a in params['agents']:
+        weights.extend([a.get('weight', 1)]*a['number'])
+    if len(set(weights)) > 1:
+        for e in engineslist:
+            e['instance'].weights = weights
+    return weights
+
+def _set_history(engineslist, agentslist):
+    """
+    Create market history, shared by all markets and agents
+    """
+    history = MarketHistory()
+    for e in engineslist:
+        e['market']['instance'].history = history
+    if isinstance(agentslist, LazyAgentList):
+        agentslist.attach_history(history)
+        return history
+    for agent in agentslist:
+        agent.attach_history(history)
+    return history
+
 def set_classes(params):
     """
     Parse conffile and instanciate classes
@@ -248,6 +325,9 @@ def set_classes(params):
     world = _set_world(params)
     engineslist = _set_engines(params)
     agentslist = _set_agents(params)
+    _set_weights(params, engineslist)
+    if params.get('history'):
+        _set_history(engineslist, agentslist)
     return (world, engineslist, agentslist)
             
 def do_check(args, opts):
@@ -277,3 +357,24 @@ def do_run(args, opts):
         logger.info("Done.")
         params.close_files(turn)
 
+def do_convert(args, opts):
+    """
+    Command: write binary output file or orders log as a CSV file
+    """
+    logger = logging.getLogger('fms')
+    try:
+        filename = args[1]
+    except IndexError:
+        logger.critical("Missing binary file name.")
+        sys.exit(2)
+    if opts.outputfilename and opts.outputfilename != 'sys.stdout':
+        outputfile = open_file(opts.outputfilename, 'w')
+    else:
+        outputfile = sys.stdout
+    try:
+        convert(filename, outputfile, opts.csvdelimiter or ';')
+    except (IOError, ValueError), error:
+        logger.critical(error)
+        sys.exit(2)
+    if outputfile is not sys.stdout:
+        outputfile.close()
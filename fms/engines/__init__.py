@@ -4,6 +4,12 @@
 Engine module.
 """
 
+import random
+from functools import partial
+
+from fms.utils import ORDEROPTIONS
+from fms.utils.sampling import AliasTable
+
 class Engine:
     """
     Abstract simulation engine class
@@ -24,6 +30,12 @@ class Engine:
             self.clearbooksateod = True
             self.showbooks = False
             self.unique_by_agent = True
+        # agents speaking weights, see sampler()
+        self.weights = None
+        # orders log lines, see output_order()
+        self.ordermask = self.csvdelimiter.join(('%s', '%.2f', '%d', '%d'))
+        self.assetordermask = self.csvdelimiter.join(
+                ('%s', '%.2f', '%d', '%d', '%s'))
 
     def __str__(self):
         return "%s engine %s" % (self.__class__, id(self))
@@ -32,8 +44,11 @@ class Engine:
         """
         Run engine
 
+        Take over books and counters left by the previous engine :
+        market.set_state(world.state())
         For days * daylength :
-        - choose agent
+        - mark start of day (self.start_day) and count days (world.day)
+        - choose agent (see self.sampler)
         - let agent emit a desire (agent.act)
         - check desire validity (market.is_valid)
         - accumulate desire
@@ -41,13 +56,124 @@ class Engine:
         - call market.do_clearing when needed, in a 
           synchronous or asynchronous way.
         - call market.clear_books() at the end of any day if necessary
+        Hand market state over to the next engine :
+        world.lastmarketinfo.update(market.get_state())
         """
         raise NotImplementedError
 
+    def sampler(self, size):
+        """
+        Return function drawing the index of the next agent to speak,
+        among size agents : uniformly, with random.randint, or in
+        proportion to self.weights (one per agent) if they are set,
+        with an alias table (see fms.utils.sampling).
+        """
+        if self.weights is None:
+            return partial(random.randint, 0, size-1)
+        return self.alias_table(size).draw
+
+    def alias_table(self, size):
+        """
+        Return alias table of self.weights, for size agents
+        """
+        if len(self.weights) != size:
+            raise ValueError, "%d weights for %d agents" % (
+                    len(self.weights), size)
+        return AliasTable(self.weights)
+
+    def start_day(self, world, market):
+        """
+        Mark the start of day world.day in the orders logs and their
+        index, if the experiment indexes its orders logs (see
+        fms.utils.logindex).
+        """
+        index = self.params.ordersindex
+        if not index:
+            return
+        offset = record = -1
+        logfile = self.params.orderslogfile
+        if logfile:
+            offset = logfile.tell()
+            print >> logfile, "# day %d tick %d" % (world.day, world.tick)
+        if self.params.binaryorderslog:
+            record = self.params.binaryorderslog.tell()
+        index.mark(world.day, world.tick, offset, record, market.transaction)
+
+    def end_day(self, world, market):
+        """
+        Write the transactions market buffered during day world.day
+        (see fms.utils.transactions), and move on to the next day.
+        """
+        market.flush_transactions()
+        world.day += 1
+
+    def clearing_interval(self):
+        """
+        Number of ticks between two market clearings, 0 if the market
+        is cleared as soon as an order is recorded (asynchronous
+        engines). The ReplayOrdersLog engine replays experiments with
+        the clearing interval of their engines.
+        """
+        return 0
+
     def output_order(self, order):
         """
-        Output an order in orderlogfile
+        Output an order in orderlogfile, with the masks compiled once
+        by __init__(). Agents are logged as their ident (see
+        fms.agents.Agent). Order options (see fms.utils.ORDEROPTIONS),
+        such as the time to live, follow as name=value fields.
+        """
+        if 'asset' in order:
+            line = self.assetordermask % (order['direction'], order['price'],
+                    order['quantity'], order['agent'].ident, order['asset'])
+        else:
+            line = self.ordermask % (order['direction'], order['price'],
+                    order['quantity'], order['agent'].ident)
+        for (key, keytype) in ORDEROPTIONS:
+            if order.get(key) is not None:
+                line = "%s%s%s=%s" % (line, self.csvdelimiter, key,
+                        keytype(order[key]))
+        print >> self.params.orderslogfile, line
+
+    def submit(self, agent, market, time, order=None):
+        """
+        Let agent speak, unless its order is given as a dict, and
+        record the order on market, if valid, at time.
+        Return True if the order was recorded.
+
+        Orders of agents whose tupleorders attribute is True are
+        (direction, price, quantity) tuples : if the market accepts
+        them too, they are logged with a precompiled mask and
+        recorded with market.record_limit(), without building any
+        dict. Other orders are dicts, sanitized by the market.
+
+        Orders are logged to the binary orders log too, if any (see
+        fms.utils.binary), with their tick.
         """
-        mask = self.csvdelimiter.join(('%(direction)s',
-            '%(price).2f','%(quantity)d','"%(agent)s"'))
-        print >> self.params.orderslogfile, mask % order
+        if order is None:
+            if agent.tupleorders and market.tupleorders:
+                order = agent.act()
+                if not market.is_valid(agent, order):
+                    return False
+                if self.params.orderslogfile:
+                    print >> self.params.orderslogfile, self.ordermask % \
+                            (order[0], order[1], order[2], agent.ident)
+                if self.params.binaryorderslog:
+                    self.params.binaryorderslog.write(time, order[0],
+                            order[1], order[2], agent.ident)
+                market.record_limit(order[0], order[1], order[2], agent,
+                        time, self.unique_by_agent)
+                return True
+            order = agent.speak()
+        order = market.sanitize_order(order)
+        if not market.is_valid(agent, order):
+            return False
+        if self.params.orderslogfile:
+            self.output_order(order)
+        if self.params.binaryorderslog:
+            self.params.binaryorderslog.write(time, order['direction'],
+                    order['price'], order['quantity'], order['agent'].ident,
+                    order.get('asset'), order.get('ttl'), order.get('stop'),
+                    order.get('visible'))
+        market.record_order(order, time, self.unique_by_agent)
+        return True
@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+"""
+Asynchronous random with replace engine, drawing orders by blocks
+"""
+
+import sys
+import random
+import logging
+from functools import partial
+
+from fms.engines import Engine
+
+logger = logging.getLogger('fms.engines.asynchronousblockrandwreplace')
+
+class AsynchronousBlockRandWReplace(Engine):
+    """
+    Asynchronous engine, random sampling of agents,
+    with replacement, as AsynchronousRandWReplace, but agents
+    and their orders are drawn by blocks of blocksize ticks.
+
+    The blocksize is the first item in the engine args list, and
+    defaults to 100. Agents are sampled with a numpy.random
+    RandomState, seeded from the experiment randomseed. Agents
+    classes with a block_act class method (e.g. ZeroIntelligenceTrader,
+    RandomTrader) draw the orders of all their sampled agents at
+    once, as NumPy vectors. Those orders are then submitted one at a
+    time, tick after tick, after agent.revalidate() checked them
+    against the agent current state, which may have changed since the
+    block was drawn. Other agents speak when their turn comes, as
+    with AsynchronousRandWReplace.
+
+    Because random draws are not made in the same order, results differ
+    from those of AsynchronousRandWReplace with the same randomseed,
+    though their distributions are the same.
+    """
+
+    def __init__(self, parameters=None, offset=0):
+        """
+        Constructor. Takes parameters from config.
+        Seeds ramdom engines from parameter.randomseed, if any.
+        """
+        try:
+            import numpy
+        except ImportError:
+            logger.critical(
+                    "Please install the numpy module to use this engine.")
+            logger.critical("See http://numpy.scipy.org/ for installation.")
+            sys.exit(2)
+        Engine.__init__(self, parameters, offset)
+        self.params = parameters
+        self.rank = offset
+        self.blocksize = 100
+        if parameters:
+            random.seed(parameters['randomseed'])
+            self.rng = numpy.random.RandomState(random.getrandbits(32))
+            args = parameters['engines'][offset].get('args')
+            if args:
+                self.blocksize = int(args[0])
+        else:
+            self.rng = numpy.random.RandomState()
+        if self.blocksize < 1:
+            self.blocksize = 1
+
+    def block_sampler(self, size):
+        """
+        Return function drawing the indices of a block of agents (its
+        argument being the block size), among size agents, with
+        self.rng : uniformly, or in proportion to self.weights if
+        they are set (see Engine.sampler()).
+        """
+        if self.weights is None:
+            return partial(self.rng.randint, 0, size)
+        return partial(self.alias_table(size).draw_block, self.rng)
+
+    def block_orders(self, agents, indices, world, market):
+        """
+        Return list of orders for the sampled agents indices, drawn by
+        block_act for all agents classes providing it. Other agents
+        orders are None : they speak when submitting.
+        Classes are asked in the order of their first sampled agent,
+        so that runs are reproducible.
+        """
+        orders = [None]*len(indices)
+        groups = {}
+        for (position, agt) in enumerate(indices):
+            agentclass = agents[agt].__class__
+            if hasattr(agentclass, 'block_act'):
+                groups.setdefault(agentclass, []).append(position)
+        for positions in sorted(groups.values()):
+            agentclass = agents[indices[positions[0]]].__class__
+            blockorders = agentclass.block_act(
+                    [agents[indices[p]] for p in positions],
+                    self.rng, world, market)
+            for (position, order) in zip(positions, blockorders):
+                orders[position] = order
+        return orders
+
+    def run(self, world, agents, market):
+        """
+        Sample agents (with replacement) by blocks, and let them speak
+        on market, one by one.
+        As market is asynchronous, as soon as an agent speaks, do_clearing
+        is called to execute any possible transaction immediately.
+        """
+        market.set_state(world.state())
+        logger.debug("Starting with sellbook %s" % market.sellbook)
+        logger.debug("Starting with buybook %s" % market.buybook)
+        draw = self.block_sampler(len(agents))
+        for day in range(self.days):
+            self.start_day(world, market)
+            time = 0
+            while time < self.daylength:
+                size = min(self.blocksize, self.daylength - time)
+                indices = draw(size).tolist()
+                orders = self.block_orders(agents, indices, world, market)
+                for (agt, order) in zip(indices, orders):
+                    agent = agents[agt]
+                    if order is not None:
+                        order = agent.revalidate(order)
+                        recorded = order is not None and \
+                                self.submit(agent, market, world.tick, order)
+                    else:
+                        recorded = self.submit(agent, market, world.tick)
+                    if recorded:
+                        if self.showbooks:
+                            market.output_books(world.tick)
+                        market.do_clearing(world.tick)
+                        world.lastmarketinfo.update(
+                                {'sellbook':market.sellbook,
+                                 'buybook':market.buybook})
+                    world.tick +=1
+                    if self.params['timer']:
+                        world.show_time(day, time, self.days*self.daylength)
+                    time += 1
+            if self.clearbooksateod:
+                market.clear_books()
+            self.end_day(world, market)
+        world.lastmarketinfo.update(market.get_state())
+        logger.debug("Ending with sellbook %s" % market.sellbook)
+        logger.debug("Ending with buybook %s" % market.buybook)
+
+if __name__ == '__main__':
+    print AsynchronousBlockRandWReplace()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+"""
+Periodic random with replace engine
+"""
+
+import random
+import logging
+
+from fms.engines import Engine
+
+logger = logging.getLogger('fms.engines.periodicrandwreplace')
+
+class PeriodicRandWReplace(Engine):
+    """
+    Periodic engine, random sampling of agents,
+    with replacement.
+    Calls Market clearing every 'interval' periods, and at the
+    end of the day, i.e. runs frequent batch auctions.
+
+    The interval is the first item in the engine args list. If
+    missing, it defaults to daylength, and the engine behaves as
+    the SynchronousRandWReplace engine.
+    """
+
+    def __init__(self, parameters=None, offset=0):
+        """
+        Constructor. Takes parameters from config.
+        Seeds ramdom engine from parameter.randomseed, if any.
+        """
+        Engine.__init__(self, parameters, offset)
+        self.params = parameters
+        self.rank = offset
+        self.interval = self.daylength
+        if parameters:
+            random.seed(parameters['randomseed'])
+            args = parameters['engines'][offset].get('args')
+            if args:
+                self.interval = int(args[0])
+        if self.interval < 1:
+            self.interval = 1
+
+    def clearing_interval(self):
+        """
+        Market is cleared every self.interval ticks
+        """
+        return self.interval
+
+    def run(self, world, agents, market):
+        """
+        Sample agents (with replacement) and let them speak on market.
+        do_clearing is called every self.interval periods, and at the
+        end of the day if daylength is not a multiple of interval.
+        """
+        market.set_state(world.state())
+        logger.debug("Starting with sellbook %s" % market.sellbook)
+        logger.debug("Starting with buybook %s" % market.buybook)
+        draw = self.sampler(len(agents))
+        for day in range(self.days):
+            self.start_day(world, market)
+            for time in range(self.daylength):
+                agt = draw()
+                if self.submit(agents[agt], market, world.tick):
+                    if self.showbooks:
+                        market.output_books(world.tick)
+                    world.lastmarketinfo.update(
+                            {'sellbook':market.sellbook, 'buybook':market.buybook})
+                world.tick +=1
+                if self.params['timer']:
+                    world.show_time(day, time, self.days*self.daylength)
+                if not (time+1) % self.interval:
+                    market.do_clearing(world.tick)
+            if self.daylength % self.interval:
+                market.do_clearing(world.tick)
+            if self.clearbooksateod:
+                market.clear_books()
+            self.end_day(world, market)
+        world.lastmarketinfo.update(market.get_state())
+        logger.debug("Ending with sellbook %s" % market.sellbook)
+        logger.debug("Ending with buybook %s" % market.buybook)
+
+if __name__ == '__main__':
+    print PeriodicRandWReplace()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+"""
+Orders log replay engine
+"""
+
+import logging
+
+from fms.engines import Engine
+
+logger = logging.getLogger('fms.engines.replayorderslog')
+
+class ReplayOrdersLog(Engine):
+    """
+    Replay engine, streaming the orders of an orders log into the
+    market, without sampling nor asking agents.
+
+    Orders are pulled from the PlayOrderLogFile agent (the first and
+    only agent of replayed experiments), which reads the log by chunks
+    (see PlayOrderLogFile.next_order()). They are recorded as they
+    were logged, being valid already : neither sanitize_order() nor
+    is_valid() are called, and tuple orders are recorded with
+    market.record_limit(). As with the random engines, at most one
+    order is recorded per tick. Binary logs orders are recorded at
+    the tick they were placed at, CSV logs ones on every tick.
+
+    The market is cleared as soon as an order is recorded if the
+    clearing interval, the first item in the engine args list, is 0
+    or missing, every interval ticks (and at the end of the day)
+    otherwise, as with PeriodicRandWReplace.
+
+    Experiments whose first agent is PlayOrderLogFile (see the
+    --replay option) are replayed with this engine : each of their
+    engines is replaced by a ReplayOrdersLog with the same days,
+    daylength and clearing interval (see Engine.clearing_interval()).
+
+    Only days firstday to lastday (experiment parameters, days being
+    counted from 0 over all engines) are replayed, if given. Orders of
+    the previous days are not read : the log is sought to firstday
+    (see PlayOrderLogFile.seek_day()), and the market transactions
+    count restored from the log index. As books of the previous days
+    are lost, the replay is exact only if they were cleared at the end
+    of the day before firstday.
+    """
+
+    def __init__(self, parameters=None, offset=0):
+        """
+        Constructor. Takes parameters from config.
+        """
+        Engine.__init__(self, parameters, offset)
+        self.params = parameters
+        self.rank = offset
+        self.interval = 0
+        self.firstday = 0
+        self.lastday = None
+        if parameters:
+            if parameters.get('firstday'):
+                self.firstday = int(parameters['firstday'])
+            if parameters.get('lastday') is not None:
+                self.lastday = int(parameters['lastday'])
+            args = parameters['engines'][offset].get('args')
+            if args:
+                self.interval = int(args[0])
+        if self.interval < 0:
+            self.interval = 0
+
+    def clearing_interval(self):
+        """
+        Market is cleared every self.interval ticks, on each order if 0
+        """
+        return self.interval
+
+    def record(self, market, order, time):
+        """
+        Record order, a (tick, direction, price, quantity, agent, asset,
+        ttl, stop, visible) tuple, on market at time. Stop orders are
+        recorded as dicts, kept by the market until triggered.
+        """
+        (tick, direction, price, quantity, agent, asset, ttl, stop,
+                visible) = order
+        if asset is None and stop is None and market.tupleorders:
+            market.record_limit(direction, price, quantity, agent, time,
+                    self.unique_by_agent, visible, ttl)
+        else:
+            order = {'direction':direction, 'price':price,
+                    'quantity':quantity, 'agent':agent}
+            if asset is not None:
+                order['asset'] = asset
+            for (key, value) in (('ttl', ttl), ('stop', stop),
+                    ('visible', visible)):
+                if value is not None:
+                    order[key] = value
+            market.record_order(order, time, self.unique_by_agent)
+
+    def run(self, world, agents, market):
+        """
+        Record the logged orders on market, one per tick, clearing it
+        after each order, or every self.interval ticks.
+        """
+        player = agents[0]
+        market.set_state(world.state())
+        logger.debug("Starting with sellbook %s" % market.sellbook)
+        logger.debug("Starting with buybook %s" % market.buybook)
+        for day in range(self.days):
+            if world.day < self.firstday or \
+                    (self.lastday is not None and world.day > self.lastday):
+                # day out of replayed window
+                world.tick += self.daylength
+                world.day += 1
+                continue
+            if world.day == self.firstday and self.firstday:
+                entry = player.seek_day(world.day, world.tick)
+                if entry is not None:
+                    market.transaction = entry[3]
+            for time in range(self.daylength):
+                order = player.next_order(world.tick)
+                if order is not None:
+                    self.record(market, order, world.tick)
+                    if self.showbooks:
+                        market.output_books(world.tick)
+                    if not self.interval:
+                        market.do_clearing(world.tick)
+                    world.lastmarketinfo.update(
+                            {'sellbook':market.sellbook, 'buybook':market.buybook})
+                world.tick +=1
+                if self.params['timer']:
+                    world.show_time(day, time, self.days*self.daylength)
+                if self.interval and not (time+1) % self.interval:
+                    market.do_clearing(world.tick)
+            if self.interval and self.daylength % self.interval:
+                market.do_clearing(world.tick)
+            if self.clearbooksateod:
+                market.clear_books()
+            self.end_day(world, market)
+        world.lastmarketinfo.update(market.get_state())
+        logger.debug("Ending with sellbook %s" % market.sellbook)
+        logger.debug("Ending with buybook %s" % market.buybook)
+
+if __name__ == '__main__':
+    print ReplayOrdersLog()
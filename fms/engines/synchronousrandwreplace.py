@@ -28,25 +28,27 @@ class SynchronousRandWReplace(Engine):
         if parameters:
             random.seed(parameters['randomseed'])
 
+    def clearing_interval(self):
+        """
+        Market is cleared at the end of each day
+        """
+        return self.daylength
+
     def run(self, world, agents, market):
         """
         Sample agents (with replacement) and let them speak on market.   
         As market is synchronous, do_clearing is called after 
         self.days*self.daylength periods.
         """
-        market.sellbook = world.state()['sellbook']
+        market.set_state(world.state())
         logger.debug("Starting with sellbook %s" % market.sellbook)
-        market.buybook = world.state()['buybook']
         logger.debug("Starting with buybook %s" % market.buybook)
+        draw = self.sampler(len(agents))
         for day in range(self.days):
+            self.start_day(world, market)
             for time in range(self.daylength):
-                agt = random.randint(0, len(agents)-1)
-                order = market.sanitize_order(agents[agt].speak())
-                if market.is_valid(agents[agt], order):
-                    if self.params.orderslogfile:
-                        self.output_order(order)
-                    market.record_order(order, world.tick,
-                            self.unique_by_agent)
+                agt = draw()
+                if self.submit(agents[agt], market, world.tick):
                     if self.showbooks:
                         market.output_books(world.tick)
                     world.lastmarketinfo.update(
@@ -57,6 +59,8 @@ class SynchronousRandWReplace(Engine):
             market.do_clearing(world.tick)
             if self.clearbooksateod:
                 market.clear_books()
+            self.end_day(world, market)
+        world.lastmarketinfo.update(market.get_state())
         logger.debug("Ending with sellbook %s" % market.sellbook)
         logger.debug("Ending with buybook %s" % market.buybook)
 
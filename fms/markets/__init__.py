@@ -5,26 +5,53 @@ Market module.
 """
 
 import sys
+import bisect
+
 from fms.utils import BUY, SELL
 from fms.utils.exceptions import MissingParameter
+from fms.utils.transactions import TransactionWriter
 
 class Market:
     """
     Abstract market class
     """
 
+    # True if market records tuple orders with record_limit(), and its
+    # is_valid() accepts them : subclasses opt in
+    tupleorders = False
+    # True if market keeps orders with a 'stop' key until triggered,
+    # other markets refuse them, see sanitize_order()
+    stoporders = False
+    # formats of the fields of output transactions lines
+    transactionfields = ('%d','%d','%.2f','%d')
+
     def __init__(self, parameters):
         self.replay = False
+        self.orderttl = None
         if parameters:
             self.outputfile = parameters.outputfile
             self.csvdelimiter = parameters['csvdelimiter']
             if parameters['agents'][0]['classname'] == 'PlayOrderLogFile':
                 self.replay = True
+            self.orderttl = parameters.get('orderttl')
+            # shared with the other markets of the experiment
+            self.transactions = parameters.transaction_writer(
+                    self.transactionfields)
         else:
             self.outputfile = sys.stdout 
             self.csvdelimiter = ';'
+            self.transactions = TransactionWriter(self.outputfile,
+                    self.csvdelimiter.join(self.transactionfields), 1)
         self.sellbook = []
         self.buybook = []
+        self.lastprice = None
+        self.transaction = 0
+        # timing wheel: expiry tick -> [(book, order), ...]
+        self.expiries = {}
+        self.expirytime = None
+        # MarketHistory of transactions, set by fms.core if the
+        # experiment history parameter is true
+        self.history = None
 
     def __str__(self):
         return "%s market %s" % (self.__class__, id(self))
@@ -43,6 +70,51 @@ class Market:
         """
         self.sellbook = []
         self.buybook = []
+        self.expiries = {}
+
+    def get_state(self):
+        """
+        Returns market state to be handed over to the next market, as dict.
+
+        Books are passed by reference, not copied, so that the next
+        market goes on exactly where this one stopped. Dict keys :
+        - sellbook, buybook: the books themselves
+        - lastprice (float): last transaction price
+        - lasttransaction (int): # of last transaction
+        - expiries, expirytime: orders time to live timing wheel
+        Subclasses maintaining other structures (indexes...) should
+        extend the dict, and take those back in set_state().
+
+        >>> from fms.markets import Market
+        >>> market = Market(None)
+        >>> market.record_order({'direction': 1, 'quantity': 2, 'price': 3, 'agent': 'smith'}, 1)
+        >>> market.transaction = 12
+        >>> nextmarket = Market(None)
+        >>> nextmarket.set_state(market.get_state())
+        >>> nextmarket.sellbook is market.sellbook
+        True
+        >>> nextmarket.transaction
+        12
+
+        """
+        return {'sellbook': self.sellbook,
+                'buybook': self.buybook,
+                'lastprice': self.lastprice,
+                'lasttransaction': self.transaction,
+                'expiries': self.expiries,
+                'expirytime': self.expirytime}
+
+    def set_state(self, state):
+        """
+        Takes over state handed over by the previous market (see get_state).
+        Missing keys leave the current values unchanged.
+        """
+        self.sellbook = state.get('sellbook', self.sellbook)
+        self.buybook = state.get('buybook', self.buybook)
+        self.lastprice = state.get('lastprice', self.lastprice)
+        self.transaction = state.get('lasttransaction', self.transaction)
+        self.expiries = state.get('expiries', self.expiries)
+        self.expirytime = state.get('expirytime', self.expirytime)
 
     def record_order(self, order, time, unique=True):
         """
@@ -51,6 +123,15 @@ class Market:
         If an order from the same agent exists on the same
         asset and unique is True, delete it.
 
+        If the order has a 'visible' key, lower than its quantity, the
+        order is an iceberg : only the visible quantity is shown in the
+        book, the hidden part being kept in two more items of the book
+        line (see refresh_iceberg()).
+
+        If the order has a 'ttl' key, or the market an orderttl
+        attribute (experiment 'orderttl' parameter), the order is
+        removed from the book after ttl ticks, see expire_orders().
+
         >>> from fms.markets import Market
         >>> market = Market(None)
         >>> market.record_order({'direction': 1, 'quantity': 2, 'price': 3, 'agent': 'smith'}, 1)
@@ -62,12 +143,34 @@ class Market:
         >>> market.record_order({'direction': 1, 'quantity': 4, 'price': 5, 'agent': 'smith'}, 1, False)
         >>> market.sellbook
         [[4, 1, 3, 'smith'], [5, 1, 4, 'smith']]
+        >>> market.record_order({'direction': 0, 'quantity': 50, 'price': 2, 'agent': 'bob', 'visible': 20}, 2)
+        >>> market.buybook
+        [[2, -2, 20, 'bob', 30, 20]]
+
+        """
+        self.record_limit(order['direction'], order['price'],
+                order['quantity'], order['agent'], time, unique,
+                order.get('visible'), order.get('ttl'))
+
+    def record_limit(self, direction, price, quantity, agent, time,
+            unique=True, visible=None, ttl=None):
+        """
+        Record a limit order given as separate values, as
+        record_order() does for order dicts. This is the path of
+        tuple orders (see Agent.act()), which saves building dicts.
+        If ttl is None, the market orderttl attribute is used.
+        >>> from fms.markets import Market
+        >>> market = Market(None)
+        >>> market.record_limit(1, 3, 2, 'smith', 1)
+        >>> market.record_limit(0, 2, 5, 'bob', 2)
+        >>> market.sellbook, market.buybook
+        ([[3, 1, 2, 'smith']], [[2, -2, 5, 'bob']])
 
         """
         if unique:
             for book in (self.sellbook, self.buybook):
                 for line in book:
-                    if order['agent'] == line[3]:
+                    if agent == line[3]:
                         book.remove(line)
                         break
 #            the for loop seems faster, probably because of the break
@@ -76,14 +179,101 @@ class Market:
 #            self.buybook = filter((lambda x: order['agent'] != x[3]),
 #                        self.buybook)
 
-        if order['direction'] == SELL:
-            self.sellbook.append(
-                    [order['price'], time, order['quantity'], order['agent']])
-            self.sellbook.sort()
+        if self.expiries:
+            self.expire_orders(time)
+
+        if direction == SELL:
+            book = self.sellbook
+            line = [price, time, quantity, agent]
         else:
-            self.buybook.append(
-                    [order['price'], -time, order['quantity'], order['agent']])
-            self.buybook.sort()
+            book = self.buybook
+            line = [price, -time, quantity, agent]
+        if visible and visible < quantity:
+            # iceberg: [price, time, visible qty, agent, hidden qty, slice]
+            line.extend((quantity-visible, visible))
+            line[2] = visible
+        bisect.insort(book, line)
+        if ttl is None:
+            ttl = self.orderttl
+        if ttl:
+            if not self.expiries:
+                self.expirytime = time
+            self.expiries.setdefault(time+ttl, []).append((book, line))
+
+    def refresh_iceberg(self, book, line, time):
+        """
+        Show next slice of an iceberg order whose visible quantity
+        was fully executed, and insert it back into book.
+
+        line should already be removed from book. The new slice gets
+        time as timestamp (negative for buybook), so that the order
+        loses its time priority, and is inserted with a bisection :
+        the book is not sorted again. Returns False if there is no
+        hidden quantity left.
+        >>> from fms.markets import Market
+        >>> market = Market(None)
+        >>> line = [2, 1, 0, 'smith', 25, 20]
+        >>> market.refresh_iceberg(market.sellbook, line, 3)
+        True
+        >>> market.sellbook
+        [[2, 3, 20, 'smith', 5, 20]]
+        >>> market.sellbook[0][2] = 0
+        >>> market.refresh_iceberg(market.sellbook, market.sellbook.pop(), 4)
+        True
+        >>> market.sellbook
+        [[2, 4, 5, 'smith', 0, 20]]
+        >>> market.refresh_iceberg(market.sellbook, market.sellbook.pop(), 5)
+        False
+
+        """
+        if len(line) < 6 or not line[4]:
+            return False
+        line[2] = min(line[4], line[5])
+        line[4] -= line[2]
+        line[1] = time
+        bisect.insort(book, line)
+        return True
+
+    def expire_orders(self, time):
+        """
+        Remove from books orders whose time to live is over at time.
+
+        Orders with a time to live are kept in a timing wheel, that is
+        in buckets keyed by expiry tick. Each tick since the previous
+        call is visited once, and each order expires once, so the
+        cost is amortized O(1) per tick and per order, plus the removal
+        of the order from its book. Orders already executed or replaced
+        are simply skipped.
+        >>> from fms.markets import Market
+        >>> market = Market(None)
+        >>> market.record_order({'direction': 1, 'quantity': 2, 'price': 3, 'agent': 'smith', 'ttl': 2}, 1)
+        >>> market.record_order({'direction': 0, 'quantity': 2, 'price': 2, 'agent': 'bob', 'ttl': 5}, 2)
+        >>> market.expire_orders(2)
+        >>> market.sellbook, market.buybook
+        ([[3, 1, 2, 'smith']], [[2, -2, 2, 'bob']])
+        >>> market.expire_orders(3)
+        >>> market.sellbook, market.buybook
+        ([], [[2, -2, 2, 'bob']])
+        >>> market.record_order({'direction': 1, 'quantity': 2, 'price': 3, 'agent': 'jones'}, 9)
+        >>> market.sellbook, market.buybook
+        ([[3, 9, 2, 'jones']], [])
+
+        """
+        if self.expirytime is None or time <= self.expirytime:
+            return
+        expiries = self.expiries
+        for tick in xrange(self.expirytime+1, time+1):
+            if not expiries:
+                break
+            for book, line in expiries.pop(tick, ()):
+                i = bisect.bisect_left(book, line[:2])
+                while i < len(book) and book[i][0] == line[0] \
+                        and book[i][1] == line[1]:
+                    if book[i] is line:
+                        del book[i]
+                        break
+                    i += 1
+        self.expirytime = time
 
     def do_clearing(self):
         """
@@ -113,8 +303,17 @@ class Market:
         - direction: BUY or SELL
         - price: best market limit if missing
         - quantity: 1 if missing
+        - asset: kept if present, for multi-asset markets
+        - ttl: kept if present, order time to live in ticks
+        - stop: kept if present, stop order trigger price, if the
+          market handles stop orders (stoporders attribute), a
+          ValueError being raised otherwise
+        - visible: kept if present, iceberg order visible quantity
         """
         order = {}
+        if 'stop' in raw_order and not self.stoporders:
+            raise ValueError, "%s market does not handle stop orders" % \
+                    self.__class__.__name__
         if 'direction' in raw_order:
             order['direction'] = raw_order['direction']
             if order['direction'] == BUY:
@@ -125,25 +324,41 @@ class Market:
                         self.info()['buybook'][-1][0])
             order['quantity'] = raw_order.get('quantity', 1)
             order['agent'] = raw_order['agent']
+            for key in ('asset', 'ttl', 'stop', 'visible'):
+                if key in raw_order:
+                    order[key] = raw_order[key]
             return order
         else:
             raise MissingParameter, 'direction'
 
+    def settle(self, buyer, seller, price, quantity):
+        """
+        Record transaction in buyer and seller accounts, and in
+        market history if any.
+        """
+        buyer.record(BUY, price, quantity)
+        seller.record(SELL, price, quantity)
+        if self.history is not None:
+            self.history.record(buyer, seller, price, quantity)
+
     def output_transaction(self, time, price, quantity):
         """
-        Output a transaction line
+        Output a transaction line (see TransactionWriter)
         """
-        mask = self.csvdelimiter.join(('%d','%d','%.2f','%d'))
-        print >> self.outputfile, mask % (time,
-                                        self.transaction,
-                                        price, 
-                                        quantity)
+        self.transactions.append((time, self.transaction, price, quantity))
 
+    def flush_transactions(self):
+        """
+        Write buffered transactions lines
+        """
+        self.transactions.flush()
 
     def output_books(self, time):
         """
         Output best limits
         """
+        self.transactions.flush()
+        self.transactions.sync()
         sep = "-" * 39
         print sep
         print "          Sell orders at %03d" % time
@@ -5,6 +5,8 @@ Order driven market, continuous transactions.
 Any order is considered valid.
 """
 
+import heapq
+
 from fms import markets
 from fms.utils import BUY, SELL
 
@@ -224,8 +226,56 @@ class ContinuousOrderDriven(markets.Market):
     >>> market.sellbook
     [[2.6..., 9, 11, <fms.agents.Agent instance at ...>], [2.8..., 11, 30, <fms.agents.Agent instance at ...>], [3.0, 10, 20, <fms.agents.Agent instance at ...>]]
 
+    Stop orders are orders with a 'stop' key, the trigger price.
+    They are not recorded in the books, but kept aside until the
+    last transaction price reaches the trigger price (rises up to it
+    for a buy stop, falls down to it for a sell stop). They are then
+    recorded in the books as plain limit orders, and may be executed
+    within the same clearing.
+    >>> market = ContinuousOrderDriven()
+    >>> market.record_order({'agent': agentbob, 'direction':BUY, 'price':5.00, 'quantity':10, 'stop':4.00}, 0, False)
+    >>> market.buybook, market.buystops
+    ([], [(4.0, 1, {...})])
+    >>> market.record_order({'agent': agentsmith, 'direction':SELL, 'price':3.90, 'quantity':10}, 1, False)
+    >>> market.record_order({'agent': agentbob, 'direction':BUY, 'price':4.00, 'quantity':5}, 2, False)
+    >>> market.do_clearing(2)
+    2;1;3.90;5
+    >>> market.buystops
+    [(4.0, 1, {...})]
+    >>> market.record_order({'agent': agentsmith, 'direction':SELL, 'price':4.10, 'quantity':10}, 3, False)
+    >>> market.record_order({'agent': agentbob, 'direction':BUY, 'price':4.00, 'quantity':5}, 4, False)
+    >>> market.do_clearing(4)
+    4;2;3.90;5
+    >>> market.record_order({'agent': agentbob, 'direction':BUY, 'price':4.10, 'quantity':2}, 5, False)
+    >>> market.do_clearing(5)
+    5;3;4.10;2
+    5;4;4.10;8
+    >>> market.buystops, market.buybook
+    ([], [[5.0, -5, 2, <fms.agents.Agent instance at ...>]])
+
+    Iceberg orders are orders with a 'visible' key, lower than their
+    quantity. Only the visible part of the order is shown in the book.
+    When it is fully executed, the next slice is shown, and the order
+    goes to the back of the queue at its price (see
+    Market.refresh_iceberg).
+    >>> market.record_order({'agent': agentsmith, 'direction':SELL, 'price':5.00, 'quantity':25, 'visible':10}, 6, False)
+    >>> market.do_clearing(6)
+    6;5;5.00;2
+    >>> market.sellbook
+    [[5.0, 6, 8, <fms.agents.Agent instance at ...>, 15, 10]]
+    >>> market.record_order({'agent': agentbob, 'direction':BUY, 'price':5.00, 'quantity':12}, 7, False)
+    >>> market.do_clearing(7)
+    7;6;5.00;8
+    7;7;5.00;4
+    >>> market.sellbook
+    [[5.0, 7, 6, <fms.agents.Agent instance at ...>, 5, 10]]
+
     """
 
+    # orders may be (direction, price, quantity) tuples, see Market
+    tupleorders = True
+    stoporders = True
+
     def __init__(self, parameters=None):
         """
         Class constructor.
@@ -233,10 +283,77 @@ class ContinuousOrderDriven(markets.Market):
         Adds :
         - lastprice (float) : last transaction price, see info()
         - transaction (int) : transaction counter
+        - buystops (heap) : buy stop orders, lowest trigger price first
+        - sellstops (heap) : sell stop orders, highest trigger price first
         """
         markets.Market.__init__(self, parameters)
         self.lastprice = None
         self.transaction = 0
+        self.buystops = []
+        self.sellstops = []
+        self.stopcount = 0
+
+    def clear_books(self):
+        """
+        Reset books and stop orders to empty state
+        """
+        markets.Market.clear_books(self)
+        self.buystops = []
+        self.sellstops = []
+
+    def get_state(self):
+        """
+        Returns market state as dict, see Market.get_state().
+        Adds buystops and sellstops heaps.
+        """
+        state = markets.Market.get_state(self)
+        state['buystops'] = self.buystops
+        state['sellstops'] = self.sellstops
+        return state
+
+    def set_state(self, state):
+        """
+        Takes over state handed over by the previous market
+        """
+        markets.Market.set_state(self, state)
+        self.buystops = state.get('buystops', self.buystops)
+        self.sellstops = state.get('sellstops', self.sellstops)
+
+    def record_order(self, order, time, unique=True):
+        """
+        Record agent order in correct order book, or, if order
+        has a 'stop' key, in stop orders heaps.
+
+        Heaps items are (trigger price, sequence #, order) tuples,
+        trigger price being negated for sell stops, so that the
+        next stop order to be triggered is always the first item.
+        Stop orders are not subject to the unique rule.
+        """
+        if 'stop' in order:
+            self.stopcount += 1
+            if order['direction'] == BUY:
+                heapq.heappush(self.buystops,
+                        (order['stop'], self.stopcount, order))
+            else:
+                heapq.heappush(self.sellstops,
+                        (-order['stop'], self.stopcount, order))
+            if self.lastprice is not None:
+                self.trigger_stops(time)
+        else:
+            markets.Market.record_order(self, order, time, unique)
+
+    def trigger_stops(self, time):
+        """
+        Record in the books stop orders triggered by last price.
+        Only triggered orders are touched, each in O(log n).
+        """
+        price = self.lastprice
+        while self.buystops and self.buystops[0][0] <= price:
+            order = heapq.heappop(self.buystops)[2]
+            markets.Market.record_order(self, order, time, False)
+        while self.sellstops and -self.sellstops[0][0] >= price:
+            order = heapq.heappop(self.sellstops)[2]
+            markets.Market.record_order(self, order, time, False)
 
     def is_valid(self, agent, order):
         """
@@ -271,6 +388,8 @@ class ContinuousOrderDriven(markets.Market):
         """
         Clears books, executing all possible transactions
         """
+        if self.expiries:
+            self.expire_orders(time)
         if len(self.buybook) and len(self.sellbook):
             while len(self.sellbook) and len(self.buybook) \
                     and self.sellbook[0][0] <= self.buybook[-1][0]:
@@ -284,17 +403,22 @@ class ContinuousOrderDriven(markets.Market):
                 buyer = self.buybook[-1][3]
                 seller = self.sellbook[0][3]
                 if not self.replay:
-                    buyer.record(BUY, executedprice, qty)
-                    seller.record(SELL, executedprice, qty)
+                    self.settle(buyer, seller, executedprice, qty)
                 self.output_transaction(time, executedprice, qty)
                 if qty == self.buybook[-1][2]:
-                    del self.buybook[-1]
+                    line = self.buybook.pop()
+                    if len(line) > 4:
+                        self.refresh_iceberg(self.buybook, line, -time)
                 else:
                     self.buybook[-1][2] -= qty
                 if qty == self.sellbook[0][2]:
-                    del self.sellbook[0]
+                    line = self.sellbook.pop(0)
+                    if len(line) > 4:
+                        self.refresh_iceberg(self.sellbook, line, time)
                 else:
                     self.sellbook[0][2] -= qty
+                if self.buystops or self.sellstops:
+                    self.trigger_stops(time)
 
 
 def _test():
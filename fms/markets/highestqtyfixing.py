@@ -49,6 +49,9 @@ class HighestQtyFixing(markets.Market):
 
     """
 
+    # orders may be (direction, price, quantity) tuples, see Market
+    tupleorders = True
+
     def __init__(self, parameters=None):
         """
         Class constructor.
@@ -97,18 +100,72 @@ class HighestQtyFixing(markets.Market):
         Choose fixing price which ensures the highest transactions
         volume.
         Execute all possible transactions at fixing price
+
+        Only prices where books cross may be chosen, thus only the
+        crossing parts of the books are scanned: the cost of a fixing
+        depends on the orders recorded since previous fixing, not on
+        the books depth.
+        >>> from fms.utils import BUY, SELL
+        >>> market.record_order({'agent': agentbob, 'direction':BUY, 'price':3.00, 'quantity':10}, 0, False)
+        >>> market.record_order({'agent': agentbob, 'direction':BUY, 'price':2.90, 'quantity':20}, 1, False)
+        >>> market.record_order({'agent': agentbob, 'direction':BUY, 'price':1.00, 'quantity':90}, 2, False)
+        >>> market.record_order({'agent': agentsmith, 'direction':SELL, 'price':2.80, 'quantity':15}, 3, False)
+        >>> market.record_order({'agent': agentsmith, 'direction':SELL, 'price':2.90, 'quantity':15}, 4, False)
+        >>> market.record_order({'agent': agentsmith, 'direction':SELL, 'price':9.00, 'quantity':50}, 5, False)
+        >>> market.do_clearing(6)
+        6;1;2.90;10
+        6;2;2.90;5
+        6;3;2.90;15
+        >>> market.buybook
+        [[1.0, -2, 90, <fms.agents.Agent instance at ...>]]
+        >>> market.sellbook
+        [[9.0, 5, 50, <fms.agents.Agent instance at ...>]]
+        >>> market.do_clearing(7)
+
+        Iceberg orders (see Market.record_order()) show their next
+        slice when the visible one is executed, which may be executed
+        within the same fixing.
+        >>> market = highestqtyfixing.HighestQtyFixing()
+        >>> market.record_order({'agent': agentsmith, 'direction':SELL, 'price':9.00, 'quantity':25, 'visible':10}, 8)
+        >>> market.record_order({'agent': agentbob, 'direction':BUY, 'price':9.00, 'quantity':12}, 9, False)
+        >>> market.do_clearing(10)
+        10;1;9.00;10
+        10;2;9.00;2
+        >>> market.sellbook
+        [[9.0, 10, 8, <fms.agents.Agent instance at ...>, 5, 10]]
+
         """
-        fixdict = {}
+        if self.expiries:
+            self.expire_orders(fixingtime)
+        if not (self.sellbook and self.buybook) \
+                or self.sellbook[0][0] > self.buybook[-1][0]:
+            return
+        bestsell = self.sellbook[0][0]
+        bestbuy = self.buybook[-1][0]
+        buydepth = {}
         cumul = 0
-        for price, time, qty, agent in reversed(self.buybook):
-            cumul += qty
-            fixdict.setdefault(price, [0,0])[0] = cumul
+        for line in reversed(self.buybook):
+            price = line[0]
+            if price < bestsell:
+                break
+            cumul += line[2]
+            buydepth[price] = cumul
+        fixlist = []
         cumul = 0
-        for price, time, qty, agent in self.sellbook:
-            cumul += qty
-            fixdict.setdefault(price, [0,0])[1] = cumul
-        fixingprice = max(
-                ((min(i,j), price) for price, (i,j) in fixdict.items()))[1]
+        for line in self.sellbook:
+            price = line[0]
+            if price > bestbuy:
+                break
+            cumul += line[2]
+            if price in buydepth:
+                fixlist.append((min(buydepth[price], cumul), price))
+        if fixlist:
+            fixingvolume, fixingprice = max(fixlist)
+        else:
+            fixingvolume = 0
+        if not fixingvolume:
+            # no volume at any price: highest price in books
+            fixingprice = max(self.buybook[-1][0], self.sellbook[-1][0])
         logger.info("Fixing price is %.2f" % fixingprice)
         
         if len(self.buybook) and len(self.sellbook):
@@ -121,15 +178,18 @@ class HighestQtyFixing(markets.Market):
                 buyer = self.buybook[-1][3]
                 seller = self.sellbook[0][3]
                 if not self.replay:
-                    buyer.record(BUY, executedprice, qty)
-                    seller.record(SELL, executedprice, qty)
+                    self.settle(buyer, seller, executedprice, qty)
                 self.output_transaction(fixingtime, executedprice, qty)
                 if qty == self.buybook[-1][2]:
-                    del self.buybook[-1]
+                    line = self.buybook.pop()
+                    if len(line) > 4:
+                        self.refresh_iceberg(self.buybook, line, -fixingtime)
                 else:
                     self.buybook[-1][2] -= qty
                 if qty == self.sellbook[0][2]:
-                    del self.sellbook[0]
+                    line = self.sellbook.pop(0)
+                    if len(line) > 4:
+                        self.refresh_iceberg(self.sellbook, line, fixingtime)
                 else:
                     self.sellbook[0][2] -= qty
 
@@ -0,0 +1,220 @@
+#!/usr/bin/python
+# -*- coding: utf8 -*-
+"""
+Multi-asset order driven market, continuous transactions.
+Any order is considered valid.
+"""
+
+from fms.markets.continuousorderdriven import ContinuousOrderDriven
+from fms.utils import BUY, SELL
+from fms.utils.exceptions import MissingParameter
+
+class MultiAssetContinuousOrderDriven(ContinuousOrderDriven):
+    """
+    Simulate an order driven market with continuous transactions
+    on many assets at once.
+
+    This market class keeps a pair of books (sellbook, buybook) per
+    asset, in the self.books dict, keyed by asset. Books are the very
+    same sorted lists as in ContinuousOrderDriven. Orders should have
+    an 'asset' key, and go to the books of that asset. self.sellbook and
+    self.buybook always point to the books of the last asset an order
+    was recorded for, so that engines may go on using them.
+
+    Stop orders are kept per asset as well, in the self.stops dict,
+    and only triggered by the transactions on their own asset.
+
+    Transactions are output with an asset column. The transactions
+    counter is common to all assets.
+    >>> from fms.markets.multiassetcontinuousorderdriven import MultiAssetContinuousOrderDriven
+    >>> market = MultiAssetContinuousOrderDriven()
+    >>> market.output_transaction(1, 10.0, 25)
+    1;0;None;10.00;25
+
+    Agents trading on this market should be aware of assets, as the
+    market records transactions with agent.record(direction, price,
+    quantity, asset).
+    >>> from fms.agents.multiassetzerointelligencetrader import MultiAssetZeroIntelligenceTrader
+    >>> params = {'assets': ['ACME', 'INITECH'],
+    ...     'agents': [{'money':10000, 'stocks':200, 'args':[999, 100]}]}
+    >>> agentbob = MultiAssetZeroIntelligenceTrader(params)
+    >>> agentsmith = MultiAssetZeroIntelligenceTrader(params)
+    >>> from fms.utils import BUY, SELL
+    >>> market.record_order({'agent': agentbob, 'direction':BUY, 'price':2.50, 'quantity':10, 'asset':'ACME'}, 0, False)
+    >>> market.record_order({'agent': agentsmith, 'direction':SELL, 'price':2.40, 'quantity':10, 'asset':'INITECH'}, 1, False)
+    >>> market.do_clearing(1)
+    >>> market.record_order({'agent': agentsmith, 'direction':SELL, 'price':2.45, 'quantity':4, 'asset':'ACME'}, 2, False)
+    >>> market.do_clearing(2)
+    2;1;ACME;2.50;4
+    >>> market.books['ACME']
+    [[], [[2.5, 0, 6, <fms.agents.multiassetzerointelligencetrader.MultiAssetZeroIntelligenceTrader object at ...>]]]
+    >>> market.books['INITECH']
+    [[[2.4..., 1, 10, <fms.agents.multiassetzerointelligencetrader.MultiAssetZeroIntelligenceTrader object at ...>]], []]
+    >>> agentbob.portfolio['ACME'], agentsmith.portfolio['ACME']
+    (204, 196)
+    >>> agentbob.portfolio['INITECH'], agentsmith.portfolio['INITECH']
+    (200, 200)
+
+    Orders need an asset, so tuple orders are not recorded through
+    record_limit(), but as dicts.
+    """
+
+    tupleorders = False
+    transactionfields = ('%d','%d','%s','%.2f','%d')
+
+    def __init__(self, parameters=None):
+        """
+        Class constructor.
+        Gets parameters from config, pass it to superclass.
+        Adds :
+        - books (dict) : [sellbook, buybook] for each asset
+        - lastprices (dict) : last transaction price for each asset
+        - asset : asset of the current books
+        - pending (set) : assets with orders recorded since last clearing
+        - stops (dict) : [buystops, sellstops] for each asset
+        """
+        ContinuousOrderDriven.__init__(self, parameters)
+        self.books = {}
+        self.lastprices = {}
+        self.asset = None
+        self.pending = set()
+        if parameters and parameters.get('assets'):
+            for asset in parameters['assets']:
+                self.books[asset] = [[], []]
+        self.books[None] = [self.sellbook, self.buybook]
+        self.stops = {None: [self.buystops, self.sellstops]}
+
+    def select(self, asset):
+        """
+        Make asset books the current books
+        """
+        if asset != self.asset:
+            self.asset = asset
+            self.sellbook, self.buybook = self.books.setdefault(asset, [[], []])
+            self.buystops, self.sellstops = self.stops.setdefault(asset,
+                    [[], []])
+            self.lastprice = self.lastprices.get(asset)
+
+    def info(self):
+        """
+        Provides dict information about current asset market state.
+        See ContinuousOrderDriven.info(), adds :
+        - asset: current asset
+        """
+        infodict = ContinuousOrderDriven.info(self)
+        infodict['asset'] = self.asset
+        return infodict
+
+    def get_state(self):
+        """
+        Returns market state as dict, see Market.get_state().
+        Adds books, stops and lastprices dicts.
+        """
+        state = ContinuousOrderDriven.get_state(self)
+        state['books'] = self.books
+        state['stops'] = self.stops
+        state['lastprices'] = self.lastprices
+        return state
+
+    def set_state(self, state):
+        """
+        Takes over state handed over by the previous market
+        """
+        ContinuousOrderDriven.set_state(self, state)
+        if 'books' in state:
+            self.books = state['books']
+            self.lastprices = state.get('lastprices', self.lastprices)
+            self.sellbook, self.buybook = self.books.setdefault(self.asset,
+                    [[], []])
+            self.stops = state.get('stops', self.stops)
+            self.buystops, self.sellstops = self.stops.setdefault(self.asset,
+                    [[], []])
+        else:
+            # single asset books go on as current asset books
+            self.books[self.asset] = [self.sellbook, self.buybook]
+            self.stops[self.asset] = [self.buystops, self.sellstops]
+
+    def clear_books(self):
+        """
+        Reset books and stop orders of all assets to empty state
+        """
+        for asset in self.books:
+            self.books[asset] = [[], []]
+        self.sellbook, self.buybook = self.books[self.asset]
+        for asset in self.stops:
+            self.stops[asset] = [[], []]
+        self.buystops, self.sellstops = self.stops.setdefault(self.asset,
+                [[], []])
+        self.pending.clear()
+        self.expiries = {}
+
+    def sanitize_order(self, raw_order):
+        """
+        Returns agent's order as a dict, see Market.sanitize_order().
+        The books of the order asset are selected first, so that
+        a missing price defaults to the best limit of that asset.
+        >>> from fms.markets.multiassetcontinuousorderdriven import MultiAssetContinuousOrderDriven
+        >>> market = MultiAssetContinuousOrderDriven()
+        >>> market.record_order({'agent': None, 'direction':SELL, 'price':12.0, 'quantity':5, 'asset':'ACME'}, 0, False)
+        >>> market.record_order({'agent': None, 'direction':SELL, 'price':7.0, 'quantity':5, 'asset':'INITECH'}, 1, False)
+        >>> market.sanitize_order({'agent': None, 'direction':BUY, 'asset':'ACME'})['price']
+        12.0
+
+        """
+        try:
+            self.select(raw_order['asset'])
+        except KeyError:
+            raise MissingParameter, 'asset'
+        return ContinuousOrderDriven.sanitize_order(self, raw_order)
+
+    def record_order(self, order, time, unique=True):
+        """
+        Record agent order in the books of the order asset.
+        """
+        try:
+            self.select(order['asset'])
+        except KeyError:
+            raise MissingParameter, 'asset'
+        ContinuousOrderDriven.record_order(self, order, time, unique)
+        self.pending.add(self.asset)
+
+    def do_clearing(self, time):
+        """
+        Clears books of all assets which got orders since last clearing
+        """
+        current = self.asset
+        for asset in sorted(self.pending):
+            self.select(asset)
+            ContinuousOrderDriven.do_clearing(self, time)
+            self.lastprices[asset] = self.lastprice
+        self.pending.clear()
+        self.select(current)
+
+    def settle(self, buyer, seller, price, quantity):
+        """
+        Record transaction in buyer and seller accounts, for current
+        asset, and in market history if any. The history is shared by
+        all assets.
+        """
+        buyer.record(BUY, price, quantity, self.asset)
+        seller.record(SELL, price, quantity, self.asset)
+        if self.history is not None:
+            self.history.record(buyer, seller, price, quantity)
+
+    def output_transaction(self, time, price, quantity):
+        """
+        Output a transaction line, with asset column
+        """
+        self.transactions.append((time, self.transaction, self.asset,
+                price, quantity))
+
+
+def _test():
+    """
+    Run tests in docstrings.
+    """
+    import doctest
+    doctest.testmod(optionflags=+doctest.ELLIPSIS)
+
+if __name__ == '__main__':
+    _test()
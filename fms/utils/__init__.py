@@ -13,14 +13,31 @@ SELL = 1
 # csv delimiters
 CSVDELIMITERS = [';', ',', '\t', ' ', ':', '|', '-', '!', '/']
 
+# orders log formats
+ORDERSLOGFORMATS = ('csv', 'binary', 'both')
+
+# output file formats
+OUTPUTFORMATS = ('csv', 'binary')
+
+# orders keys logged, if present, as name=value fields of CSV orders
+# logs, with their types
+ORDEROPTIONS = (('ttl', int), ('stop', float), ('visible', int))
+
 # args
-COMMANDS = ('nothing', 'run', 'check')
+COMMANDS = ('nothing', 'run', 'check', 'convert')
 OPTS_VAL = ('outputfilename', 
+        'outputformat', 
         'orderslogfilename', 
+        'orderslogformat', 
         'randomseed', 
         'csvdelimiter', 
-        'repeat')
+        'repeat',
+        'firstday',
+        'lastday',
+        'transactionbuffer')
 OPTS_BOOL = {'show_books': False,
              'timer': False,
-             'unique_by_agent': True,}
+             'unique_by_agent': True,
+             'orderslogindex': False,
+             'asyncoutput': False,}
 
@@ -0,0 +1,197 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+"""
+Asynchronous output files.
+
+When the experiment asyncoutput parameter is true, output files are
+written by a writer thread rather than by the simulation : files are
+wrapped in AsyncFile objects, which send what is written to them to
+the thread, through a bounded queue. Writes are sent by batches, and
+TransactionWriter objects send their records unformatted, formatting
+being done by the thread too. When the thread falls behind, the queue
+fills up and the simulation waits for it.
+
+A single thread writes all the files of an experiment, in the order
+they were written to. Files are only complete once the writer is
+closed (see close_files()).
+"""
+
+import sys
+import threading
+import Queue
+
+# batches of writes queued before the simulation waits for the thread
+ASYNCQUEUESIZE = 256
+# writes sent to the thread at once
+ASYNCBATCH = 512
+
+def _write(outputfile, function, args):
+    """
+    Write function(*args) to outputfile
+    """
+    outputfile.write(function(*args))
+
+class AsyncWriter:
+    """
+    Writer thread, calling the functions submitted to it in order.
+    >>> from StringIO import StringIO
+    >>> from fms.utils.asyncwriter import AsyncWriter
+    >>> writer = AsyncWriter()
+    >>> outputfile = StringIO()
+    >>> asyncfile = writer.open(outputfile)
+    >>> print >> asyncfile, "1;0;10.00;25"
+    >>> asyncfile.submit(lambda line, record: line % record,
+    ...     "%d;%d;%.2f;%d", (1, 1, 10.5, 5))
+    >>> asyncfile.tell()
+    13
+    >>> writer.close()
+    >>> print outputfile.getvalue()
+    1;0;10.00;25
+    1;1;10.50;5
+
+    Errors raised by the thread are raised again in the simulation,
+    by the next call to the writer.
+    >>> writer = AsyncWriter()
+    >>> asyncfile = writer.open(outputfile)
+    >>> asyncfile.close()
+    >>> asyncfile.write('too late')
+    >>> writer.close()
+    Traceback (most recent call last):
+        ...
+    ValueError: I/O operation on closed file
+
+    """
+
+    def __init__(self, queuesize=ASYNCQUEUESIZE):
+        self.queue = Queue.Queue(queuesize)
+        self.error = None
+        self.files = []
+        self.thread = threading.Thread(target=self.serve,
+                name='fms-asyncwriter')
+        self.thread.setDaemon(True)
+        self.thread.start()
+
+    def serve(self):
+        """
+        Call queued functions, until the None sentinel
+        """
+        while True:
+            item = self.queue.get()
+            try:
+                if item is None:
+                    return
+                if self.error is None:
+                    (function, args) = item
+                    function(*args)
+            except Exception:
+                self.error = sys.exc_info()
+            finally:
+                self.queue.task_done()
+
+    def check(self):
+        """
+        Raise again the error raised by the thread, if any
+        """
+        if self.error is not None:
+            (errortype, error, traceback) = self.error
+            self.error = None
+            raise errortype, error, traceback
+
+    def submit(self, function, *args):
+        """
+        Queue call of function with args, waiting if queue is full
+        """
+        self.check()
+        self.queue.put((function, args))
+
+    def sync(self):
+        """
+        Wait until all queued calls are done
+        """
+        self.queue.join()
+        self.check()
+
+    def open(self, outputfile):
+        """
+        Return AsyncFile writing to outputfile through the thread
+        """
+        asyncfile = AsyncFile(self, outputfile)
+        self.files.append(asyncfile)
+        return asyncfile
+
+    def close(self):
+        """
+        Stop thread once all writes to its files are done
+        """
+        for asyncfile in self.files:
+            asyncfile.send()
+        self.queue.put(None)
+        self.thread.join()
+        self.check()
+
+class AsyncFile:
+    """
+    File written by an AsyncWriter thread. tell() gives the position
+    of data written with write(), as if it were written already.
+    """
+
+    def __init__(self, writer, outputfile, batch=ASYNCBATCH):
+        self.writer = writer
+        self.file = outputfile
+        self.name = getattr(outputfile, 'name', None)
+        self.batch = batch
+        self.pending = []
+        self.softspace = 0
+        try:
+            self.position = outputfile.tell()
+        except (AttributeError, IOError):
+            self.position = 0
+
+    def write(self, data):
+        self.pending.append(data)
+        self.position += len(data)
+        if len(self.pending) >= self.batch:
+            self.send()
+
+    def send(self):
+        """
+        Send pending writes to the thread
+        """
+        if self.pending:
+            self.writer.submit(self.file.write, ''.join(self.pending))
+            self.pending = []
+
+    def submit(self, function, *args):
+        """
+        Write function(*args), computed by the thread
+        """
+        self.send()
+        self.writer.submit(_write, self.file, function, args)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        self.send()
+        self.writer.submit(self.file.flush)
+
+    def sync(self):
+        """
+        Wait until all written data is written to the file
+        """
+        self.flush()
+        self.writer.sync()
+
+    def close(self):
+        self.send()
+        self.writer.submit(self.file.close)
+
+def _test():
+    """
+    Run tests in docstrings
+    """
+    import doctest
+    doctest.testmod(optionflags=+doctest.ELLIPSIS)
+
+if __name__ == '__main__':
+    _test()
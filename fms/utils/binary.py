@@ -0,0 +1,625 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+"""
+Binary orders logs.
+
+A binary orders log starts with the MAGIC string, followed by the
+length of the header (4 bytes unsigned int, little endian) and the
+header itself, the ';' separated names of the experiment assets (empty
+for single asset experiments). Then come the orders, as fixed size
+records (see ORDER_FORMAT) :
+- tick (int64): world tick the order was placed at
+- direction (int8): BUY or SELL
+- price (float64)
+- quantity (int64)
+- agent (int64): ident of the agent (see fms.agents.Agent)
+- asset (int16): index of the order asset in the header, -1 if none
+- ttl (int64): order time to live in ticks, -1 if none
+- stop (float64): stop order trigger price, -1 if none
+- visible (int64): iceberg order visible quantity, -1 if none
+Being fixed size records, orders may be read through mmap as a NumPy
+structured array, without parsing.
+
+Binary output files (outputformat parameter 'binary') are laid out the
+same way : they start with TRANSACTIONS_MAGIC, the header length and
+the header, the ';' separated names of the experiment assets on its
+first line, followed by the experiment name. Then come the transactions, as fixed size
+records (see TRANSACTION_FORMAT) :
+- time (int64): world tick of the transaction
+- transaction (int64): transaction number
+- price (float64)
+- quantity (int64)
+- asset (int16): index of the asset in the header, -1 if none
+Each column of the mapped array is then a NumPy view of the file.
+convert() writes binary files back as CSV files.
+
+Compressed binary files (see fms.utils.files) can not be mapped : their
+records are decompressed as a stream, a chunk at a time (see
+RecordsStream).
+"""
+
+import os
+import sys
+import struct
+import logging
+from itertools import chain
+
+from fms.utils import ORDEROPTIONS
+from fms.utils.transactions import TransactionWriter, TRANSACTIONBUFFER
+from fms.utils.files import open_file, compression
+
+logger = logging.getLogger('fms.utils.binary')
+
+MAGIC = 'FMSORDERS2'
+HEADER_FORMAT = '<I'
+ORDER_FORMAT = '<qbdqqhqdq'
+ORDER_FIELDS = (('tick', '<i8'), ('direction', '<i1'), ('price', '<f8'),
+        ('quantity', '<i8'), ('agent', '<i8'), ('asset', '<i2'),
+        ('ttl', '<i8'), ('stop', '<f8'), ('visible', '<i8'))
+TRANSACTIONS_MAGIC = 'FMSTRANS01'
+TRANSACTION_FORMAT = 'qqdqh'
+TRANSACTION_FIELDS = (('time', '<i8'), ('transaction', '<i8'),
+        ('price', '<f8'), ('quantity', '<i8'), ('asset', '<i2'))
+
+def is_binary_orderslog(filename):
+    """
+    True if filename is a binary orders log, of any version (older
+    ones are refused by read_header())
+    """
+    logfile = open_file(filename, 'rb')
+    try:
+        return logfile.read(len(MAGIC))[:-1] == MAGIC[:-1]
+    finally:
+        logfile.close()
+
+def write_header(outputfile, magic, header):
+    """
+    Write magic string and header to binary file outputfile
+    """
+    outputfile.write(magic)
+    outputfile.write(struct.pack(HEADER_FORMAT, len(header)))
+    outputfile.write(header)
+
+def read_header(filename, magic):
+    """
+    Return (header, records offset) of binary file filename.
+    Raise ValueError if filename does not start with magic.
+    """
+    binfile = open_file(filename, 'rb')
+    try:
+        found = binfile.read(len(magic))
+        if found != magic:
+            if found[:-1] == magic[:-1]:
+                raise ValueError, "%s is a binary file of another version" \
+                        % filename
+            raise ValueError, "%s is not a binary %s" % (filename,
+                    magic == MAGIC and 'orders log' or 'output file')
+        size = struct.calcsize(HEADER_FORMAT)
+        headerlength = struct.unpack(HEADER_FORMAT, binfile.read(size))[0]
+        header = binfile.read(headerlength)
+    finally:
+        binfile.close()
+    return (header, len(magic) + size + headerlength)
+
+def optional_values(column):
+    """
+    Return list of the values of NumPy array column, negative values,
+    which stand for missing ones, being None
+    """
+    if not len(column) or column.max() < 0:
+        return [None]*len(column)
+    values = column.tolist()
+    if column.min() < 0:
+        for (i, value) in enumerate(values):
+            if value < 0:
+                values[i] = None
+    return values
+
+def _import_numpy():
+    """
+    Return numpy module, exit if it is not installed
+    """
+    try:
+        import numpy
+    except ImportError:
+        logger.critical(
+                "Please install the numpy module to read binary files.")
+        logger.critical("See http://numpy.scipy.org/ for installation.")
+        sys.exit(2)
+    return numpy
+
+def map_records(filename, offset, fields):
+    """
+    Return records of uncompressed binary file filename, from offset
+    on, as a NumPy structured array of fields, mapped in memory
+    """
+    numpy = _import_numpy()
+    dtype = numpy.dtype(list(fields))
+    try:
+        return numpy.memmap(filename, dtype=dtype, mode='r', offset=offset)
+    except ValueError:
+        # no record, mmap can not map an empty range
+        return numpy.zeros(0, dtype=dtype)
+
+class RecordsStream:
+    """
+    Records of a compressed binary file, from offset on, decompressed
+    as a stream : read(count) returns the next count records at most,
+    as a NumPy structured array of fields, so that only one chunk of
+    the file is ever in memory.
+    >>> import os, tempfile
+    >>> from fms.utils.files import open_file
+    >>> import struct
+    >>> from fms.utils.binary import RecordsStream
+    >>> from fms.utils.binary import TRANSACTION_FORMAT, TRANSACTION_FIELDS
+    >>> (fd, filename) = tempfile.mkstemp(suffix='.bin.gz')
+    >>> os.close(fd)
+    >>> binfile = open_file(filename, 'wb')
+    >>> binfile.writelines(['header', struct.pack('<' + TRANSACTION_FORMAT*3,
+    ...     1, 0, 10.0, 25, -1, 1, 1, 10.5, 5, -1, 3, 2, 9.99, 1, -1)])
+    >>> binfile.close()
+    >>> records = RecordsStream(filename, 6, TRANSACTION_FIELDS)
+    >>> len(records), records.read(2)['price'].tolist()
+    (3, [10.0, 10.5])
+    >>> records.read(2)['time'].tolist(), len(records.read(2))
+    ([3], 0)
+    >>> records.seek(1)
+    >>> records.read(5)['transaction'].tolist()
+    [1, 2]
+    >>> records.close()
+    >>> os.remove(filename)
+
+    """
+
+    def __init__(self, filename, offset, fields):
+        numpy = _import_numpy()
+        self.frombuffer = numpy.frombuffer
+        self.dtype = numpy.dtype(list(fields))
+        self.filename = filename
+        self.offset = offset
+        self.binfile = open_file(filename, 'rb')
+        self.binfile.seek(offset)
+        self.count = None
+
+    def __len__(self):
+        """
+        Number of records, counted once by decompressing the whole
+        file, block by block
+        """
+        if self.count is None:
+            binfile = open_file(self.filename, 'rb')
+            try:
+                binfile.seek(self.offset)
+                size = 0
+                block = binfile.read(1 << 20)
+                while block:
+                    size += len(block)
+                    block = binfile.read(1 << 20)
+            finally:
+                binfile.close()
+            self.count = size // self.dtype.itemsize
+        return self.count
+
+    def seek(self, position):
+        """
+        Go to record number position
+        """
+        self.binfile.seek(self.offset + position*self.dtype.itemsize)
+
+    def read(self, count):
+        """
+        Return array of the next count records at most, empty at end
+        of file
+        """
+        data = self.binfile.read(count*self.dtype.itemsize)
+        return self.frombuffer(data, dtype=self.dtype,
+                count=len(data) // self.dtype.itemsize)
+
+    def close(self):
+        self.binfile.close()
+
+class OrdersLogWriter:
+    """
+    Write orders to a binary orders log.
+    >>> from StringIO import StringIO
+    >>> from fms.utils.binary import OrdersLogWriter
+    >>> logfile = StringIO()
+    >>> writer = OrdersLogWriter(logfile, ['ACME', 'INITECH'])
+    >>> writer.write_header()
+    >>> writer.write(12, 1, 10.5, 20, 1234, 'INITECH', ttl=50)
+    >>> len(logfile.getvalue()) == len('FMSORDERS2') + 4 + 12 + 59
+    True
+    >>> writer.tell()
+    1
+
+    """
+
+    def __init__(self, logfile, assets=None):
+        self.logfile = logfile
+        self.assets = assets or []
+        self.assetsindex = dict((asset, i) for (i, asset)
+                in enumerate(self.assets))
+        self.packer = struct.Struct(ORDER_FORMAT)
+        self.headersize = 0
+
+    def write_header(self):
+        """
+        Write log header
+        """
+        write_header(self.logfile, MAGIC, ';'.join(self.assets))
+        self.headersize = self.logfile.tell()
+
+    def tell(self):
+        """
+        Number of orders written
+        """
+        return (self.logfile.tell() - self.headersize) // self.packer.size
+
+    def write(self, time, direction, price, quantity, agent, asset=None,
+            ttl=None, stop=None, visible=None):
+        """
+        Write order. agent is the agent object, or its ident.
+        """
+        if not isinstance(agent, (int, long)):
+            agent = agent.ident
+        if asset is None:
+            asset = -1
+        else:
+            asset = self.assetsindex[asset]
+        if ttl is None:
+            ttl = -1
+        if stop is None:
+            stop = -1
+        if visible is None:
+            visible = -1
+        self.logfile.write(self.packer.pack(time, direction, price,
+            quantity, agent, asset, ttl, stop, visible))
+
+    def close(self):
+        self.logfile.close()
+
+class OrdersLogReader:
+    """
+    Read orders from a binary orders log, mapped in memory, or
+    decompressed as a stream if the log is compressed.
+
+    Orders are read in order, as dicts, with keys direction, price,
+    quantity, agent (agent ident), asset if the log has assets and
+    options (see fms.utils.ORDEROPTIONS) if the order has them. They
+    are converted chunksize at a time from the NumPy array, so
+    that reading an order is a mere list pop. read_chunk() returns
+    those chunks, as lists of tuples (orders are read either way,
+    not both).
+    >>> import os, tempfile
+    >>> from fms.utils.binary import OrdersLogWriter, OrdersLogReader
+    >>> (fd, filename) = tempfile.mkstemp()
+    >>> writer = OrdersLogWriter(os.fdopen(fd, 'wb'))
+    >>> writer.write_header()
+    >>> for tick in range(10):
+    ...     writer.write(tick*2, tick%2, 10.+tick, 5, 1234)
+    >>> writer.close()
+    >>> reader = OrdersLogReader(filename, chunksize=4)
+    >>> len(reader), reader.read()
+    (10, {'direction': 0, 'price': 10.0, 'agent': 1234, 'quantity': 5})
+
+    Reading may start at any tick : seek(tick) goes to the first
+    order placed at or after tick, or to order number record if given.
+    >>> reader.seek(7)
+    >>> reader.read()['price'], reader.read()['price']
+    (14.0, 15.0)
+    >>> reader.seek(16)
+    >>> reader.read_chunk()
+    [(16, 0, 18.0, 5, 1234, None, None, None, None), (18, 1, 19.0, 5, 1234, None, None, None, None)]
+    >>> reader.seek(100)
+    >>> reader.read()
+    Traceback (most recent call last):
+        ...
+    EOFError: end of orders log
+    >>> reader.seek(0, 9)
+    >>> reader.read()['price']
+    19.0
+    >>> os.remove(filename)
+
+    """
+
+    def __init__(self, filename, chunksize=4096):
+        (header, offset) = read_header(filename, MAGIC)
+        if header:
+            self.assets = header.split(';')
+        else:
+            self.assets = []
+        self.filename = filename
+        if compression(filename):
+            self.orders = None
+            self.stream = RecordsStream(filename, offset, ORDER_FIELDS)
+        else:
+            self.orders = map_records(filename, offset, ORDER_FIELDS)
+            self.stream = None
+        self.chunksize = chunksize
+        self.position = 0
+        self.chunk = []
+
+    def __len__(self):
+        if self.stream is None:
+            return len(self.orders)
+        return len(self.stream)
+
+    def seek(self, tick, record=None):
+        """
+        Go to the first order placed at or after tick. record, the
+        number of orders placed before tick if known (see
+        fms.utils.logindex), spares searching for it, negative
+        values being ignored.
+        """
+        if record is None or record < 0:
+            record = self.search(tick)
+        self.position = record
+        if self.stream is not None:
+            self.stream.seek(record)
+        self.chunk = []
+
+    def search(self, tick):
+        """
+        Return number of the first order placed at or after tick.
+        Compressed logs are scanned from the start, a chunk at a time.
+        """
+        numpy = _import_numpy()
+        if self.stream is None:
+            return int(numpy.searchsorted(self.orders['tick'], tick))
+        self.stream.seek(0)
+        position = 0
+        chunk = self.stream.read(self.chunksize)
+        while len(chunk):
+            index = int(numpy.searchsorted(chunk['tick'], tick))
+            if index < len(chunk):
+                return position + index
+            position += len(chunk)
+            chunk = self.stream.read(self.chunksize)
+        return position
+
+    def read_chunk(self):
+        """
+        Return list of the next orders, chunksize at most, as (tick,
+        direction, price, quantity, agent, asset, ttl, stop, visible)
+        tuples, asset and options being None if the order has none.
+        Empty list at end of log.
+        """
+        if self.stream is None:
+            chunk = self.orders[self.position:self.position+self.chunksize]
+        else:
+            chunk = self.stream.read(self.chunksize)
+        self.position += len(chunk)
+        if self.assets:
+            assets = [asset >= 0 and self.assets[asset] or None
+                    for asset in chunk['asset'].tolist()]
+        else:
+            assets = [None]*len(chunk)
+        columns = [chunk['tick'].tolist(), chunk['direction'].tolist(),
+                chunk['price'].tolist(), chunk['quantity'].tolist(),
+                chunk['agent'].tolist(), assets]
+        for (key, keytype) in ORDEROPTIONS:
+            columns.append(optional_values(chunk[key]))
+        return zip(*columns)
+
+    def read(self):
+        """
+        Return next order as a dict.
+        Raise EOFError if there is no order left.
+        """
+        if not self.chunk:
+            self.chunk = self.read_chunk()
+            if not self.chunk:
+                raise EOFError, "end of orders log"
+            self.chunk.reverse()
+        fields = self.chunk.pop()
+        order = {'direction':fields[1], 'price':fields[2],
+                'quantity':fields[3], 'agent':fields[4]}
+        if fields[5] is not None:
+            order['asset'] = fields[5]
+        for ((key, keytype), value) in zip(ORDEROPTIONS, fields[6:]):
+            if value is not None:
+                order[key] = value
+        return order
+
+    def to_csv(self, outputfile, delimiter=';'):
+        """
+        Write orders to outputfile as a CSV orders log, from the start
+        of the log, as engines write them.
+        """
+        name = os.path.splitext(os.path.basename(self.filename))[0]
+        print >> outputfile, "# %s orders log" % name
+        print >> outputfile, "# direction : buy=0, sell=1"
+        fields = ['%d', '%.2f', '%d', '%d']
+        if self.assets:
+            print >> outputfile, "# direction;price;volume;agent;asset"
+            fields.append('%s')
+        else:
+            print >> outputfile, "# direction;price;volume;agent"
+        mask = delimiter.join(fields)
+        line = mask + '\n'
+        width = len(fields) + 1
+        nooptions = (None,)*len(ORDEROPTIONS)
+        self.seek(0, 0)
+        chunk = self.read_chunk()
+        while chunk:
+            if [order for order in chunk if order[6:] != nooptions]:
+                # options as name=value fields, see Engine.output_order()
+                lines = []
+                for order in chunk:
+                    lines.append(mask % order[1:width])
+                    for ((key, keytype), value) in zip(ORDEROPTIONS,
+                            order[6:]):
+                        if value is not None:
+                            lines.append("%s%s=%s" % (delimiter, key, value))
+                    lines.append('\n')
+                outputfile.write(''.join(lines))
+            else:
+                outputfile.write((line*len(chunk)) % tuple(
+                    chain.from_iterable(order[1:width] for order in chunk)))
+            chunk = self.read_chunk()
+
+def write_transactions_header(outputfile, name, assets=None):
+    """
+    Write binary output file header, for experiment name
+    """
+    write_header(outputfile, TRANSACTIONS_MAGIC,
+            "%s\n%s" % (';'.join(assets or []), name))
+
+class BinaryTransactionWriter(TransactionWriter):
+    """
+    Write transactions to a binary output file, as TransactionWriter
+    does to CSV ones : records are packed size at a time (see
+    format()), without formatting. fields are the formats of the CSV fields of the market
+    (see Market.transactionfields), with an asset field if the market
+    has assets.
+    >>> import os, tempfile
+    >>> from fms.utils.binary import BinaryTransactionWriter
+    >>> from fms.utils.binary import TransactionsReader, convert
+    >>> from fms.utils.binary import write_transactions_header
+    >>> (fd, filename) = tempfile.mkstemp()
+    >>> outputfile = os.fdopen(fd, 'wb')
+    >>> write_transactions_header(outputfile, 'test', ['ACME', 'INITECH'])
+    >>> writer = BinaryTransactionWriter(outputfile,
+    ...     ('%d','%d','%s','%.2f','%d'), ['ACME', 'INITECH'], 2)
+    >>> writer.append((1, 0, 'INITECH', 10.0, 25))
+    >>> writer.append((1, 1, 'ACME', 10.5, 5))
+    >>> writer.append((3, 2, 'INITECH', 9.99, 1))
+    >>> writer.flush()
+    >>> outputfile.close()
+    >>> reader = TransactionsReader(filename)
+    >>> reader.name, reader.assets, len(reader)
+    ('test', ['ACME', 'INITECH'], 3)
+    >>> reader.transactions['price'].tolist()
+    [10.0, 10.5, 9.99]
+
+    Binary output files are converted back to CSV with to_csv(), or
+    convert(), which writes orders logs too.
+    >>> import sys
+    >>> convert(filename, sys.stdout)
+    # test
+    time;transaction;asset;price;volume
+    1;0;INITECH;10.00;25
+    1;1;ACME;10.50;5
+    3;2;INITECH;9.99;1
+    >>> os.remove(filename)
+
+    """
+
+    def __init__(self, outputfile, fields, assets=None,
+            size=TRANSACTIONBUFFER):
+        TransactionWriter.__init__(self, outputfile, '', size)
+        self.withasset = len(fields) == len(TRANSACTION_FIELDS)
+        self.assetsindex = dict((asset, i) for (i, asset)
+                in enumerate(assets or []))
+        self.packer = struct.Struct('<' + TRANSACTION_FORMAT*self.size)
+
+    def format(self, records):
+        """
+        Return records packed as binary records
+        """
+        if len(records) == self.size:
+            packer = self.packer
+        else:
+            packer = struct.Struct('<' + TRANSACTION_FORMAT*len(records))
+        if self.withasset:
+            index = self.assetsindex
+            records = [(time, transaction, price, quantity,
+                    index.get(asset, -1)) for (time, transaction, asset,
+                    price, quantity) in records]
+        else:
+            records = [record + (-1,) for record in records]
+        return packer.pack(*chain.from_iterable(records))
+
+class TransactionsReader:
+    """
+    Read transactions from a binary output file, mapped in memory.
+
+    self.transactions is a NumPy structured array of the
+    TRANSACTION_FIELDS, self.name and self.assets the experiment name
+    and assets. Compressed files are not mapped : self.transactions
+    is None, and self.stream a RecordsStream of the transactions.
+    """
+
+    def __init__(self, filename):
+        (header, offset) = read_header(filename, TRANSACTIONS_MAGIC)
+        (assets, self.name) = header.split('\n', 1)
+        if assets:
+            self.assets = assets.split(';')
+        else:
+            self.assets = []
+        if compression(filename):
+            self.transactions = None
+            self.stream = RecordsStream(filename, offset,
+                    TRANSACTION_FIELDS)
+        else:
+            self.transactions = map_records(filename, offset,
+                    TRANSACTION_FIELDS)
+            self.stream = None
+
+    def __len__(self):
+        if self.stream is None:
+            return len(self.transactions)
+        return len(self.stream)
+
+    def read_chunk(self, start, chunksize):
+        """
+        Return array of chunksize transactions at most, from
+        transaction number start on
+        """
+        if self.stream is None:
+            return self.transactions[start:start+chunksize]
+        self.stream.seek(start)
+        return self.stream.read(chunksize)
+
+    def to_csv(self, outputfile, delimiter=';', chunksize=TRANSACTIONBUFFER):
+        """
+        Write transactions to outputfile as a CSV output file
+        """
+        print >> outputfile, "# %s" % self.name
+        if self.assets:
+            print >> outputfile, "time;transaction;asset;price;volume"
+            fields = ('%d','%d','%s','%.2f','%d')
+        else:
+            print >> outputfile, "time;transaction;price;volume"
+            fields = ('%d','%d','%.2f','%d')
+        writer = TransactionWriter(outputfile, delimiter.join(fields),
+                chunksize)
+        start = 0
+        chunk = self.read_chunk(start, chunksize)
+        while len(chunk):
+            start += len(chunk)
+            columns = [chunk['time'].tolist(), chunk['transaction'].tolist()]
+            if self.assets:
+                columns.append([asset >= 0 and self.assets[asset] or None
+                        for asset in chunk['asset'].tolist()])
+            columns.extend((chunk['price'].tolist(),
+                    chunk['quantity'].tolist()))
+            for record in zip(*columns):
+                writer.append(record)
+            chunk = self.read_chunk(start, chunksize)
+        writer.flush()
+
+def convert(filename, outputfile, delimiter=';'):
+    """
+    Write binary output file or orders log filename to outputfile, as
+    a CSV file
+    """
+    binfile = open_file(filename, 'rb')
+    magic = binfile.read(len(MAGIC))
+    binfile.close()
+    if magic == MAGIC:
+        OrdersLogReader(filename).to_csv(outputfile, delimiter)
+    elif magic == TRANSACTIONS_MAGIC:
+        TransactionsReader(filename).to_csv(outputfile, delimiter)
+    else:
+        raise ValueError, "%s is not a binary output file" % filename
+
+def _test():
+    """
+    Run tests in docstrings
+    """
+    import doctest
+    doctest.testmod(optionflags=+doctest.ELLIPSIS)
+
+if __name__ == '__main__':
+    _test()
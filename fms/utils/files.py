@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+"""
+Output and input files, compressed according to their extension.
+
+Files whose name ends with .gz, .bz2, .xz or .lzma are written and read
+through the gzip, bz2 or lzma modules, as streams : nothing is
+decompressed to temporary files. On Python 2, the lzma module comes
+with the backports.lzma package.
+"""
+
+import os
+import sys
+import gzip
+import bz2
+import logging
+
+logger = logging.getLogger('fms.utils.files')
+
+COMPRESSIONS = {'.gz': 'gzip', '.bz2': 'bz2', '.xz': 'lzma', '.lzma': 'lzma'}
+# gzip compression level, trading some size for speed
+GZIPLEVEL = 6
+
+def compression(filename):
+    """
+    Return compression of filename, from its extension, None if none
+    >>> from fms.utils.files import compression
+    >>> compression('exp.csv.gz'), compression('exp.log.xz')
+    ('gzip', 'lzma')
+    >>> print compression('exp.csv')
+    None
+
+    """
+    return COMPRESSIONS.get(os.path.splitext(filename)[1])
+
+def splitext(filename):
+    """
+    Split filename in root and extension, the extension of compressed
+    files including their compression extension
+    >>> from fms.utils.files import splitext
+    >>> splitext('output/exp.csv.bz2'), splitext('exp.log')
+    (('output/exp', '.csv.bz2'), ('exp', '.log'))
+
+    """
+    (root, extension) = os.path.splitext(filename)
+    if extension in COMPRESSIONS:
+        (root, inner) = os.path.splitext(root)
+        extension = inner + extension
+    return (root, extension)
+
+class BZ2File(bz2.BZ2File):
+    """
+    bz2.BZ2File, with the flush() method of other files, doing nothing :
+    data is compressed by blocks, written when full or at close.
+    """
+
+    def flush(self):
+        pass
+
+def _import_lzma():
+    """
+    Return lzma module, from the standard library or backports.lzma
+    """
+    try:
+        import lzma
+    except ImportError:
+        try:
+            from backports import lzma
+        except ImportError:
+            logger.critical(
+                    "Please install the backports.lzma module for .xz files.")
+            logger.critical(
+                    "See https://pypi.python.org/pypi/backports.lzma/")
+            sys.exit(2)
+    return lzma
+
+def open_file(filename, mode='r'):
+    """
+    Open filename with mode, compressed according to its extension
+    (see compression()). Compressed files are always binary files.
+    >>> import os, tempfile
+    >>> from fms.utils.files import open_file
+    >>> (fd, filename) = tempfile.mkstemp(suffix='.csv.gz')
+    >>> os.close(fd)
+    >>> outputfile = open_file(filename, 'w')
+    >>> print >> outputfile, "1;0;10.00;25"
+    >>> outputfile.close()
+    >>> import gzip
+    >>> print gzip.open(filename).read(),
+    1;0;10.00;25
+    >>> print open_file(filename).read(),
+    1;0;10.00;25
+    >>> os.remove(filename)
+
+    """
+    kind = compression(filename)
+    if kind == 'gzip':
+        return gzip.open(filename, mode, GZIPLEVEL)
+    if kind == 'bz2':
+        return BZ2File(filename, mode)
+    if kind == 'lzma':
+        return _import_lzma().LZMAFile(filename, mode)
+    return open(filename, mode)
+
+def _test():
+    """
+    Run tests in docstrings
+    """
+    import doctest
+    doctest.testmod(optionflags=+doctest.ELLIPSIS)
+
+if __name__ == '__main__':
+    _test()
@@ -0,0 +1,211 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+"""
+Market history, shared by the market and the agents.
+"""
+
+from array import array
+
+from fms.utils import BUY, SELL
+from fms.utils.stats import RunningStats
+
+class FillsWindow(RunningStats):
+    """
+    View of the last window fills of a MarketHistory series (all of
+    them if window is None), with O(1) aggregates.
+
+    FillsWindow is a RunningStats keeping extremes (see
+    fms.utils.stats) over the prices array of the history, which is
+    shared by all windows : the history appends fills by their index
+    in its arrays, and bounded windows only keep these indices. It
+    also keeps the traded volume and amount, for vwap().
+    >>> from fms.utils.history import MarketHistory, FillsWindow
+    >>> history = MarketHistory()
+    >>> fills = FillsWindow(history, 3)
+    >>> for price, quantity in ((10., 1), (12., 3), (8., 1), (11., 1)):
+    ...     history.record('bob', 'smith', price, quantity)
+    ...     fills.append(len(history) - 1)
+    >>> list(fills.values), fills.get_values(), fills.mean()
+    ([1, 2, 3], [12.0, 8.0, 11.0], 10.333...)
+    >>> fills.min(), fills.max(), fills.vwap()
+    (8.0, 12.0, 11.0)
+
+    """
+
+    def __init__(self, history, window=None):
+        RunningStats.__init__(self, window, True, history.prices)
+        self.quantities = history.quantities
+        self.volume = 0
+        self.amount = 0.
+
+    def append(self, index):
+        """
+        Add fill number index of the history to the series, dropping
+        the oldest one if the window is full.
+        """
+        prices, quantities = self.source, self.quantities
+        if self.window and self.count == self.window:
+            oldest = self.values[0]
+            self.volume -= quantities[oldest]
+            self.amount -= prices[oldest]*quantities[oldest]
+        RunningStats.append(self, index)
+        price = prices[index]
+        quantity = quantities[index]
+        self.volume += quantity
+        if not self.window or self.pushes % self.window:
+            self.amount += price*quantity
+        else:
+            self.amount = sum([prices[i]*quantities[i] for i in self.values])
+
+    def vwap(self):
+        """
+        Volume weighted average price.
+        Raises ZeroDivisionError if the series is empty.
+        """
+        return self.amount/self.volume
+
+class MarketHistory:
+    """
+    Prices and quantities of all the transactions of an experiment.
+
+    The history is kept by the market (see Market.settle()), when
+    the experiment has a true history parameter. Fills are stored in
+    arrays, along with their prefix sums, so that the mean price and
+    the VWAP of the last n fills are O(1), whatever n.
+    >>> from fms.utils.history import MarketHistory
+    >>> history = MarketHistory()
+    >>> for price, quantity in ((10., 1), (12., 3), (8., 1), (11., 1)):
+    ...     history.record('bob', 'smith', price, quantity)
+    >>> len(history), history.last()
+    (4, 11.0)
+    >>> history.mean(), history.mean(3), history.vwap(3)
+    (10.25, 10.333..., 11.0)
+
+    Lowest and highest prices of the last n fills are O(1) too for
+    the windows given to track() (all fills being always tracked),
+    other windows are scanned.
+    >>> history.track(2)
+    >>> history.min(), history.max(2), history.min(3)
+    (8.0, 11.0, 8.0)
+
+    Agents do not need to keep their own fills : follow() returns a
+    FillsWindow view of the last fills of an agent, possibly in a
+    given direction, which the history updates on each transaction.
+    >>> from fms.utils import BUY
+    >>> buys = history.follow('bob', 2, BUY)
+    >>> history.record('bob', 'smith', 9., 2)
+    >>> history.record('smith', 'bob', 13., 1)
+    >>> buys.get_values(), buys.vwap()
+    ([9.0], 9.0)
+
+    """
+
+    def __init__(self):
+        self.prices = array('d')
+        self.quantities = array('l')
+        # prefix sums : sums[i] is the sum of the i first prices
+        self.sums = array('d', [0.])
+        self.volumes = array('l', [0])
+        self.amounts = array('d', [0.])
+        self.tracked = {None: FillsWindow(self)}
+        self.views = {}
+
+    def __len__(self):
+        return len(self.prices)
+
+    def record(self, buyer, seller, price, quantity):
+        """
+        Record a transaction between buyer and seller
+        """
+        index = len(self.prices)
+        self.prices.append(price)
+        self.quantities.append(quantity)
+        self.sums.append(self.sums[-1] + price)
+        self.volumes.append(self.volumes[-1] + quantity)
+        self.amounts.append(self.amounts[-1] + price*quantity)
+        for fills in self.tracked.itervalues():
+            fills.append(index)
+        for (agent, direction) in ((buyer, BUY), (seller, SELL)):
+            for (side, fills) in self.views.get(agent, ()):
+                if side is None or side == direction:
+                    fills.append(index)
+
+    def track(self, window):
+        """
+        Keep lowest and highest prices of the last window fills.
+        """
+        if not window in self.tracked:
+            fills = FillsWindow(self, window)
+            for i in xrange(self.first(window), len(self.prices)):
+                fills.append(i)
+            self.tracked[window] = fills
+
+    def follow(self, agent, window=None, direction=None):
+        """
+        Return FillsWindow view of the last window fills of agent, BUY
+        or SELL ones only if direction is given.
+        """
+        fills = FillsWindow(self, window)
+        self.views.setdefault(agent, []).append((direction, fills))
+        return fills
+
+    def first(self, n):
+        """
+        Index of the first of the last n fills, all if n is None
+        """
+        if n is None or n > len(self.prices):
+            return 0
+        return len(self.prices) - n
+
+    def last(self):
+        """
+        Last transaction price, None if none
+        """
+        if self.prices:
+            return self.prices[-1]
+        return None
+
+    def mean(self, n=None):
+        """
+        Mean price of the last n fills (all fills if n is None)
+        Raises ZeroDivisionError if there is no fill.
+        """
+        i = self.first(n)
+        return (self.sums[-1] - self.sums[i])/(len(self.prices) - i)
+
+    def vwap(self, n=None):
+        """
+        Volume weighted average price of the last n fills (all fills
+        if n is None). Raises ZeroDivisionError if there is no fill.
+        """
+        i = self.first(n)
+        return (self.amounts[-1] - self.amounts[i]) / \
+                (self.volumes[-1] - self.volumes[i])
+
+    def min(self, n=None):
+        """
+        Lowest price of the last n fills (all fills if n is None).
+        Raises ValueError if there is no fill.
+        """
+        if n in self.tracked:
+            return self.tracked[n].min()
+        return min(self.prices[self.first(n):])
+
+    def max(self, n=None):
+        """
+        Highest price of the last n fills (all fills if n is None).
+        Raises ValueError if there is no fill.
+        """
+        if n in self.tracked:
+            return self.tracked[n].max()
+        return max(self.prices[self.first(n):])
+
+def _test():
+    """
+    Run tests in docstrings
+    """
+    import doctest
+    doctest.testmod(optionflags=+doctest.ELLIPSIS)
+
+if __name__ == '__main__':
+    _test()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+"""
+Orders logs index.
+
+When the experiment orderslogindex parameter is true, engines mark the
+start of each day in the orders logs (see Engine.start_day()) : CSV
+logs get a '# day <day> tick <tick>' comment line, and an index file
+(see index_filename()) gets a line with, ';' separated :
+- day: day number, counted from 0 over all the experiment engines
+- tick: world tick the day starts at
+- offset: position of the day comment line in the CSV log, -1 if none
+- record: number of orders in the binary log before the day, -1 if none
+- transaction: market transactions count at the start of the day
+Replays may then start at any day, without reading the orders placed
+before it (see the ReplayOrdersLog engine).
+"""
+
+INDEX_HEADER = "# day;tick;offset;record;transaction"
+
+def index_filename(logfilename):
+    """
+    Return name of the index of orders log logfilename. Binary logs
+    written next to CSV ones ('both' orders log format) share their
+    index.
+    >>> from fms.utils.logindex import index_filename
+    >>> index_filename('exp.log'), index_filename('exp.log.bin')
+    ('exp.log.idx', 'exp.log.idx')
+
+    """
+    if logfilename.endswith('.bin'):
+        logfilename = logfilename[:-4]
+    return logfilename + '.idx'
+
+def read_index(filename):
+    """
+    Return dict of the (tick, offset, record, transaction) tuples of
+    index filename, by day
+    """
+    index = {}
+    for line in open(filename, 'r'):
+        if line.startswith('#'):
+            continue
+        fields = [int(field) for field in line.split(';')]
+        index[fields[0]] = tuple(fields[1:])
+    return index
+
+class OrdersLogIndex:
+    """
+    Write orders logs index.
+    >>> from StringIO import StringIO
+    >>> from fms.utils.logindex import OrdersLogIndex
+    >>> indexfile = StringIO()
+    >>> index = OrdersLogIndex(indexfile)
+    >>> index.write_header()
+    >>> index.mark(0, 0, 80, -1, 0)
+    >>> index.mark(1, 1000, 29127, -1, 491)
+    >>> print indexfile.getvalue().strip()
+    # day;tick;offset;record;transaction
+    0;0;80;-1;0
+    1;1000;29127;-1;491
+
+    """
+
+    def __init__(self, indexfile):
+        self.indexfile = indexfile
+
+    def write_header(self):
+        """
+        Write index header
+        """
+        print >> self.indexfile, INDEX_HEADER
+
+    def mark(self, day, tick, offset, record, transaction):
+        """
+        Write day start
+        """
+        print >> self.indexfile, "%d;%d;%d;%d;%d" % (day, tick, offset,
+                record, transaction)
+
+    def close(self):
+        self.indexfile.close()
+
+def _test():
+    """
+    Run tests in docstrings
+    """
+    import doctest
+    doctest.testmod(optionflags=+doctest.ELLIPSIS)
+
+if __name__ == '__main__':
+    _test()
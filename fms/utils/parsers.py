@@ -9,8 +9,15 @@ import os
 import logging
 import yaml
 
-from fms.utils import CSVDELIMITERS, OPTS_VAL, OPTS_BOOL
+from fms.utils import CSVDELIMITERS, ORDERSLOGFORMATS, OUTPUTFORMATS
+from fms.utils import OPTS_VAL, OPTS_BOOL
 from fms.utils.exceptions import MissingParameter
+from fms.utils.binary import OrdersLogWriter, BinaryTransactionWriter
+from fms.utils.binary import write_transactions_header
+from fms.utils.logindex import OrdersLogIndex, index_filename
+from fms.utils.transactions import TransactionWriter, TRANSACTIONBUFFER
+from fms.utils.files import open_file
+from fms.utils.asyncwriter import AsyncWriter
 
 logger = logging.getLogger('fms.utils.parsers')
 
@@ -26,6 +33,11 @@ class _ParamsParser(dict):
         logger.info("Reading config file %s" % filename)
         self.outputfile = sys.stderr
         self.orderslogfile = None
+        self.binaryorderslog = None
+        self.ordersindex = None
+        self.asyncwriter = None
+        # TransactionWriter by transactions fields formats
+        self.transactionwriters = {}
 
     def splitclassname(self, fullclassname):
         """
@@ -56,22 +68,72 @@ class _ParamsParser(dict):
             else:
                 outputfilename = self['outputfilename']
             logger.info("Creating %s" % outputfilename)
-            self.outputfile = open(outputfilename, 'w')
+            if self.get('outputformat') == 'binary':
+                self.outputfile = open_file(outputfilename, 'wb')
+            else:
+                self.outputfile = open_file(outputfilename, 'w')
         else:
             self.outputfile = sys.stdout
+        self.transactionwriters = {}
 
         if self['orderslogfilename']:
             if '-%03d' in self['orderslogfilename']:
                 orderslogfilename = self['orderslogfilename'] % turn
             else:
                 orderslogfilename = self['orderslogfilename']
+            logformat = self.get('orderslogformat', 'csv')
             logger.info("Creating %s" % orderslogfilename)
-            self.orderslogfile = open(orderslogfilename, 'w')
+            if logformat == 'binary':
+                self.binaryorderslog = OrdersLogWriter(
+                        open_file(orderslogfilename, 'wb'),
+                        self.get('assets'))
+            else:
+                self.orderslogfile = open_file(orderslogfilename, 'w')
+            if logformat == 'both':
+                logger.info("Creating %s.bin" % orderslogfilename)
+                self.binaryorderslog = OrdersLogWriter(
+                        open_file(orderslogfilename + '.bin', 'wb'),
+                        self.get('assets'))
+            if self.get('orderslogindex'):
+                logger.info("Creating %s" % index_filename(orderslogfilename))
+                self.ordersindex = OrdersLogIndex(
+                        open(index_filename(orderslogfilename), 'w'))
+
+        if self.get('asyncoutput'):
+            self.asyncwriter = AsyncWriter()
+            self.outputfile = self.asyncwriter.open(self.outputfile)
+            if self.orderslogfile:
+                self.orderslogfile = self.asyncwriter.open(
+                        self.orderslogfile)
+            if self.binaryorderslog:
+                self.binaryorderslog.logfile = self.asyncwriter.open(
+                        self.binaryorderslog.logfile)
+
+    def transaction_writer(self, fields):
+        """
+        Return the TransactionWriter of output file transactions with
+        fields formats (see Market.transactionfields), shared by all
+        markets using the same fields. Binary output files (outputformat
+        parameter) get a BinaryTransactionWriter.
+        """
+        if not fields in self.transactionwriters:
+            size = self.get('transactionbuffer') or TRANSACTIONBUFFER
+            if self.get('outputformat') == 'binary':
+                writer = BinaryTransactionWriter(self.outputfile, fields,
+                        self.get('assets'), size)
+            else:
+                writer = TransactionWriter(self.outputfile,
+                        self['csvdelimiter'].join(fields), size)
+            self.transactionwriters[fields] = writer
+        return self.transactionwriters[fields]
 
     def close_files(self, turn):
         """
         Close all output files
         """
+        for writer in self.transactionwriters.values():
+            writer.flush()
+        self.transactionwriters = {}
         if self['outputfilename'] != 'sys.stdout':
             if '-%03d' in self['outputfilename']:
                 outputfilename = self['outputfilename'] % turn
@@ -89,9 +151,18 @@ class _ParamsParser(dict):
                 orderslogfilename = self['orderslogfilename']
             logger.info("Closing %s" % orderslogfilename)
             try:
-                self.orderslogfile.close()
+                if self.orderslogfile:
+                    self.orderslogfile.close()
+                if self.binaryorderslog:
+                    self.binaryorderslog.close()
+                if self.ordersindex:
+                    self.ordersindex.close()
             except IOError:
                 pass
+        if self.asyncwriter:
+            # wait for the writer thread to write and close all files
+            self.asyncwriter.close()
+            self.asyncwriter = None
 
 
     def printparams(self):
@@ -147,14 +218,30 @@ class _ParamsParser(dict):
         """
         Outputs headers to result and log file
         """
-        print >> self.outputfile, "# %s" % self['name']
-        print >> self.outputfile, "time;transaction;price;volume"
+        if self.get('outputformat') == 'binary':
+            write_transactions_header(self.outputfile, self['name'],
+                    self.get('assets'))
+        else:
+            print >> self.outputfile, "# %s" % self['name']
+            if self.get('assets'):
+                print >> self.outputfile, \
+                        "time;transaction;asset;price;volume"
+            else:
+                print >> self.outputfile, "time;transaction;price;volume"
         self.outputfile.flush()
 
-        if self['orderslogfilename']:
+        if self.binaryorderslog:
+            self.binaryorderslog.write_header()
+        if self.ordersindex:
+            self.ordersindex.write_header()
+        if self['orderslogfilename'] and self.orderslogfile:
             print >> self.orderslogfile, "# %s orders log" % self['name']
             print >> self.orderslogfile, "# direction : buy=0, sell=1"
-            print >> self.orderslogfile, "# direction;price;volume;agent"
+            if self.get('assets'):
+                print >> self.orderslogfile, \
+                        "# direction;price;volume;agent;asset"
+            else:
+                print >> self.orderslogfile, "# direction;price;volume;agent"
             self.orderslogfile.flush()
 
 
@@ -340,14 +427,31 @@ class YamlParamsParser(_ParamsParser):
     - ouputfile: file handler where to write transactions
     - orderslogfile: file handler, might be missing, where to
       log agents orders (desires)
+    - binaryorderslog: OrdersLogWriter, might be missing, where to
+      log agents orders in binary format
+    - ordersindex: OrdersLogIndex, might be missing, where to
+      index orders logs days
 
     This class is a dict subclass, with following keys:
     - name: experiment name, config filename if missing
     - randomseed: seed for random lib, None if missing
     - outputfilename: 'sys.stdout' if missing
+    - outputformat: output file format, csv or binary, csv if missing
     - orderslogfilename: logs all agents desires, None if missing
+    - orderslogformat: orders log format, csv, binary or both, csv if
+      missing
+    - orderslogindex: index orders logs days, False if missing
+    - asyncoutput: write output files from a thread, False if missing
+    - firstday, lastday: first and last days to replay, None if missing
+      (replay from first day to last one)
     - csvdelimiter: csv output files delimiter
+    - transactionbuffer: number of transactions written at once, 4096
+      if missing
     - unique_by_agent: unique order per agent in books
+    - assets: list of assets names, None if missing (single asset)
+    - orderttl: orders time to live in ticks, None if missing (no expiry)
+    - history: keep market history for agents, False if missing
+    - lazyagents: create agents on first use, False if missing
     - world: error if missing
     - engines: list of engines, error if missing (one engine minimum)
     - agents: list of agents classes, error if missing (at least one)
@@ -399,6 +503,21 @@ class YamlParamsParser(_ParamsParser):
         if not 'unique_by_agent' in self:
             self['unique_by_agent'] = True
 
+        if not 'assets' in self:
+            self['assets'] = None
+
+        if not 'orderttl' in self:
+            self['orderttl'] = None
+
+        if not 'history' in self:
+            self['history'] = False
+
+        if not 'lazyagents' in self:
+            self['lazyagents'] = False
+
+        if not 'transactionbuffer' in self:
+            self['transactionbuffer'] = TRANSACTIONBUFFER
+
         if 'csvdelimiter' in self:
             if not self['csvdelimiter'] in CSVDELIMITERS:
                 self['csvdelimiter'] = ';'
@@ -406,6 +525,22 @@ class YamlParamsParser(_ParamsParser):
             self['csvdelimiter'] = ';'
 
 
+        if not 'orderslogindex' in self:
+            self['orderslogindex'] = False
+
+        if not 'asyncoutput' in self:
+            self['asyncoutput'] = False
+
+        for key in ('firstday', 'lastday'):
+            if not key in self:
+                self[key] = None
+
+        if not self.get('orderslogformat') in ORDERSLOGFORMATS:
+            self['orderslogformat'] = 'csv'
+
+        if not self.get('outputformat') in OUTPUTFORMATS:
+            self['outputformat'] = 'csv'
+
         if 'outputfilename' in self:
             self['outputfilename'] = os.path.join(self.exp_path, 
                     self['outputfilename'])
@@ -440,6 +575,12 @@ class YamlParamsParser(_ParamsParser):
                 if not paramkey in agent:
                     agent[paramkey] = 1
 
+        for agent in self['agents']:
+            if agent.get('pool') and agent.get('randombuffer'):
+                # pooled agents share their parameters, not buffers
+                raise ValueError, "%s agents: pool can not be used " \
+                        "with randombuffer" % agent['classname']
+
         for paramkey in ('days', 'daylength', 'clearbooksateod'):
             for engine in self['engines']:
                 if not paramkey in engine:
@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+"""
+Buffered random numbers for agents.
+"""
+
+import sys
+import logging
+
+logger = logging.getLogger('fms.utils.randombuffer')
+
+class RandomBuffer(object):
+    """
+    Random numbers generator drawing uniforms by blocks.
+
+    RandomBuffer provides the random(), randint() and choice()
+    functions of the random module, which agents use through their
+    rng attribute. Uniforms are drawn size at a time with a NumPy
+    RandomState, seeded with seed, and handed out one by one : the
+    cost of a call is mostly a list pop. The buffer is refilled when
+    empty, so that a given seed always gives the same numbers.
+    >>> from fms.utils.randombuffer import RandomBuffer
+    >>> rng = RandomBuffer(42, 16)
+    >>> draws = [rng.randint(1, 6) for i in range(100)]
+    >>> min(draws), max(draws)
+    (1, 6)
+    >>> other = RandomBuffer(42, 16)
+    >>> draws == [other.randint(1, 6) for i in range(100)]
+    True
+    >>> 0 <= rng.random() < 1, rng.choice(('buy', 'sell')) in ('buy', 'sell')
+    (True, True)
+
+    As random.randint, randint raises ValueError on empty ranges.
+    >>> rng.randint(1, 0)
+    Traceback (most recent call last):
+        ...
+    ValueError: empty range for randint() (1, 0)
+
+    """
+
+    __slots__ = ('generator', 'size', 'buffer')
+
+    def __init__(self, seed=None, size=256):
+        try:
+            import numpy
+        except ImportError:
+            logger.critical(
+                    "Please install the numpy module to use random buffers.")
+            logger.critical("See http://numpy.scipy.org/ for installation.")
+            sys.exit(2)
+        self.generator = numpy.random.RandomState(seed)
+        self.size = size
+        self.buffer = []
+
+    def refill(self):
+        """
+        Draw the next size uniforms
+        """
+        self.buffer = self.generator.random_sample(self.size).tolist()
+        return self.buffer
+
+    def random(self):
+        """
+        Next uniform in [0, 1)
+        """
+        return (self.buffer or self.refill()).pop()
+
+    def randint(self, a, b):
+        """
+        Random integer N such that a <= N <= b, a and b being integers
+        """
+        if b < a:
+            raise ValueError, "empty range for randint() (%s, %s)" % (a, b)
+        return a + int((self.buffer or self.refill()).pop()*(b-a+1))
+
+    def choice(self, seq):
+        """
+        Random element of the non empty sequence seq
+        """
+        return seq[int((self.buffer or self.refill()).pop()*len(seq))]
+
+def _test():
+    """
+    Run tests in docstrings
+    """
+    import doctest
+    doctest.testmod(optionflags=+doctest.ELLIPSIS)
+
+if __name__ == '__main__':
+    _test()
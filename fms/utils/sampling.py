@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+"""
+Weighted sampling of agents.
+"""
+
+import random
+
+class AliasTable:
+    """
+    Walker's alias table, drawing indices in proportion to weights.
+
+    The table is built once, in O(n), then each draw is O(1) : one
+    uniform picks a column, and the fractional part of it chooses
+    between the column index and its alias.
+    >>> from fms.utils.sampling import AliasTable
+    >>> table = AliasTable([1, 3, 0, 4])
+    >>> table.prob
+    [0.5, 1.0, 0.0, 0.5]
+    >>> table.alias
+    [3, 1, 3, 1]
+    >>> [table.draw(u) for u in (0.1, 0.2, 0.6, 0.7, 0.9)]
+    [0, 3, 3, 3, 1]
+
+    Without any uniform, draw() uses the random function given to the
+    constructor (random.random by default). draw_block() draws size
+    indices at once, with a NumPy RandomState.
+    >>> import random
+    >>> random.seed(1)
+    >>> draws = [table.draw() for i in xrange(8000)]
+    >>> [int(round(draws.count(i)/1000.)) for i in range(4)]
+    [1, 3, 0, 4]
+    >>> import numpy
+    >>> table.draw_block(numpy.random.RandomState(1), 5)
+    array([1, 3, 0, 1, 3])
+
+    Weights should be non negative numbers, with a positive sum.
+    >>> table = AliasTable([1, -1])
+    Traceback (most recent call last):
+        ...
+    ValueError: invalid weights [1, -1]
+
+    """
+
+    def __init__(self, weights, random=random.random):
+        self.size = len(weights)
+        total = float(sum(weights))
+        if not weights or total <= 0 or min(weights) < 0:
+            raise ValueError, "invalid weights %s" % weights
+        self.random = random
+        scaled = [weight*self.size/total for weight in weights]
+        self.prob = [1.]*self.size
+        self.alias = range(self.size)
+        small = [i for (i, p) in enumerate(scaled) if p < 1]
+        large = [i for (i, p) in enumerate(scaled) if p >= 1]
+        while small and large:
+            less = small.pop()
+            more = large.pop()
+            self.prob[less] = scaled[less]
+            self.alias[less] = more
+            scaled[more] += scaled[less] - 1
+            if scaled[more] < 1:
+                small.append(more)
+            else:
+                large.append(more)
+
+    def draw(self, uniform=None):
+        """
+        Return index drawn from uniform, in [0, 1), or from a new one
+        """
+        if uniform is None:
+            uniform = self.random()
+        uniform *= self.size
+        i = int(uniform)
+        if uniform - i < self.prob[i]:
+            return i
+        return self.alias[i]
+
+    def draw_block(self, rng, size):
+        """
+        Return NumPy array of size indices, drawn with RandomState rng
+        """
+        import numpy
+        uniforms = rng.random_sample(size)*self.size
+        columns = uniforms.astype(int)
+        keep = uniforms - columns < numpy.asarray(self.prob)[columns]
+        return numpy.where(keep, columns, numpy.asarray(self.alias)[columns])
+
+def _test():
+    """
+    Run tests in docstrings
+    """
+    import doctest
+    doctest.testmod(optionflags=+doctest.ELLIPSIS)
+
+if __name__ == '__main__':
+    _test()
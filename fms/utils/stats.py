@@ -0,0 +1,250 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+"""
+Incremental statistics helpers for agents.
+"""
+
+import bisect
+from collections import deque
+
+class RunningStats:
+    """
+    Running sum and count of a series of values, with an optional
+    bounded window.
+
+    Appending a value and getting the mean are O(1), whatever the
+    length of the series. Without a window, the sum is computed in
+    the very order values were appended, thus mean() is exactly
+    float(sum(values))/len(values).
+    >>> from fms.utils.stats import RunningStats
+    >>> stats = RunningStats()
+    >>> for value in (1.10, 2.20, 3.30):
+    ...     stats.append(value)
+    >>> len(stats)
+    3
+    >>> stats.mean() == float(sum((1.10, 2.20, 3.30)))/3
+    True
+    >>> RunningStats().mean()
+    Traceback (most recent call last):
+        ...
+    ZeroDivisionError: float division by zero
+
+    With a window, only the last window values are kept, and
+    memory is bounded.
+    >>> stats = RunningStats(2)
+    >>> for value in (1, 2, 3):
+    ...     stats.append(value)
+    >>> len(stats), stats.total, list(stats.values)
+    (2, 5, [2, 3])
+
+    If extremes is true, the lowest and highest values of the series
+    are kept too, in monotonic deques for bounded windows, so that
+    min() and max() are O(1) as well.
+    >>> stats = RunningStats(3, True)
+    >>> for value in (10., 12., 8., 11., 9.):
+    ...     stats.append(value)
+    >>> stats.min(), stats.max()
+    (8.0, 11.0)
+
+    Given a source sequence, the series is made of source items : the
+    appended values are their indices in source, which values keeps
+    instead of copies of the items.
+    >>> prices = [10., 12., 8., 11.]
+    >>> stats = RunningStats(2, True, prices)
+    >>> for index in range(4):
+    ...     stats.append(index)
+    >>> list(stats.values), stats.get_values(), stats.min()
+    ([2, 3], [8.0, 11.0], 8.0)
+
+    """
+
+    def __init__(self, window=None, extremes=False, source=None):
+        self.window = window
+        self.source = source
+        self.total = 0
+        self.count = 0
+        self.extremes = extremes
+        if window:
+            self.values = deque(maxlen=window)
+            self.pushes = 0
+            # (push #, value) with increasing values for lows,
+            # decreasing ones for highs
+            self.lows = deque()
+            self.highs = deque()
+        else:
+            self.values = None
+            self.lowest = None
+            self.highest = None
+
+    def __len__(self):
+        return self.count
+
+    def get_values(self):
+        """
+        List of the values in the window, None if window is None
+        """
+        if self.values is None:
+            return None
+        if self.source is None:
+            return list(self.values)
+        source = self.source
+        return [source[i] for i in self.values]
+
+    def append(self, value):
+        """
+        Add value to the series, dropping the oldest one if the
+        window is full. With a source, value is the index of the
+        item to add.
+        """
+        item = value
+        if self.source is not None:
+            value = self.source[item]
+        if self.values is None:
+            self.total += value
+            self.count += 1
+            if self.extremes:
+                if self.lowest is None or value < self.lowest:
+                    self.lowest = value
+                if self.highest is None or value > self.highest:
+                    self.highest = value
+            return
+        if self.count == self.window:
+            oldest = self.values[0]
+            if self.source is not None:
+                oldest = self.source[oldest]
+            self.total -= oldest
+        else:
+            self.count += 1
+        self.values.append(item)
+        self.pushes += 1
+        if self.pushes % self.window:
+            self.total += value
+        elif self.source is None:
+            # sum again from time to time, so that rounding errors
+            # from subtractions do not pile up
+            self.total = sum(self.values)
+        else:
+            self.total = sum(self.get_values())
+        if self.extremes:
+            oldest = self.pushes - self.window
+            lows, highs = self.lows, self.highs
+            while lows and lows[-1][1] >= value:
+                lows.pop()
+            lows.append((self.pushes, value))
+            if lows[0][0] <= oldest:
+                lows.popleft()
+            while highs and highs[-1][1] <= value:
+                highs.pop()
+            highs.append((self.pushes, value))
+            if highs[0][0] <= oldest:
+                highs.popleft()
+
+    def mean(self):
+        """
+        Mean of the values in the series.
+        Raises ZeroDivisionError if the series is empty.
+        """
+        return float(self.total)/self.count
+
+    def min(self):
+        """
+        Lowest value, extremes being kept.
+        Raises ValueError if the series is empty.
+        """
+        if not self.count:
+            raise ValueError, "no value"
+        if self.window:
+            return self.lows[0][1]
+        return self.lowest
+
+    def max(self):
+        """
+        Highest value, extremes being kept.
+        Raises ValueError if the series is empty.
+        """
+        if not self.count:
+            raise ValueError, "no value"
+        if self.window:
+            return self.highs[0][1]
+        return self.highest
+
+class SortedHistory:
+    """
+    History of values kept sorted, with an optional cap on its
+    length.
+
+    Values are inserted with a bisection, so that the next higher
+    (successor) or lower (predecessor) value than a given one is
+    found in O(log n). Both raise ValueError if there is no such
+    value, as min() and max() do on empty sequences.
+    >>> from fms.utils.stats import SortedHistory
+    >>> bids = SortedHistory()
+    >>> for bid in (2.5, 1.0, 3.2, 2.5):
+    ...     bids.append(bid)
+    >>> bids.values
+    [1.0, 2.5, 2.5, 3.2]
+    >>> bids.successor(2.5), bids.predecessor(2.5)
+    (3.2, 1.0)
+    >>> bids.successor(3.2)
+    Traceback (most recent call last):
+        ...
+    ValueError: no value higher than 3.2
+
+    With a cap, only the last cap values are remembered.
+    >>> bids = SortedHistory(2)
+    >>> for bid in (2.5, 1.0, 3.2):
+    ...     bids.append(bid)
+    >>> bids.values, len(bids)
+    ([1.0, 3.2], 2)
+
+    """
+
+    def __init__(self, cap=None):
+        self.cap = cap
+        self.values = []
+        if cap:
+            self.history = deque()
+        else:
+            self.history = None
+
+    def __len__(self):
+        return len(self.values)
+
+    def append(self, value):
+        """
+        Insert value, forgetting the oldest one if history is full.
+        """
+        bisect.insort(self.values, value)
+        if self.history is not None:
+            self.history.append(value)
+            if len(self.history) > self.cap:
+                oldest = self.history.popleft()
+                del self.values[bisect.bisect_left(self.values, oldest)]
+
+    def successor(self, value):
+        """
+        Lowest value strictly higher than value.
+        """
+        i = bisect.bisect_right(self.values, value)
+        if i == len(self.values):
+            raise ValueError, "no value higher than %s" % value
+        return self.values[i]
+
+    def predecessor(self, value):
+        """
+        Highest value strictly lower than value.
+        """
+        i = bisect.bisect_left(self.values, value)
+        if not i:
+            raise ValueError, "no value lower than %s" % value
+        return self.values[i-1]
+
+def _test():
+    """
+    Run tests in docstrings
+    """
+    import doctest
+    doctest.testmod(optionflags=+doctest.ELLIPSIS)
+
+if __name__ == '__main__':
+    _test()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+"""
+Buffered transactions output.
+"""
+
+from itertools import chain
+
+from fms.utils.asyncwriter import AsyncFile
+
+# default number of transactions kept before writing them
+TRANSACTIONBUFFER = 4096
+
+class TransactionWriter:
+    """
+    Write transactions lines to the experiment output file, by batches.
+
+    Markets append transactions as tuples of the fields of mask, a
+    line format (without end of line). The writer keeps them in a
+    preallocated buffer of size records, and formats them all at once
+    when it is full, or when flushed : by the engines at the end of
+    each day, by the markets before showing their books, and by
+    close_files(). Output is the same as printing each line. With
+    asynchronous output files (see fms.utils.asyncwriter), records are
+    formatted by the writer thread.
+    >>> from StringIO import StringIO
+    >>> from fms.utils.transactions import TransactionWriter
+    >>> outputfile = StringIO()
+    >>> writer = TransactionWriter(outputfile, '%d;%d;%.2f;%d', 2)
+    >>> writer.append((1, 0, 10.0, 25))
+    >>> outputfile.getvalue()
+    ''
+    >>> writer.append((1, 1, 10.5, 5))
+    >>> writer.append((3, 2, 9.99, 1))
+    >>> print outputfile.getvalue(),
+    1;0;10.00;25
+    1;1;10.50;5
+    >>> writer.flush()
+    >>> print outputfile.getvalue(),
+    1;0;10.00;25
+    1;1;10.50;5
+    3;2;9.99;1
+
+    """
+
+    def __init__(self, outputfile, mask, size=TRANSACTIONBUFFER):
+        self.outputfile = outputfile
+        self.mask = mask
+        self.line = mask + '\n'
+        if not size or size < 1:
+            size = 1
+        self.size = size
+        self.buffer = [None]*size
+        self.count = 0
+        self.asyncfile = isinstance(outputfile, AsyncFile)
+
+    def append(self, record):
+        """
+        Add transaction record, a tuple of the mask fields
+        """
+        self.buffer[self.count] = record
+        self.count += 1
+        if self.count == self.size:
+            self.flush()
+
+    def format(self, records):
+        """
+        Return records formatted as output file lines
+        """
+        return (self.line*len(records)) % tuple(chain.from_iterable(records))
+
+    def flush(self):
+        """
+        Write buffered transactions
+        """
+        count = self.count
+        if not count:
+            return
+        if self.asyncfile:
+            self.outputfile.submit(self.format, self.buffer[:count])
+        elif count == self.size:
+            self.outputfile.write(self.format(self.buffer))
+        else:
+            self.outputfile.write(self.format(self.buffer[:count]))
+        self.count = 0
+
+    def sync(self):
+        """
+        Wait until written transactions reach an asynchronous output
+        file
+        """
+        if self.asyncfile:
+            self.outputfile.sync()
+
+def _test():
+    """
+    Run tests in docstrings
+    """
+    import doctest
+    doctest.testmod(optionflags=+doctest.ELLIPSIS)
+
+if __name__ == '__main__':
+    _test()
@@ -35,9 +35,9 @@ class World:
         Should be implemented in subclass
 
         Note that world state should include at any time
-        Market.info() of previous period, allowing for change
+        Market.get_state() of previous period, allowing for change
         of engine and market class during simulation without losing
-        current state (order books, ...).
+        current state (order books, last price, transactions count...).
         """
         raise NotImplementedError
 
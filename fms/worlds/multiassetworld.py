@@ -0,0 +1,38 @@
+#!/usr/bin/env python
+"""
+A minimal world class holding many assets
+"""
+
+from fms import worlds
+
+class MultiAssetWorld(worlds.World):
+    """
+    Minimal multi-asset world class
+
+    The list of assets is read from the experiment 'assets' parameter,
+    and last market info holds a pair of books per asset.
+    >>> from fms.worlds.multiassetworld import MultiAssetWorld
+    >>> world = MultiAssetWorld({'assets': ['ACME', 'INITECH']})
+    >>> world.assets
+    ['ACME', 'INITECH']
+    >>> sorted(world.state()['books'].items())
+    [('ACME', [[], []]), ('INITECH', [[], []])]
+
+    """
+    def __init__(self, parameters=None):
+        worlds.World.__init__(self)
+        self.assets = []
+        if parameters and parameters.get('assets'):
+            self.assets = list(parameters['assets'])
+        self.lastmarketinfo['books'] = dict(
+                (asset, [[], []]) for asset in self.assets)
+        self.lastmarketinfo['lastprices'] = {}
+
+    def state(self):
+        """
+        MultiAssetWorld only returns last market info (dict)
+        """
+        return self.lastmarketinfo
+
+if __name__ == '__main__':
+    print MultiAssetWorld()
@@ -22,6 +22,8 @@ setup(name='fms',
                     ],
         scripts = ['startfms.py'],
         install_requires = ['distribute','PyYAML',],
+        # agents pools, block engine, random buffers, binary files
+        extras_require = {'numpy': ['numpy'],},
         classifiers=[
             "Development Status :: 4 - Beta",
             "Environment :: Console",
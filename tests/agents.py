@@ -5,8 +5,12 @@ Tests for agents module.
 """
 
 import unittest
+
 from fms.agents import Agent
 from fms.utils.exceptions import MissingParameter, NotAnInteger
+from fms.utils.parsers import YamlParamsParser
+
+from engines import run_conf
 
 class AgentTests(unittest.TestCase):
     """
@@ -69,5 +73,275 @@ class AgentTests(unittest.TestCase):
         self.assertAlmostEqual(smith.money, 646., 2,
                         "Agent.money incorrectly updated after sell")
 
+class CloneTests(unittest.TestCase):
+    """
+    Tests for agents created by cloning a prototype
+    """
+    params = {'agents': [{'money':1000, 'stocks':100, 'args':[100, 10]}]}
+
+    def test_clones_have_own_state(self):
+        """
+        Mutable state is not shared between prototype and clones
+        """
+        from fms.contrib.coleman.agents.mem5trader import Mem5Trader
+        prototype = Mem5Trader(self.params)
+        clone = prototype.clone()
+        clone.record(0, 10., 1)
+        self.assertEqual(len(clone.successes), 1)
+        self.assertEqual(len(prototype.successes), 0)
+        self.assertEqual(clone.money, 990.)
+        self.assertEqual(prototype.money, 1000.)
+
+    def test_clones_draw_as_constructed_agents(self):
+        """
+        Clones draw their initial state as agents built one by one
+        """
+        import random
+        from fms.contrib.coleman.agents.randomfixedtraderhalves import \
+                RandomFixedTraderHalves
+        random.seed(12)
+        built = [RandomFixedTraderHalves(self.params) for i in range(5)]
+        random.seed(12)
+        prototype = RandomFixedTraderHalves(self.params)
+        cloned = [prototype] + [prototype.clone() for i in range(4)]
+        self.assertEqual([(a.buyprice, a.sellprice) for a in built],
+                [(a.buyprice, a.sellprice) for a in cloned])
+
+    def test_defectors_keep_no_bids(self):
+        """
+        DefectorTrader does not remember bids, its clones neither
+        """
+        from fms.contrib.coleman.agents.defectortrader import DefectorTrader
+        prototype = DefectorTrader(self.params)
+        for agent in (prototype, prototype.clone()):
+            agent.act()
+            self.failIf(hasattr(agent, 'bids'))
+            self.failIf(hasattr(agent, 'maxbids'))
+
+class SlottedAgentTests(unittest.TestCase):
+    """
+    Tests for agents storing their attributes in slots
+    """
+    params = {'agents': [{'money':1000, 'stocks':100, 'args':[100, 10]}]}
+
+    def test_slotted_agents_have_no_dict(self):
+        """
+        Built-in and coleman agents have no instance dict
+        """
+        from fms.agents.zerointelligencetrader import ZeroIntelligenceTrader
+        from fms.contrib.coleman.agents.smartmem5traderd import \
+                SmartMem5TraderD
+        for agentclass in (ZeroIntelligenceTrader, SmartMem5TraderD):
+            agent = agentclass(self.params)
+            self.failIf(hasattr(agent, '__dict__'))
+            self.assertRaises(AttributeError, setattr, agent, 'foo', 1)
+            self.assertEqual(agent.maxprice, 100)
+
+    def test_slotted_agent_parameters(self):
+        """
+        SlottedAgent checks money and stocks as Agent does
+        """
+        from fms.agents import SlottedAgent
+        self.assertRaises(MissingParameter, SlottedAgent,
+                {'agents':[{'stocks':300}]})
+        self.assertRaises(NotAnInteger, SlottedAgent,
+                {'agents':[{'money':200, 'stocks':23.4}]})
+        self.assertRaises(ValueError, SlottedAgent,
+                {'agents':[{'money':'blah', 'stocks':1000}]})
+
+    def test_dict_based_agents_still_work(self):
+        """
+        Agent subclasses without slots trade with slotted agents
+        """
+        from fms.agents.zerointelligencetrader import ZeroIntelligenceTrader
+        from fms.markets.continuousorderdriven import ContinuousOrderDriven
+        class DictTrader(Agent):
+            def act(self, world=None, market=None):
+                return {'direction':0, 'price':10., 'quantity':5}
+        buyer = DictTrader(self.params)
+        seller = ZeroIntelligenceTrader(self.params)
+        market = ContinuousOrderDriven()
+        market.record_order({'direction':1, 'price':9., 'quantity':5,
+            'agent':seller}, 0)
+        market.record_order(market.sanitize_order(buyer.speak()), 1)
+        market.do_clearing(1)
+        self.assertEqual((buyer.stocks, seller.stocks), (105, 95))
+        self.assertEqual(buyer.clone().__dict__, buyer.__dict__)
+
+class RandomBufferTests(unittest.TestCase):
+    """
+    Tests for agents drawing from random buffers
+    """
+    params = {'agents': [{'money':1000, 'stocks':100, 'args':[100, 10],
+        'randombuffer': 32}]}
+
+    def test_buffered_agents_are_reproducible(self):
+        """
+        Buffers are seeded from the random module
+        """
+        import random
+        from fms.contrib.coleman.agents.mem5trader import Mem5Trader
+        random.seed(5)
+        first = Mem5Trader(self.params)
+        orders = [first.act() for i in range(100)]
+        random.seed(5)
+        second = Mem5Trader(self.params)
+        self.failIf(first.rng is random)
+        self.assertEqual(orders, [second.act() for i in range(100)])
+
+    def test_clones_own_buffers(self):
+        """
+        Clones do not share the buffer of their prototype
+        """
+        from fms.agents.zerointelligencetrader import ZeroIntelligenceTrader
+        prototype = ZeroIntelligenceTrader(self.params)
+        clone = prototype.clone()
+        self.failIf(clone.rng is prototype.rng)
+        self.assertEqual(clone.rng.size, 32)
+
+POOL_CONF = """
+randomseed: 4321
+world:
+      classname: NullWorld
+engines:
+    - classname: AsynchronousRandWReplace
+      daylength: 500
+      market:
+          classname: ContinuousOrderDriven
+agents:
+    - classname: ZeroIntelligenceTrader
+      number: 100
+      money: 100000
+      stocks: 1000
+      args: [100, 100]
+      pool: %s
+"""
+
+class AgentPoolTests(unittest.TestCase):
+    """
+    Tests for agents pools
+    """
+    def test_pooled_agents_behave_as_agents(self):
+        """
+        Pooled agents give the same transactions and final states
+        """
+        output, agentslist = run_conf(POOL_CONF % False)
+        pooloutput, poollist = run_conf(POOL_CONF % True)
+        self.assert_(output)
+        self.assertEqual(output, pooloutput)
+        self.assertEqual([(a.money, a.stocks) for a in agentslist],
+                [(a.money, a.stocks) for a in poollist])
+        self.assertEqual(sum(poollist[0].pool.stocks), 100*1000)
+
+    def test_pooled_agents_have_no_dict(self):
+        """
+        Pooled agents keep their ident and drawn state in slots
+        """
+        conf = POOL_CONF.replace('ZeroIntelligenceTrader',
+                'coleman.RandomFixedTrader')
+        poollist = run_conf(conf % True)[1]
+        self.assertEqual([a.ident for a in poollist], range(100))
+        for agent in poollist:
+            self.failIf(hasattr(agent, '__dict__'))
+
+    def test_pools_have_no_random_buffers(self):
+        """
+        Pooled agents can not have random buffers
+        """
+        conf = POOL_CONF % True + "      randombuffer: 64\n"
+        self.assertRaises(ValueError, YamlParamsParser, conf)
+        self.assert_(YamlParamsParser(POOL_CONF % False +
+            "      randombuffer: 64\n"))
+
+    def test_pooled_agents_draw_own_state(self):
+        """
+        Pooled agents draw their own initial state, as clones do
+        """
+        conf = POOL_CONF.replace('ZeroIntelligenceTrader',
+                'coleman.RandomFixedTrader')
+        output, agentslist = run_conf(conf % False)
+        pooloutput, poollist = run_conf(conf % True)
+        self.assertEqual([a.buyprice for a in agentslist],
+                [a.buyprice for a in poollist])
+        self.assert_(len(set([a.buyprice for a in poollist])) > 1)
+        self.assertEqual(output, pooloutput)
+
+HISTORY_CONF = """
+randomseed: 321
+history: %s
+world:
+      classname: NullWorld
+engines:
+    - classname: AsynchronousRandWReplace
+      daylength: 400
+      days: 2
+      market:
+          classname: ContinuousOrderDriven
+agents:
+    - classname: coleman.SmartMem5Trader
+      number: 10
+      money: 10000
+      stocks: 100
+      args: [100, 20]
+    - classname: coleman.AvgBuySellTrader
+      number: 10
+      money: 10000
+      stocks: 100
+      args: [100, 20]
+    - classname: coleman.SmartProbeBoundedTrader
+      number: 10
+      money: 10000
+      stocks: 100
+      args: [100, 20]
+    - classname: coleman.DefectorTrader
+      number: 10
+      money: 10000
+      stocks: 100
+      args: [100, 20]
+"""
+
+class AvgBuySellTraderTests(unittest.TestCase):
+    """
+    Tests for AvgBuySellTrader averages
+    """
+    params = {'agents': [{'money':10000, 'stocks':200, 'args':[100, 10]}]}
+
+    def test_combined_average_is_exact(self):
+        """
+        Average of all successes is sum()/len() of the prices in the
+        order they were recorded, not the sum of both sides
+        """
+        from fms.utils import BUY, SELL
+        from fms.contrib.coleman.agents.avgbuyselltrader import \
+                AvgBuySellTrader
+        agent = AvgBuySellTrader(self.params)
+        sells, buys = [1.38, 5.83, 8.68], [8.22, 7.83, 0.65]
+        for price in sells:
+            agent.record(SELL, price, 1)
+        for price in buys:
+            agent.record(BUY, price, 1)
+        prices = sells + buys
+        self.assertNotEqual(sum(sells) + sum(buys), sum(prices))
+        self.assertEqual(agent.successes.mean(),
+                float(sum(prices))/len(prices))
+
+class MarketHistoryTests(unittest.TestCase):
+    """
+    Tests for agents querying the market history
+    """
+    def test_history_gives_same_results(self):
+        """
+        Agents give the same transactions, whether they keep their
+        successes or the market history does
+        """
+        output, agentslist = run_conf(HISTORY_CONF % False)
+        historyoutput, historylist = run_conf(HISTORY_CONF % True)
+        self.assert_(output)
+        self.assertEqual(output, historyoutput)
+        market = historylist[0].history
+        self.assertEqual(len(market), len(output.splitlines()))
+        self.assertEqual(len(historylist[0].successes),
+                len(agentslist[0].successes))
+
 if __name__ == "__main__":
     unittest.main()
@@ -4,8 +4,46 @@
 Tests for engines module.
 """
 
+import os
+import tempfile
 import unittest
+from StringIO import StringIO
+
+import fms.core
 from fms.engines import Engine
+from fms.utils.binary import OrdersLogWriter, OrdersLogReader, convert
+from fms.utils.logindex import OrdersLogIndex, read_index
+from fms.utils.files import open_file
+from fms.utils.parsers import YamlParamsParser
+
+def run_params(params):
+    """
+    Run experiment of params, without books nor timer, and return its
+    transactions output and agents list
+    """
+    params['show_books'] = False
+    params['timer'] = False
+    params.outputfile = StringIO()
+    (world, engineslist, agentslist) = fms.core.set_classes(params)
+    for e in engineslist:
+        e['instance'].run(world, agentslist, e['market']['instance'])
+    return params.outputfile.getvalue(), agentslist
+
+def run_conf(conf):
+    """
+    Run experiment of YAML configuration conf, see run_params()
+    """
+    return run_params(YamlParamsParser(conf))
+
+def run_logged_conf(conf):
+    """
+    Run experiment of YAML configuration conf, and return its
+    transactions output and orders log
+    """
+    params = YamlParamsParser(conf)
+    params.orderslogfile = StringIO()
+    output = run_params(params)[0]
+    return output, params.orderslogfile.getvalue()
 
 class EngineTests(unittest.TestCase):
     """
@@ -18,5 +56,665 @@ class EngineTests(unittest.TestCase):
         engine = Engine()
         self.assertRaises(NotImplementedError, engine.run, None, None, None)
 
+class EnginesSequenceTests(unittest.TestCase):
+    """
+    Tests for consecutive engines in the same experiment
+    """
+    def run_engines(self):
+        self.params = YamlParamsParser('fixtures/twoengines.yml')
+        self.output = run_params(self.params)[0]
+        return [e['market']['instance'] for e in self.params['engines']]
+
+    def test_books_are_handed_over(self):
+        """
+        Next market should go on with the very same books
+        """
+        first, second = self.run_engines()
+        self.assert_(second.sellbook is first.sellbook)
+        self.assert_(second.buybook is first.buybook)
+
+    def test_transactions_numbering_goes_on(self):
+        """
+        Transactions numbering should not restart with next engine
+        """
+        first, second = self.run_engines()
+        self.assert_(0 < first.transaction < second.transaction)
+        numbers = [int(line.split(';')[1]) for line in
+                self.output.splitlines()]
+        self.assertEqual(numbers, range(1, second.transaction+1))
+
+class MultiAssetTests(unittest.TestCase):
+    """
+    Tests for multi-asset experiments
+    """
+    def setUp(self):
+        self.params = YamlParamsParser('fixtures/multiasset.yml')
+        (self.output, self.agents) = run_params(self.params)
+
+    def test_transactions_have_asset_column(self):
+        """
+        Transactions output should have an asset column
+        """
+        lines = self.output.splitlines()
+        self.assert_(lines)
+        assets = set(line.split(';')[2] for line in lines)
+        self.assertEqual(assets, set(self.params['assets']))
+
+    def test_stocks_are_conserved_by_asset(self):
+        """
+        Transactions should not create nor destroy stocks of any asset
+        """
+        for asset in self.params['assets']:
+            self.assertEqual(sum(a.portfolio[asset] for a in self.agents),
+                    100*len(self.agents))
+
+    def test_history_records_all_assets(self):
+        """
+        Market history should hold the transactions of all assets
+        """
+        params = YamlParamsParser('fixtures/multiasset.yml')
+        params['history'] = True
+        output = run_params(params)[0]
+        history = params['engines'][0]['market']['instance'].history
+        self.assertEqual(output, self.output)
+        self.assertEqual(history.prices.tolist(), [float(line.split(';')[3])
+                for line in output.splitlines()])
+
+PERIODIC_CONF = """
+randomseed: 1234
+world:
+      classname: NullWorld
+engines:
+    - classname: %s
+      daylength: 100
+      days: 3
+      args: [%d]
+      market:
+          classname: HighestQtyFixing
+agents:
+    - classname: ZeroIntelligenceTrader
+      number: 100
+      money: 100000
+      stocks: 1000
+      args: [100, 100]
+"""
+
+class PeriodicEngineTests(unittest.TestCase):
+    """
+    Tests for PeriodicRandWReplace engine
+    """
+    def test_daylength_interval_is_synchronous(self):
+        """
+        With interval == daylength, engine behaves as SynchronousRandWReplace
+        """
+        periodic = run_conf(PERIODIC_CONF % ('PeriodicRandWReplace', 100))[0]
+        synchronous = run_conf(
+                PERIODIC_CONF % ('SynchronousRandWReplace', 100))[0]
+        self.assert_(periodic)
+        self.assertEqual(periodic, synchronous)
+
+    def test_auctions_every_interval(self):
+        """
+        Auctions happen every interval ticks, and at end of day
+        """
+        output = run_conf(PERIODIC_CONF % ('PeriodicRandWReplace', 30))[0]
+        times = set(int(line.split(';')[0]) for line in output.splitlines())
+        self.assert_(len(times) > 3)
+        for time in times:
+            self.assert_(not (time % 100) % 30 or not time % 100)
+
+MIXED_CONF = """
+randomseed: 4321
+world:
+      classname: NullWorld
+engines:
+    - classname: %s
+      daylength: 300
+      days: 2
+      args: [64]
+      market:
+          classname: ContinuousOrderDriven
+agents:
+    - classname: ZeroIntelligenceTrader
+      number: 50
+      money: 100000
+      stocks: 100
+      args: [100, 20]
+    - classname: RandomTrader
+      number: 50
+      money: 10000
+      stocks: 100
+      args: [50, 20, 30]
+    - classname: coleman.Mem5Trader
+      number: 10
+      money: 10000
+      stocks: 100
+      args: [100, 20]
+"""
+BLOCK_CONF = MIXED_CONF % 'AsynchronousBlockRandWReplace'
+TUPLE_CONF = MIXED_CONF % 'AsynchronousRandWReplace'
+
+class BlockEngineTests(unittest.TestCase):
+    """
+    Tests for AsynchronousBlockRandWReplace engine
+    """
+    def test_runs_are_reproducible(self):
+        """
+        Same randomseed gives same transactions
+        """
+        output, agentslist = run_conf(BLOCK_CONF)
+        self.assert_(output)
+        self.assertEqual(output, run_conf(BLOCK_CONF)[0])
+
+    def test_no_short_selling(self):
+        """
+        Orders drawn by blocks are checked against agents stocks
+        """
+        output, agentslist = run_conf(BLOCK_CONF)
+        self.assertEqual(sum(a.stocks for a in agentslist), 100*110)
+        for agent in agentslist[:100]:
+            self.assert_(agent.stocks >= 0)
+
+    def test_random_traders_without_avgprice(self):
+        """
+        RandomTrader agents with a zero avgprice start at 100, before
+        any transaction
+        """
+        conf = BLOCK_CONF.replace('args: [50, 20, 30]', 'args: [0, 20, 30]')
+        output, agentslist = run_conf(conf)
+        self.assert_(output)
+        avgprices = [a.avgprice for a in agentslist[50:100]]
+        self.assert_(100 in avgprices)
+        self.failIf([price for price in avgprices if not price])
+
+class TupleOrdersTests(unittest.TestCase):
+    """
+    Tests for the tuple orders fast path
+    """
+    def test_tuple_orders_as_dict_orders(self):
+        """
+        Tuple orders give the same orders log and transactions as
+        the dict orders speak() turns them into
+        """
+        from fms.markets.continuousorderdriven import ContinuousOrderDriven
+        output, orders = run_logged_conf(TUPLE_CONF)
+        ContinuousOrderDriven.tupleorders = False
+        try:
+            dictoutput, dictorders = run_logged_conf(TUPLE_CONF)
+        finally:
+            ContinuousOrderDriven.tupleorders = True
+        self.assert_(output)
+        self.assertEqual(len(orders.splitlines()), 600)
+        self.assertEqual(output, dictoutput)
+        self.assertEqual(orders, dictorders)
+
+    def test_markets_opt_in_tuple_orders(self):
+        """
+        Markets get dict orders, unless their class opts in tuple
+        orders
+        """
+        from fms.agents.zerointelligencetrader import ZeroIntelligenceTrader
+        from fms.markets import Market
+        class DictMarket(Market):
+            def is_valid(self, agent, order):
+                return 'direction' in order
+            def record_order(self, order, time, unique=True):
+                self.orders.append(order)
+            def info(self):
+                return {'sellbook': [[10.]], 'buybook': [[9.]]}
+        market = DictMarket(None)
+        market.orders = []
+        engine = Engine()
+        engine.params = YamlParamsParser(TUPLE_CONF)
+        agent = ZeroIntelligenceTrader({'agents': [{'money':1000,
+            'stocks':100, 'args':[100, 10]}]})
+        self.assert_(engine.submit(agent, market, 1))
+        self.assertEqual(market.orders[0]['agent'], agent)
+
+    def test_orders_log_agents_idents(self):
+        """
+        Orders logs identify agents by their index in the agents list,
+        two runs with the same seed writing the same log
+        """
+        output, orders = run_logged_conf(TUPLE_CONF)
+        otheroutput, otherorders = run_logged_conf(TUPLE_CONF)
+        self.assertEqual(orders, otherorders)
+        idents = set(int(line.split(';')[3]) for line in orders.splitlines())
+        self.assert_(idents <= set(range(110)))
+        self.assert_(idents & set(range(100, 110)))
+
+class BinaryOrdersLogTests(unittest.TestCase):
+    """
+    Tests for binary orders logs
+    """
+    def setUp(self):
+        (fd, self.filename) = tempfile.mkstemp()
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.filename)
+
+    def log_conf(self, conf):
+        params = YamlParamsParser(conf)
+        params.orderslogfile = StringIO()
+        params.binaryorderslog = OrdersLogWriter(open(self.filename, 'wb'))
+        params.binaryorderslog.write_header()
+        output = run_params(params)[0]
+        params.binaryorderslog.close()
+        return output, params.orderslogfile.getvalue()
+
+    def test_binary_log_as_csv_log(self):
+        """
+        Binary orders log holds the orders of the CSV log
+        """
+        output, orders = self.log_conf(TUPLE_CONF)
+        reader = OrdersLogReader(self.filename)
+        self.assertEqual(len(reader), 600)
+        for line in orders.splitlines():
+            order = reader.read()
+            fields = line.split(';')
+            self.assertEqual(int(fields[0]), order['direction'])
+            self.assertEqual(fields[1], '%.2f' % order['price'])
+            self.assertEqual(int(fields[2]), order['quantity'])
+        self.assertRaises(EOFError, reader.read)
+        ticks = reader.orders['tick'].tolist()
+        self.assertEqual(ticks, sorted(ticks))
+
+    def test_binary_replay(self):
+        """
+        Replaying a binary orders log gives the same transactions
+        """
+        output, orders = self.log_conf(TUPLE_CONF)
+        params = YamlParamsParser(TUPLE_CONF)
+        params.exp_path = ''
+        del params['agents'][1:]
+        params['agents'][0].update({'classname':'PlayOrderLogFile',
+            'number':1, 'args':[self.filename]})
+        replay, agentslist = run_params(params)
+        agentslist[0].reset()
+        self.assert_(output)
+        self.assertEqual(output, replay)
+
+    def test_convert_binary_files(self):
+        """
+        Binary output files and orders logs convert to the CSV ones
+        """
+        output, orders = self.log_conf(TUPLE_CONF)
+        converted = StringIO()
+        convert(self.filename, converted)
+        lines = converted.getvalue().splitlines()
+        self.assert_(lines[0].endswith(' orders log'))
+        self.assertEqual('\n'.join(lines[3:]), orders.strip())
+        params = YamlParamsParser(TUPLE_CONF)
+        params['show_books'] = False
+        params['timer'] = False
+        params['outputformat'] = 'binary'
+        params.outputfile = open(self.filename, 'wb')
+        params.printfileheaders()
+        (world, engineslist, agentslist) = fms.core.set_classes(params)
+        for e in engineslist:
+            e['instance'].run(world, agentslist, e['market']['instance'])
+        params.close_files(0)
+        params.outputfile.close()
+        converted = StringIO()
+        convert(self.filename, converted)
+        lines = converted.getvalue().splitlines(True)
+        start = lines.index("time;transaction;price;volume\n") + 1
+        self.assert_(output)
+        self.assertEqual(''.join(lines[start:]), output)
+        filename = self.filename + '.bz2'
+        compressed = open_file(filename, 'wb')
+        compressed.write(open(self.filename, 'rb').read())
+        compressed.close()
+        streamed = StringIO()
+        convert(filename, streamed)
+        os.remove(filename)
+        self.assertEqual(streamed.getvalue(), converted.getvalue())
+
+    def test_compressed_binary_log(self):
+        """
+        Compressed binary orders logs are streamed, sought and
+        converted as plain ones
+        """
+        output, orders = self.log_conf(TUPLE_CONF)
+        filename = self.filename + '.gz'
+        compressed = open_file(filename, 'wb')
+        compressed.write(open(self.filename, 'rb').read())
+        compressed.close()
+        plain = OrdersLogReader(self.filename, chunksize=64)
+        reader = OrdersLogReader(filename, chunksize=64)
+        self.assertEqual(reader.orders, None)
+        self.assertEqual(len(reader), len(plain))
+        for tick in (0, 150, 10**6):
+            plain.seek(tick)
+            reader.seek(tick)
+            self.assertEqual(reader.position, plain.position)
+            self.assertEqual(reader.read_chunk(), plain.read_chunk())
+        plain.seek(0, 300)
+        reader.seek(0, 300)
+        self.assertEqual(reader.read_chunk(), plain.read_chunk())
+        converted = StringIO()
+        convert(filename, converted)
+        reader.stream.close()
+        os.remove(filename)
+        lines = converted.getvalue().splitlines()
+        self.assertEqual('\n'.join(lines[3:]), orders.strip())
+
+REPLAY_CONF = """
+randomseed: 4321
+world:
+      classname: NullWorld
+engines:
+    - classname: AsynchronousRandWReplace
+      daylength: 300
+      clearbooksateod: False
+      market:
+          classname: ContinuousOrderDriven
+    - classname: PeriodicRandWReplace
+      daylength: 300
+      days: 2
+      args: [7]
+      market:
+          classname: HighestQtyFixing
+agents:
+    - classname: ZeroIntelligenceTrader
+      number: 50
+      money: 100000
+      stocks: 100
+      args: [100, 20]
+"""
+
+class ReplayOrdersLogTests(unittest.TestCase):
+    """
+    Tests for ReplayOrdersLog engine
+    """
+    setUp = BinaryOrdersLogTests.setUp.im_func
+    tearDown = BinaryOrdersLogTests.tearDown.im_func
+
+    def replay_params(self, conf):
+        params = YamlParamsParser(conf)
+        params['show_books'] = False
+        params['timer'] = False
+        params.exp_path = ''
+        del params['agents'][1:]
+        params['agents'][0].update({'classname':'PlayOrderLogFile',
+            'number':1, 'args':[self.filename]})
+        return params
+
+    def test_engines_are_replaced(self):
+        """
+        Replayed experiments engines are ReplayOrdersLog engines with
+        the same clearing interval
+        """
+        from fms.engines.replayorderslog import ReplayOrdersLog
+        params = self.replay_params(REPLAY_CONF)
+        (world, engineslist, agentslist) = fms.core.set_classes(params)
+        agentslist[0].reset()
+        for e in engineslist:
+            self.assert_(isinstance(e['instance'], ReplayOrdersLog))
+        self.assertEqual([e['instance'].clearing_interval()
+            for e in engineslist], [0, 7])
+
+    def test_csv_replay(self):
+        """
+        Replaying a CSV orders log gives the same transactions
+        """
+        params = YamlParamsParser(REPLAY_CONF)
+        params.orderslogfile = open(self.filename, 'w')
+        output = run_params(params)[0]
+        params.orderslogfile.close()
+        replay, agentslist = run_params(
+                self.replay_params(REPLAY_CONF))
+        agentslist[0].reset()
+        self.assert_(output)
+        self.assertEqual(output, replay)
+
+    def test_compressed_replay(self):
+        """
+        Compressed orders logs are replayed as plain ones
+        """
+        for extension in ('.gz', '.bz2'):
+            filename = self.filename + extension
+            params = YamlParamsParser(REPLAY_CONF)
+            params.orderslogfile = open_file(filename, 'w')
+            output = run_params(params)[0]
+            params.orderslogfile.close()
+            params = self.replay_params(REPLAY_CONF)
+            params['agents'][0]['args'] = [filename]
+            replay, agentslist = run_params(params)
+            agentslist[0].reset()
+            os.remove(filename)
+            self.assert_(output)
+            self.assertEqual(output, replay)
+
+    def test_async_output(self):
+        """
+        Files written by the writer thread are the same as those
+        written by the simulation, and indexed the same way
+        """
+        files = {}
+        for asyncoutput in (False, True):
+            params = YamlParamsParser(REPLAY_CONF)
+            params['show_books'] = False
+            params['timer'] = False
+            params['outputfilename'] = self.filename
+            params['orderslogfilename'] = self.filename + '.log'
+            params['orderslogindex'] = True
+            params['asyncoutput'] = asyncoutput
+            params.create_files(0)
+            params.printfileheaders()
+            (world, engineslist, agentslist) = fms.core.set_classes(params)
+            for e in engineslist:
+                e['instance'].run(world, agentslist, e['market']['instance'])
+            params.close_files(0)
+            orders = open(self.filename + '.log').read()
+            files[asyncoutput] = (open(self.filename).read(), orders)
+            index = read_index(self.filename + '.log.idx')
+            for day in index:
+                self.assert_(orders[index[day][1]:].startswith('# day %d' %
+                    day))
+            os.remove(self.filename + '.log')
+            os.remove(self.filename + '.log.idx')
+        self.assert_(files[False][0])
+        self.assertEqual(files[False], files[True])
+
+    def options_replay(self, conf, options):
+        """
+        Run conf, ZeroIntelligenceTrader orders getting the options
+        (see fms.utils.ORDEROPTIONS) returned by options(order), and
+        check that replays of its CSV and binary orders logs give the
+        same transactions. Return the CSV orders log.
+        """
+        from fms.agents import zerointelligencetrader
+        ZeroIntelligenceTrader = zerointelligencetrader.ZeroIntelligenceTrader
+        class OptionsTrader(ZeroIntelligenceTrader):
+            __slots__ = ()
+            tupleorders = False
+            def act(self, world=None, market=None):
+                order = ZeroIntelligenceTrader.act(self, world, market)
+                optioned = {'direction':order[0], 'price':order[1],
+                        'quantity':order[2]}
+                optioned.update(options(order))
+                return optioned
+        zerointelligencetrader.ZeroIntelligenceTrader = OptionsTrader
+        try:
+            params = YamlParamsParser(conf)
+            params.orderslogfile = open(self.filename, 'w')
+            params.binaryorderslog = OrdersLogWriter(
+                    open(self.filename + '.bin', 'wb'))
+            params.binaryorderslog.write_header()
+            output = run_params(params)[0]
+        finally:
+            zerointelligencetrader.ZeroIntelligenceTrader = \
+                    ZeroIntelligenceTrader
+        params.orderslogfile.close()
+        params.binaryorderslog.close()
+        self.assert_(output)
+        for filename in (self.filename, self.filename + '.bin'):
+            params = self.replay_params(conf)
+            params['agents'][0]['args'] = [filename]
+            replay, agentslist = run_params(params)
+            agentslist[0].reset()
+            self.assertEqual(output, replay)
+        os.remove(self.filename + '.bin')
+        return open(self.filename).read()
+
+    def test_ttl_replay(self):
+        """
+        Orders time to live are logged, and replayed, in CSV and
+        binary orders logs
+        """
+        orders = self.options_replay(REPLAY_CONF,
+                lambda order: {'ttl': 1 + order[2] % 10})
+        self.assert_('ttl=' in orders)
+
+    def test_stop_and_iceberg_replay(self):
+        """
+        Stop and iceberg orders are logged, and replayed, in CSV and
+        binary orders logs
+        """
+        def options(order):
+            if order[2] % 3 == 1:
+                return {'stop': order[1]}
+            if order[2] % 3 == 2:
+                return {'visible': 1 + order[2] // 3}
+            return {}
+        orders = self.options_replay(TUPLE_CONF, options)
+        self.assert_('stop=' in orders and 'visible=' in orders)
+
+    def test_replay_window(self):
+        """
+        Replaying a day of an indexed orders log gives the day
+        transactions
+        """
+        params = YamlParamsParser(REPLAY_CONF)
+        params.orderslogfile = open(self.filename, 'w')
+        params.ordersindex = OrdersLogIndex(open(self.filename+'.idx', 'w'))
+        output = run_params(params)[0]
+        params.orderslogfile.close()
+        params.ordersindex.close()
+        index = read_index(self.filename+'.idx')
+        self.assertEqual(sorted(index), [0, 1, 2])
+        self.assertEqual([index[day][0] for day in index], [0, 300, 600])
+        params = self.replay_params(REPLAY_CONF)
+        params['firstday'] = params['lastday'] = 2
+        replay, agentslist = run_params(params)
+        agentslist[0].reset()
+        os.remove(self.filename+'.idx')
+        transactions = [line for line in output.splitlines()
+                if 600 < int(line.split(';')[0]) <= 900]
+        self.assert_(transactions)
+        self.assertEqual(replay.splitlines(), transactions)
+
+WEIGHTS_CONF = """
+randomseed: 4321
+world:
+      classname: NullWorld
+engines:
+    - classname: AsynchronousRandWReplace
+      daylength: 300
+      market:
+          classname: ContinuousOrderDriven
+    - classname: AsynchronousBlockRandWReplace
+      daylength: 300
+      market:
+          classname: ContinuousOrderDriven
+agents:
+    - classname: ZeroIntelligenceTrader
+      number: 10
+      weight: %s
+      money: 100000
+      stocks: 100
+      args: [100, 20]
+    - classname: RandomTrader
+      number: 20
+      money: 10000
+      stocks: 100
+      args: [50, 20, 30]
+"""
+
+class WeightsTests(unittest.TestCase):
+    """
+    Tests for agents speaking weights
+    """
+    def test_sampler_follows_weights(self):
+        """
+        Agents speak in proportion to their weights
+        """
+        engine = Engine()
+        engine.weights = [1, 0, 3]
+        draw = engine.sampler(3)
+        draws = [draw() for i in range(4000)]
+        self.assertEqual(draws.count(1), 0)
+        self.assert_(2.5 < draws.count(2)/float(draws.count(0)) < 3.5)
+        self.assertRaises(ValueError, engine.sampler, 4)
+
+    def test_engines_weights(self):
+        """
+        Engines get one weight per agent, unless weights are uniform
+        """
+        params = YamlParamsParser(WEIGHTS_CONF % 1)
+        params['show_books'] = False
+        (world, engineslist, agentslist) = fms.core.set_classes(params)
+        for e in engineslist:
+            self.assertEqual(e['instance'].weights, None)
+        params = YamlParamsParser(WEIGHTS_CONF % 2.5)
+        params['show_books'] = False
+        (world, engineslist, agentslist) = fms.core.set_classes(params)
+        for e in engineslist:
+            self.assertEqual(e['instance'].weights, [2.5]*10 + [1]*20)
+
+    def test_weighted_runs_are_reproducible(self):
+        """
+        Same randomseed gives same transactions with weights
+        """
+        output = run_conf(WEIGHTS_CONF % 4)[0]
+        self.assert_(output)
+        self.assertEqual(output, run_conf(WEIGHTS_CONF % 4)[0])
+        self.assertNotEqual(output, run_conf(WEIGHTS_CONF % 1)[0])
+
+class LazyAgentsTests(unittest.TestCase):
+    """
+    Tests for agents created on first use
+    """
+    def test_agents_are_created_on_first_use(self):
+        """
+        No agent is created before being used
+        """
+        params = YamlParamsParser("lazyagents: True\n" + WEIGHTS_CONF % 1)
+        params['show_books'] = False
+        (world, engineslist, agentslist) = fms.core.set_classes(params)
+        self.assertEqual(len(agentslist), 30)
+        self.assertEqual(agentslist.created(), 0)
+        self.assertEqual(agentslist[12].__class__.__name__, 'RandomTrader')
+        self.assertEqual(agentslist.created(), 1)
+
+    def test_lazy_runs_as_eager_runs(self):
+        """
+        Agents drawing no random numbers when created give the same
+        transactions, created lazily or not
+        """
+        for weight in (1, 4):
+            output, agentslist = run_conf(
+                    "lazyagents: True\n" + WEIGHTS_CONF % weight)
+            self.assert_(output)
+            self.assertEqual(output, run_conf(WEIGHTS_CONF % weight)[0])
+            self.assertEqual(sum(a.stocks for a in agentslist), 30*100)
+
+    def test_command_line_seed(self):
+        """
+        Seeds given on the command line, as strings, seed agents as
+        configuration ones do
+        """
+        conf = "lazyagents: True\n" + WEIGHTS_CONF % 1
+        (opts, args) = fms.core.set_parser().parse_args(
+                ['run', 'exp.yml', '--randomseed', '4321'])
+        params = fms.core._apply_opts(YamlParamsParser(conf), opts)
+        self.assertEqual(params['randomseed'], '4321')
+        output, agentslist = run_params(params)
+        self.assert_(output)
+        self.assertEqual(agentslist.seed, 4321)
+        self.assertEqual(sum(a.stocks for a in agentslist), 30*100)
+
 if __name__ == "__main__":
     unittest.main()
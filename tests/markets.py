@@ -6,7 +6,10 @@ Tests for markets module.
 
 import unittest
 import sys
+import StringIO
 from fms.markets import Market
+from fms.markets.continuousorderdriven import ContinuousOrderDriven
+from fms.markets.highestqtyfixing import HighestQtyFixing
 from fms.utils import BUY, SELL
 from fms.utils.exceptions import MissingParameter
 
@@ -83,5 +86,122 @@ class MarketTests(unittest.TestCase):
         self.assertEqual(market.sanitize_order(
             {'direction':SELL, 'quantity':200, 'agent': None})['quantity'], 200)
 
+    def test_orders_expire_after_orderttl(self):
+        """
+        With an orderttl, orders leave books after ttl ticks
+        """
+        market = Market(None)
+        market.orderttl = 3
+        for tick in range(10):
+            market.record_order({'direction':tick%2, 'price':10+tick,
+                'quantity':1, 'agent':tick}, tick)
+            self.assertEqual(len(market.sellbook) + len(market.buybook),
+                    min(tick+1, 3))
+        self.assertEqual([line[3] for line in market.sellbook], [7, 9])
+        self.assertEqual([line[3] for line in market.buybook], [8])
+
+    def test_order_ttl_overrides_orderttl(self):
+        """
+        Order ttl key overrides market orderttl
+        """
+        market = Market(None)
+        market.orderttl = 3
+        market.record_order({'direction':SELL, 'price':10, 'quantity':1,
+            'agent':'smith', 'ttl':10}, 0)
+        market.record_order({'direction':SELL, 'price':11, 'quantity':1,
+            'agent':'bob'}, 1)
+        market.expire_orders(5)
+        self.assertEqual([line[3] for line in market.sellbook], ['smith'])
+
+    def test_sanitize_order_keeps_ttl(self):
+        """
+        Order ttl is kept by sanitize_order
+        """
+        market = Market(None)
+        self.assertEqual(market.sanitize_order(
+            {'direction':SELL, 'ttl':5, 'agent': None})['ttl'], 5)
+
+    def test_sanitize_order_keeps_stop_and_visible(self):
+        """
+        Iceberg order keys are kept by sanitize_order, stop ones by
+        markets handling stop orders only
+        """
+        market = Market(None)
+        order = market.sanitize_order({'direction':SELL, 'price':3,
+            'visible':10, 'agent': None})
+        self.assertEqual(order['visible'], 10)
+        stoporder = {'direction':SELL, 'price':3, 'stop':2.5, 'agent': None}
+        self.assertRaises(ValueError, market.sanitize_order, stoporder)
+        self.assertRaises(ValueError, HighestQtyFixing().sanitize_order,
+                stoporder)
+        order = ContinuousOrderDriven().sanitize_order(stoporder)
+        self.assertEqual(order['stop'], 2.5)
+
+class ContinuousOrderDrivenTests(unittest.TestCase):
+    """
+    Tests for stop orders on ContinuousOrderDriven market
+    """
+    def setUp(self):
+        self.market = ContinuousOrderDriven()
+        self.market.outputfile = StringIO.StringIO()
+        self.market.replay = True
+
+    def test_sell_stops_triggered_highest_first(self):
+        """
+        Sell stops are triggered when price falls down to trigger price
+        """
+        for stop in (2.0, 3.0, 2.5):
+            self.market.record_order({'direction':SELL, 'price':1.,
+                'quantity':1, 'agent':stop, 'stop':stop}, 0, False)
+        self.market.lastprice = 2.5
+        self.market.trigger_stops(1)
+        self.assertEqual([line[3] for line in self.market.sellbook],
+                [2.5, 3.0])
+        self.assertEqual([item[0] for item in self.market.sellstops],
+                [-2.0])
+
+    def test_stops_handed_over_and_cleared(self):
+        """
+        Stop orders are part of market state, and cleared with books
+        """
+        self.market.record_order({'direction':BUY, 'price':3.,
+            'quantity':1, 'agent':'bob', 'stop':2.}, 0)
+        nextmarket = ContinuousOrderDriven()
+        nextmarket.set_state(self.market.get_state())
+        self.assertEqual(len(nextmarket.buystops), 1)
+        nextmarket.clear_books()
+        self.assertEqual(nextmarket.buystops, [])
+
+class HighestQtyFixingTests(unittest.TestCase):
+    """
+    Tests for iceberg orders on HighestQtyFixing market
+    """
+    def setUp(self):
+        self.market = HighestQtyFixing()
+        self.market.replay = True
+        self.market.transactions.outputfile = StringIO.StringIO()
+
+    def test_iceberg_hidden_quantity_is_executed(self):
+        """
+        Iceberg orders are executed slice by slice, up to their full
+        quantity
+        """
+        self.market.record_order({'direction':SELL, 'price':10.,
+            'quantity':50, 'visible':20, 'agent':'smith'}, 0)
+        self.market.record_order({'direction':BUY, 'price':10.,
+            'quantity':45, 'agent':'bob'}, 1)
+        self.market.do_clearing(2)
+        self.market.flush_transactions()
+        quantities = [int(line.split(';')[3]) for line in
+                self.market.transactions.outputfile.getvalue().splitlines()]
+        self.assertEqual(quantities, [20, 20, 5])
+        self.assertEqual(self.market.buybook, [])
+        self.assertEqual(self.market.sellbook, [[10., 2, 5, 'smith', 0, 20]])
+        self.market.record_order({'direction':BUY, 'price':10.,
+            'quantity':10, 'agent':'bob'}, 3)
+        self.market.do_clearing(4)
+        self.assertEqual(self.market.sellbook, [])
+        self.assertEqual(self.market.buybook, [[10., -3, 5, 'bob']])
+
 if __name__ == "__main__":
     unittest.main()
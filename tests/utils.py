@@ -7,9 +7,12 @@ Tests for utils module.
 import unittest
 import sys
 from StringIO import StringIO
-from fms.utils import CSVDELIMITERS
+from fms.utils import CSVDELIMITERS, SELL
 from fms.utils.parsers import YamlParamsParser, XmlParamsParser
 from fms.utils.exceptions import MissingParameter
+from fms.utils.history import MarketHistory
+from fms.utils.randombuffer import RandomBuffer
+from fms.utils.stats import RunningStats, SortedHistory
 
 class YamlParserTests(unittest.TestCase):
     """
@@ -43,6 +46,30 @@ class YamlParserTests(unittest.TestCase):
         params = YamlParamsParser(ymlparamsfile)
         self.assertTrue(params['unique_by_agent'])
 
+    def testOrdersLogFormatDefaultValue(self):
+        """
+        orderslogformat value is 'csv' if missing
+        """
+        ymlparamsfile = '%s/minimalconfig.yml' % self.fixturesdir
+        params = YamlParamsParser(ymlparamsfile)
+        self.assertEqual(params['orderslogformat'], 'csv')
+
+    def testOutputFormatDefaultValue(self):
+        """
+        outputformat value is 'csv' if missing
+        """
+        ymlparamsfile = '%s/minimalconfig.yml' % self.fixturesdir
+        params = YamlParamsParser(ymlparamsfile)
+        self.assertEqual(params['outputformat'], 'csv')
+
+    def testTransactionBufferDefaultValue(self):
+        """
+        transactionbuffer value is 4096 if missing
+        """
+        ymlparamsfile = '%s/minimalconfig.yml' % self.fixturesdir
+        params = YamlParamsParser(ymlparamsfile)
+        self.assertEqual(params['transactionbuffer'], 4096)
+
     def testCsvDelimiterDefaultValue(self):
         """
         csvdelimiter value is ';' if missing
@@ -475,5 +502,176 @@ class XmlParserTests(unittest.TestCase):
         xmlparamsfile = StringIO(self.missingagent)
         self.assertRaises(MissingParameter, XmlParamsParser, xmlparamsfile)
 
+class RunningStatsTests(unittest.TestCase):
+    """
+    Tests for RunningStats helper
+    """
+    def testUnboundedMeanIsExact(self):
+        """
+        Without window, mean is float(sum(values))/len(values)
+        """
+        values = [i*1.01 for i in range(1000)]
+        stats = RunningStats()
+        for value in values:
+            stats.append(value)
+        self.assertEqual(stats.mean(), float(sum(values))/len(values))
+
+    def testWindowMean(self):
+        """
+        With window, mean is computed on the last values only
+        """
+        values = [i*1.01 for i in range(1000)]
+        stats = RunningStats(7)
+        for value in values:
+            stats.append(value)
+        self.assertEqual(len(stats), 7)
+        self.assertAlmostEqual(stats.mean(), sum(values[-7:])/7)
+
+    def testExtremes(self):
+        """
+        min and max match min() and max() of the window values
+        """
+        import random
+        rng = random.Random(3)
+        for window in (None, 1, 5):
+            stats = RunningStats(window, True)
+            self.assertRaises(ValueError, stats.max)
+            values = []
+            for i in range(200):
+                value = rng.randint(1, 50)/10.
+                stats.append(value)
+                values.append(value)
+                if window:
+                    values = values[-window:]
+                self.assertEqual((stats.min(), stats.max()),
+                        (min(values), max(values)))
+
+class SortedHistoryTests(unittest.TestCase):
+    """
+    Tests for SortedHistory helper
+    """
+    def testSuccessorAndPredecessor(self):
+        """
+        successor and predecessor match min/max over filtered values
+        """
+        import random
+        rng = random.Random(7)
+        bids = []
+        history = SortedHistory()
+        for i in range(500):
+            bid = rng.randint(1, 1000)/100.
+            bids.append(bid)
+            history.append(bid)
+            probe = rng.randint(1, 1000)/100.
+            higher = [b for b in bids if b > probe]
+            lower = [b for b in bids if b < probe]
+            if higher:
+                self.assertEqual(history.successor(probe), min(higher))
+            else:
+                self.assertRaises(ValueError, history.successor, probe)
+            if lower:
+                self.assertEqual(history.predecessor(probe), max(lower))
+            else:
+                self.assertRaises(ValueError, history.predecessor, probe)
+
+    def testCap(self):
+        """
+        With a cap, only the last values are kept
+        """
+        history = SortedHistory(3)
+        for bid in (5, 1, 4, 2, 3):
+            history.append(bid)
+        self.assertEqual(history.values, [2, 3, 4])
+
+class RandomBufferTests(unittest.TestCase):
+    """
+    Tests for RandomBuffer generator
+    """
+    def testRandintBounds(self):
+        """
+        randint draws cover [a, b], as random.randint
+        """
+        rng = RandomBuffer(3, 100)
+        draws = set(rng.randint(-2, 2) for i in range(1000))
+        self.assertEqual(draws, set([-2, -1, 0, 1, 2]))
+        self.assertEqual(rng.randint(4, 4), 4)
+        self.assertRaises(ValueError, rng.randint, 5, 4)
+
+    def testRefillIsReproducible(self):
+        """
+        Same seed gives same draws, across buffer refills
+        """
+        first = RandomBuffer(11, 7)
+        second = RandomBuffer(11, 7)
+        self.assertEqual([first.random() for i in range(50)],
+                [second.random() for i in range(50)])
+
+class MarketHistoryTests(unittest.TestCase):
+    """
+    Tests for MarketHistory
+    """
+    def testWindowedAggregates(self):
+        """
+        Windowed aggregates match those computed on the fills lists
+        """
+        import random
+        rng = random.Random(3)
+        history = MarketHistory()
+        history.track(10)
+        prices, quantities = [], []
+        for i in range(300):
+            price, quantity = rng.randint(1, 10000)/100., rng.randint(1, 50)
+            history.record('bob', 'smith', price, quantity)
+            prices.append(price)
+            quantities.append(quantity)
+            for n in (1, 10, 25, None):
+                last = prices[-(n or len(prices)):]
+                lastq = quantities[-(n or len(prices)):]
+                self.assertAlmostEqual(history.mean(n), sum(last)/len(last))
+                self.assertAlmostEqual(history.vwap(n),
+                        sum([p*q for (p, q) in zip(last, lastq)])/sum(lastq))
+                self.assertEqual(history.min(n), min(last))
+                self.assertEqual(history.max(n), max(last))
+
+    def testFollowedAgents(self):
+        """
+        Agents views only get their own fills, on the given side
+        """
+        history = MarketHistory()
+        allfills = history.follow('bob')
+        sells = history.follow('bob', 5, SELL)
+        history.record('bob', 'smith', 10., 1)
+        history.record('smith', 'bob', 11., 1)
+        history.record('smith', 'jones', 12., 1)
+        self.assertEqual(len(allfills), 2)
+        self.assertEqual(sells.get_values(), [11.])
+        self.assertEqual(list(sells.values), [1])
+        self.assertEqual((allfills.min(), allfills.max()), (10., 11.))
+
+    def testViewsMatchRunningStats(self):
+        """
+        Agents views give the very same aggregates as RunningStats
+        fed with the agent fills
+        """
+        import random
+        rng = random.Random(5)
+        history = MarketHistory()
+        views = [history.follow('bob', window) for window in (None, 1, 5)]
+        stats = [RunningStats(window, True) for window in (None, 1, 5)]
+        for i in range(300):
+            price = rng.randint(1, 10000)/100.
+            buyer = rng.choice(('bob', 'smith'))
+            history.record(buyer, 'jones', price, 1)
+            if buyer == 'bob':
+                for running in stats:
+                    running.append(price)
+            for (view, running) in zip(views, stats):
+                self.assertEqual(len(view), len(running))
+                self.assertEqual(view.total, running.total)
+                self.assertEqual(view.get_values(), running.get_values())
+                if len(running):
+                    self.assertEqual((view.min(), view.max()),
+                            (running.min(), running.max()))
+
 if __name__ == "__main__":
     unittest.main()